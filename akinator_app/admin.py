@@ -1,6 +1,42 @@
 from django.contrib import admin
-from .models import Character, Question, GameSession
+from .models import Character, Question, GameSession, FeedbackEvent, KnowledgeBaseVersion, CharacterQuestionStats, GapRankingState, KnowledgeGap
 
-admin.site.register(Character)
-admin.site.register(Question)
+
+class KnowledgeBaseAdmin(admin.ModelAdmin):
+    """Bumps the knowledge-base version on every edit, so caches and snapshots pick it up."""
+
+    def save_related(self, request, form, formsets, change):
+        # The admin calls this right after save_model(), from the change form and
+        # the changelist alike, so one bump here covers the row and its relations.
+        super().save_related(request, form, formsets, change)
+        KnowledgeBaseVersion.bump()
+
+    def delete_model(self, request, obj):
+        super().delete_model(request, obj)
+        KnowledgeBaseVersion.bump()
+
+    def delete_queryset(self, request, queryset):
+        super().delete_queryset(request, queryset)
+        KnowledgeBaseVersion.bump()
+
+
+class KnowledgeGapAdmin(admin.ModelAdmin):
+    """The curation queue from rank_gaps. Fill a gap by editing the character's features."""
+    list_display = ('character', 'question', 'current_answer', 'expected_turns_saved', 'target_share', 'ask_rate', 'ranked_at')
+    list_select_related = ('character', 'question')
+    ordering = ('-expected_turns_saved',)
+    search_fields = ('character__name', 'question__text')
+    readonly_fields = [field.name for field in KnowledgeGap._meta.fields]
+
+    def has_add_permission(self, request):
+        return False
+
+
+admin.site.register(Character, KnowledgeBaseAdmin)
+admin.site.register(Question, KnowledgeBaseAdmin)
 admin.site.register(GameSession)
+admin.site.register(FeedbackEvent)
+admin.site.register(KnowledgeBaseVersion)
+admin.site.register(CharacterQuestionStats)
+admin.site.register(GapRankingState)
+admin.site.register(KnowledgeGap, KnowledgeGapAdmin)
@@ -1,3 +1,5 @@
+import asyncio
+import httpx
 import requests
 from bs4 import BeautifulSoup
 from SPARQLWrapper import SPARQLWrapper, JSON
@@ -74,6 +76,83 @@ def get_character_info(name):
     }
 
 
+# --- Async variants, used by the async views (async_views.py) ---
+# Same lookups over httpx, so a scrape never blocks the event loop, and the
+# Wikipedia and Wikidata requests run side by side.
+
+HEADERS = {"User-Agent": "Mozilla/5.0 (compatible; AkinatorBot/1.0; +https://example.com/bot)"}
+REQUEST_TIMEOUT = 10.0
+
+
+def first_paragraph(html):
+    """The first real paragraph of a Wikipedia page, or None."""
+    soup = BeautifulSoup(html, "html.parser")
+    for p in soup.find_all("p", recursive=True):
+        text = p.get_text().strip()
+        if len(text) > 60 and "may refer to" not in text:
+            return text
+    return None
+
+
+async def aget_wikipedia_summary(client, name):
+    """Async get_wikipedia_summary."""
+    api_url = f"https://en.wikipedia.org/api/rest_v1/page/summary/{name.replace(' ', '_')}"
+    response = await client.get(api_url)
+    if response.status_code == 200:
+        return response.json().get("extract")
+
+    # fallback to scraping
+    response = await client.get(f"https://en.wikipedia.org/wiki/{name.replace(' ', '_')}")
+    if response.status_code != 200:
+        return None
+    return first_paragraph(response.text)
+
+
+async def aget_wikidata_info(client, name):
+    """Async get_wikidata_info. Sends the same SPARQL query straight to the endpoint."""
+    query = f"""
+    SELECT ?item ?itemLabel ?genderLabel ?occupationLabel WHERE {{
+      ?item ?label "{name}"@en;
+            wdt:P21 ?gender;
+            wdt:P106 ?occupation.
+      SERVICE wikibase:label {{ bd:serviceParam wikibase:language "en". }}
+    }} LIMIT 1
+    """
+    response = await client.get(
+        "https://query.wikidata.org/sparql",
+        params={"query": query, "format": "json"},
+        headers={"Accept": "application/sparql-results+json"},
+    )
+    response.raise_for_status()
+    bindings = response.json()["results"]["bindings"]
+    if bindings:
+        info = bindings[0]
+        return {
+            "gender": info.get("genderLabel", {}).get("value", "Unknown"),
+            "occupation": info.get("occupationLabel", {}).get("value", "Unknown")
+        }
+    return None
+
+
+async def aget_character_info(name, client=None):
+    """
+    Async get_character_info. Pass a shared httpx.AsyncClient to reuse its connections.
+    """
+    if client is None:
+        async with httpx.AsyncClient(headers=HEADERS, timeout=REQUEST_TIMEOUT, follow_redirects=True) as client:
+            return await aget_character_info(name, client)
+
+    wiki_summary, wikidata_info = await asyncio.gather(
+        aget_wikipedia_summary(client, name),
+        aget_wikidata_info(client, name),
+    )
+    return {
+        "name": name,
+        "summary": wiki_summary,
+        "details": wikidata_info
+    }
+
+
 if __name__ == "__main__":
     # Test it manually first
     data = get_character_info("Elon Musk")
@@ -1,6 +1,13 @@
 from django.apps import AppConfig
+from django.conf import settings
 
 
 class AkinatorAppConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'akinator_app'
+
+    def ready(self):
+        # Opt-in: preload the knowledge base before gunicorn forks (see warmup.py).
+        if getattr(settings, 'AKINATOR_WARM_START', False):
+            from .warmup import warm_up
+            warm_up()
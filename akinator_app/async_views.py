@@ -0,0 +1,170 @@
+import json
+from concurrent.futures import ThreadPoolExecutor
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import close_old_connections
+from django.http import JsonResponse
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_GET, require_POST
+from .ai_data_collector import aget_character_info
+from .game import advance_game, best_guess
+from .metrics import timed_phase
+from .models import Question, GameSession, Character, KnowledgeBaseVersion
+from .names import find_character, suggest_characters
+from .serializers import QuestionSerializer, CharacterSerializer
+from .views import features_from_wikidata, opening_question_data
+
+# Async versions of the game API, served under /api/async/ by an ASGI server
+# (e.g. `gunicorn -k uvicorn.workers.UvicornWorker akinator_project.asgi`).
+#
+# Session and character I/O uses the async ORM and scraping uses httpx, so a
+# worker keeps many games in flight while they wait. The engine (entropy,
+# posterior updates) is CPU-bound and synchronous; it runs on a small,
+# bounded thread pool so a burst of games queues up there instead of
+# starving the event loop. The request and response payloads are the same
+# as the sync endpoints in views.py.
+
+ENGINE_THREADS = getattr(settings, 'AKINATOR_ASYNC_ENGINE_THREADS', 4)
+_engine_executor = ThreadPoolExecutor(max_workers=ENGINE_THREADS, thread_name_prefix='akinator-engine')
+
+
+def _with_fresh_connection(func, *args):
+    # Engine threads live outside the request cycle, so they drop stale connections themselves.
+    close_old_connections()
+    return func(*args)
+
+
+async def run_engine(func, *args):
+    """Runs a synchronous engine function on the bounded engine pool."""
+    return await sync_to_async(_with_fresh_connection, thread_sensitive=False, executor=_engine_executor)(func, *args)
+
+
+def _json_body(request):
+    try:
+        data = json.loads(request.body or b'{}')
+    except (json.JSONDecodeError, UnicodeDecodeError):
+        return None
+    return data if isinstance(data, dict) else None
+
+
+@require_GET
+async def start_game(request):
+    """Async start_game."""
+    all_character_ids = [char_id async for char_id in Character.objects.values_list('id', flat=True)]
+    if not all_character_ids:
+        return JsonResponse({"error": "No characters in the database to start a game."}, status=404)
+
+    # The opening move is the same for every game until the knowledge base changes.
+    with timed_phase("question_selection"):
+        version = await sync_to_async(KnowledgeBaseVersion.current)()
+        first_question = await run_engine(opening_question_data, version, all_character_ids)
+
+    if not first_question:
+        random_question = await Question.objects.order_by('?').afirst()
+        if not random_question:
+            return JsonResponse({"error": "No questions in the database."}, status=404)
+        first_question = QuestionSerializer(random_question).data
+
+    with timed_phase("save"):
+        session = await GameSession.objects.acreate(
+            current_question_id=first_question["id"],
+            possible_character_ids=all_character_ids,
+            answers={}
+        )
+    return JsonResponse({
+        "session_id": str(session.session_id),
+        "question": first_question
+    })
+
+
+@csrf_exempt
+@require_POST
+async def answer_question(request):
+    """Async answer_question."""
+    data = _json_body(request)
+    if data is None:
+        return JsonResponse({"error": "Invalid JSON body."}, status=400)
+
+    with timed_phase("session_load"):
+        try:
+            session = await GameSession.objects.aget(session_id=data.get("session_id"))
+        except (GameSession.DoesNotExist, ValidationError):
+            return JsonResponse({"error": "Invalid session ID"}, status=404)
+        try:
+            question = await Question.objects.aget(id=data.get("question_id"))
+        except (Question.DoesNotExist, ValueError, TypeError):
+            return JsonResponse({"error": "Invalid question ID"}, status=404)
+
+    next_q = await run_engine(advance_game, session, question, data.get("answer"))
+    with timed_phase("save"):
+        await session.asave()
+    if next_q is None:
+        return JsonResponse({"next_question": None})
+    return JsonResponse({"next_question": QuestionSerializer(next_q).data})
+
+
+@require_GET
+async def get_result(request):
+    """Async get_result."""
+    with timed_phase("session_load"):
+        try:
+            session = await GameSession.objects.aget(session_id=request.GET.get("session_id"))
+        except (GameSession.DoesNotExist, ValidationError):
+            return JsonResponse({"error": "Invalid session ID"}, status=404)
+
+    if not session.possible_character_ids:
+        return JsonResponse({"guessed_character": None, "match_score": 0, "message": "No characters matched your answers."})
+
+    best_id, probability = await run_engine(best_guess, session)
+    best_match = await Character.objects.filter(id=best_id).afirst()
+    return JsonResponse({
+        "guessed_character": CharacterSerializer(best_match).data if best_match else None,
+        # The top candidate's posterior probability, in percent.
+        "match_score": round(probability * 100)
+    })
+
+
+@csrf_exempt
+@require_POST
+async def add_character(request):
+    """Async add_character: the Wikipedia and Wikidata lookups run concurrently over httpx."""
+    data = _json_body(request) or {}
+    name = data.get("name")
+    if not name:
+        return JsonResponse({"error": "Name is required."}, status=400)
+
+    if await sync_to_async(find_character)(name):
+        return JsonResponse({"message": f"Character '{name}' already exists."})
+
+    # Likely typos of an existing name are returned with the new character, or
+    # refused when the client sends "reject_similar": true.
+    suggestions = await sync_to_async(suggest_characters)(name)
+    if suggestions and data.get("reject_similar"):
+        return JsonResponse({
+            "message": f"Character '{name}' looks like an existing character.",
+            "did_you_mean": suggestions,
+        }, status=409)
+
+    try:
+        scraped = await aget_character_info(name)
+        initial_features = await sync_to_async(features_from_wikidata)(scraped.get("details"))
+
+        # The scraped title can differ from the requested name.
+        existing = await sync_to_async(find_character)(scraped["name"])
+        if existing:
+            return JsonResponse({"message": f"Character '{existing.name}' already exists."})
+
+        char = await Character.objects.acreate(
+            name=scraped["name"],
+            description=scraped.get("summary", ""),
+            features=initial_features,
+            added_by="AI Collector"
+        )
+        await sync_to_async(KnowledgeBaseVersion.bump)()
+        response = CharacterSerializer(char).data
+        if suggestions:
+            response["did_you_mean"] = suggestions
+        return JsonResponse(response, status=201)
+    except Exception as e:
+        return JsonResponse({"error": f"Failed to add character: {e}"}, status=500)
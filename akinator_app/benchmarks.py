@@ -0,0 +1,288 @@
+import asyncio
+import json
+import math
+import random
+import statistics
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from django.db import connection, connections
+from django.test import AsyncClient, Client
+from django.test.utils import CaptureQueriesContext, override_settings
+from . import parallel
+from .kb_snapshot import KnowledgeBaseSnapshot, get_snapshot, set_snapshot
+from .knowledge_base import ALL_ANSWERS, best_question
+from .models import Character, Question, KnowledgeBaseVersion
+from .posterior import top_guesses, update_posterior
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a non-empty list."""
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, math.ceil(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def summarize_latencies(latencies_ms):
+    """Reduces a list of latencies (in milliseconds) to the numbers we compare across runs."""
+    if not latencies_ms:
+        return {"runs": 0}
+    return {
+        "runs": len(latencies_ms),
+        "p50_ms": round(percentile(latencies_ms, 50), 3),
+        "p95_ms": round(percentile(latencies_ms, 95), 3),
+        "mean_ms": round(statistics.fmean(latencies_ms), 3),
+        "max_ms": round(max(latencies_ms), 3),
+    }
+
+
+def measure(make_args, func, repeat):
+    """
+    Times `func(*make_args())` `repeat` times.
+
+    Latency, query counts and peak memory are measured in separate passes,
+    because tracemalloc slows everything down and would skew the timings.
+    """
+    cases = [make_args() for _ in range(repeat)]
+
+    latencies = []
+    for args in cases:
+        started = time.perf_counter()
+        func(*args)
+        latencies.append((time.perf_counter() - started) * 1000)
+
+    with CaptureQueriesContext(connection) as queries:
+        func(*cases[0])
+
+    tracemalloc.start()
+    func(*cases[0])
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return summarize_latencies(latencies) | {
+        "queries": len(queries.captured_queries),
+        "peak_memory_kb": round(peak / 1024, 1),
+    }
+
+
+def run_engine_benchmarks(repeat=20, candidate_fraction=0.1, answered=8, seed=0):
+    """
+    Benchmarks the engine entry points against whatever knowledge base is in the database.
+
+    Args:
+        repeat (int): Timed runs per scenario.
+        candidate_fraction (float): Share of characters still in play for the mid-game scenarios.
+        answered (int): Number of answered questions in the top_guesses scenario.
+        seed (int): Random seed for picking candidates and answers.
+
+    Returns:
+        dict: JSON-serializable results, keyed by scenario.
+    """
+    rng = random.Random(seed)
+    all_ids = list(Character.objects.values_list('id', flat=True))
+    questions = list(Question.objects.all())
+    if not all_ids or not questions:
+        raise ValueError("The knowledge base is empty. Generate one with generate_synthetic_kb first.")
+
+    mid_game_size = max(1, int(len(all_ids) * candidate_fraction))
+
+    def mid_game_candidates():
+        return rng.sample(all_ids, mid_game_size)
+
+    def mid_game_posterior():
+        # The state get_result sees: `answered` random answers folded into the posterior.
+        posterior, candidate_ids = {}, mid_game_candidates()
+        for question in rng.sample(questions, min(answered, len(questions))):
+            posterior, candidate_ids = update_posterior(posterior, candidate_ids, question, rng.choice(ALL_ANSWERS))
+        return posterior, candidate_ids, 5
+
+    results = {
+        "best_question_opening": measure(
+            lambda: (all_ids, [], {}), best_question, repeat
+        ),
+        "best_question_mid_game": measure(
+            lambda: (mid_game_candidates(), [], {}), best_question, repeat
+        ),
+        "update_posterior_opening": measure(
+            lambda: ({}, all_ids, rng.choice(questions), rng.choice(["yes", "no"])), update_posterior, repeat
+        ),
+        "top_guesses_mid_game": measure(
+            mid_game_posterior, top_guesses, repeat
+        ),
+    }
+
+    return {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "database": connection.vendor,
+        "knowledge_base": {
+            "characters": len(all_ids),
+            "questions": len(questions),
+            "version": KnowledgeBaseVersion.current(),
+        },
+        "parameters": {
+            "repeat": repeat,
+            "candidate_fraction": candidate_fraction,
+            "answered": answered,
+            "seed": seed,
+        },
+        "results": results,
+    }
+
+
+def run_parallel_benchmark(worker_counts, repeat=5):
+    """
+    Times the opening best_question over the snapshot with different process-pool
+    sizes, to show how entropy evaluation scales with cores. Uses the active
+    snapshot, or compiles one in memory when none is loaded.
+
+    Returns:
+        dict: {workers: latency summary + speedup over one process}
+    """
+    previous_snapshot = get_snapshot()
+    snapshot = previous_snapshot or KnowledgeBaseSnapshot.from_database()
+    set_snapshot(snapshot)
+    all_ids = list(snapshot.character_ids)
+    previous = (parallel.PARALLEL_WORKERS, parallel.PARALLEL_MIN_CELLS)
+
+    results = {}
+    try:
+        for workers in worker_counts:
+            parallel.set_parallelism(workers, min_cells=0)
+            best_question(all_ids, [], {})  # Start the pool outside the timed runs.
+            latencies = []
+            for _ in range(repeat):
+                started = time.perf_counter()
+                best_question(all_ids, [], {})
+                latencies.append((time.perf_counter() - started) * 1000)
+            results[str(workers)] = summarize_latencies(latencies)
+    finally:
+        parallel.set_parallelism(*previous)
+        set_snapshot(previous_snapshot)
+
+    baseline = results[str(worker_counts[0])]["p50_ms"]
+    for stats in results.values():
+        stats["speedup"] = round(baseline / stats["p50_ms"], 2) if stats["p50_ms"] else None
+    return results
+
+
+API_PREFIXES = {"sync": "/api", "async": "/api/async"}
+
+
+def _truthful_answer(features, question_id):
+    # Only the ID is known to the client, so legacy text keys count as unknown.
+    answer = features.get(str(question_id))
+    return answer if answer in ALL_ANSWERS else "dont_know"
+
+
+def _play_api_game(client, prefix, features, max_questions, latencies):
+    """Plays one game through the HTTP API with the sync test client. Returns True on success."""
+    def call(method, path, **kwargs):
+        started = time.perf_counter()
+        response = getattr(client, method)(f"{prefix}{path}", **kwargs)
+        latencies.append((time.perf_counter() - started) * 1000)
+        return response
+
+    response = call("get", "/start_game/")
+    if response.status_code != 200:
+        return False
+    session_id, question = response.json()["session_id"], response.json()["question"]
+    for _ in range(max_questions):
+        response = call("post", "/answer/", content_type="application/json", data={
+            "session_id": session_id, "question_id": question["id"], "answer": _truthful_answer(features, question["id"]),
+        })
+        if response.status_code != 200:
+            return False
+        question = response.json()["next_question"]
+        if not question:
+            break
+    return call("get", "/get_result/", data={"session_id": session_id}).status_code == 200
+
+
+async def _aplay_api_game(client, prefix, features, max_questions, latencies):
+    """Async twin of _play_api_game, for the ASGI client."""
+    async def call(method, path, **kwargs):
+        started = time.perf_counter()
+        response = await getattr(client, method)(f"{prefix}{path}", **kwargs)
+        latencies.append((time.perf_counter() - started) * 1000)
+        return response
+
+    response = await call("get", "/start_game/")
+    if response.status_code != 200:
+        return False
+    session_id, question = response.json()["session_id"], response.json()["question"]
+    for _ in range(max_questions):
+        response = await call("post", "/answer/", content_type="application/json", data={
+            "session_id": session_id, "question_id": question["id"], "answer": _truthful_answer(features, question["id"]),
+        })
+        if response.status_code != 200:
+            return False
+        question = response.json()["next_question"]
+        if not question:
+            break
+    return (await call("get", "/get_result/", data={"session_id": session_id})).status_code == 200
+
+
+def run_api_benchmark(games=100, concurrency=10, max_questions=30, seed=0):
+    """
+    Plays the same games through the sync WSGI endpoints (a thread per
+    concurrent game) and through the async ASGI endpoints (one event loop),
+    using Django's in-process test clients, so no server is needed.
+
+    Returns:
+        dict: {"sync": {...}, "async": {...}} with games/s, errors and request latency.
+    """
+    rng = random.Random(seed)
+    playable = list(Character.objects.exclude(features={}).values_list('features', flat=True)[:1000])
+    if not playable:
+        raise ValueError("No characters with features in the knowledge base.")
+    targets = [rng.choice(playable) for _ in range(games)]
+
+    def summarize(started, outcomes, latencies):
+        elapsed = time.perf_counter() - started
+        return summarize_latencies(latencies) | {
+            "games_per_second": round(len(outcomes) / elapsed, 2),
+            "requests_per_second": round(len(latencies) / elapsed, 2),
+            "failed_games": outcomes.count(False),
+        }
+
+    # --- Sync: the WSGI handler, one thread per in-flight game ---
+    def play_sync(features, latencies):
+        try:
+            return _play_api_game(Client(), API_PREFIXES["sync"], features, max_questions, latencies)
+        except Exception:
+            return False
+        finally:
+            connections.close_all()
+
+    # --- Async: the ASGI handler, every game on one event loop ---
+    async def play_async():
+        client = AsyncClient()
+        semaphore = asyncio.Semaphore(concurrency)
+        latencies = []
+
+        async def play(features):
+            async with semaphore:
+                try:
+                    return await _aplay_api_game(client, API_PREFIXES["async"], features, max_questions, latencies)
+                except Exception:
+                    return False
+
+        started = time.perf_counter()
+        outcomes = await asyncio.gather(*(play(features) for features in targets))
+        return summarize(started, list(outcomes), latencies)
+
+    # The test clients always send "Host: testserver".
+    with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver']):
+        sync_latencies = []
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            outcomes = list(pool.map(lambda features: play_sync(features, sync_latencies), targets))
+        results = {"sync": summarize(started, outcomes, sync_latencies)}
+        results["async"] = asyncio.run(play_async())
+    return results
+
+
+def save_results(results, path):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(results, f, indent=2)
@@ -0,0 +1,61 @@
+import json
+from django.conf import settings
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
+from .models import KnowledgeBaseVersion
+
+# Caching for responses that only change with the knowledge base.
+#
+# Every cache key and ETag embeds the KnowledgeBaseVersion counter, so nothing
+# is ever invalidated explicitly: a bump makes the old entries unreachable and
+# they expire on their own. Clients revalidate with If-None-Match /
+# If-Modified-Since and get a 304 without the payload being rebuilt; a cache
+# miss builds it once per version and stores the encoded JSON, so repeat
+# reads skip both the ORM and the serializers.
+
+CACHE_TIMEOUT = getattr(settings, 'AKINATOR_CACHE_TIMEOUT', 3600)
+CACHE_PREFIX = "akinator"
+
+
+def kb_state(request):
+    """(version, updated_at) of the knowledge base, read once per request."""
+    state = getattr(request, '_akinator_kb_state', None)
+    if state is None:
+        row, _ = KnowledgeBaseVersion.objects.get_or_create(pk=1)
+        state = request._akinator_kb_state = (row.version, row.updated_at)
+    return state
+
+
+def kb_etag(request, *args, **kwargs):
+    """ETag for django.views.decorators.http.condition: the URL's payload only changes with the version."""
+    return f"kb-{kb_state(request)[0]}"
+
+
+def kb_last_modified(request, *args, **kwargs):
+    return kb_state(request)[1]
+
+
+def cached_json(version, key, build):
+    """
+    Returns the JSON encoding of build() for this knowledge-base version,
+    building it only on a cache miss.
+
+    Returns:
+        bytes: The encoded payload.
+    """
+    cache_key = f"{CACHE_PREFIX}:v{version}:{key}"
+    payload = cache.get(cache_key)
+    if payload is None:
+        payload = json.dumps(build(), cls=DjangoJSONEncoder).encode('utf-8')
+        cache.set(cache_key, payload, CACHE_TIMEOUT)
+    return payload
+
+
+def cached_value(version, key, build):
+    """Like cached_json, for values that are not sent to the client as-is."""
+    cache_key = f"{CACHE_PREFIX}:v{version}:{key}"
+    value = cache.get(cache_key)
+    if value is None:
+        value = build()
+        cache.set(cache_key, value, CACHE_TIMEOUT)
+    return value
@@ -0,0 +1,163 @@
+import heapq
+import json
+from django.db import transaction
+from .models import Character, Question, KnowledgeBaseVersion, normalize_name
+from .training import parse_answer
+
+# Knowledge-base compaction for the compact_kb command.
+#
+# Character.features has collected keys the engine no longer needs: legacy
+# question-text keys next to (or instead of) the ID key, texts of questions
+# that were renamed or deleted, IDs of deleted questions, and values that are
+# not answers at all (e.g. legacy booleans). Every one of them is decoded on
+# each snapshot build and database scan. Compaction rewrites each row with
+# only canonical {question_id: answer} pairs, streaming the characters in ID
+# order a batch at a time, and measures coverage and sparsity along the way.
+
+# Legacy boolean features meant a definite answer.
+LEGACY_VALUES = {True: "yes", False: "no"}
+
+
+def canonical_answer(value):
+    """The canonical answer for a stored feature value, or None if it is not one."""
+    if isinstance(value, bool):
+        return LEGACY_VALUES[value]
+    if not isinstance(value, str):
+        return None
+    return parse_answer(value)
+
+
+def question_key_map():
+    """
+    Maps every key that can refer to an existing question (its ID, its text and
+    its normalized text) to the canonical ID key.
+    """
+    keys = {}
+    for question_id, text in Question.objects.values_list('id', 'text'):
+        keys[str(question_id)] = str(question_id)
+        keys.setdefault(text, str(question_id))
+        keys.setdefault(normalize_name(text), str(question_id))
+    return keys
+
+
+def compact_features(features, key_map, counts):
+    """
+    Returns the canonical form of one character's features.
+
+    The ID key wins over a text key for the same question, like in
+    feature_answer. counts is updated with what was dropped or rewritten.
+    """
+    compacted = {}
+    for key, value in (features or {}).items():
+        canonical_key = key_map.get(key) or key_map.get(normalize_name(key))
+        if canonical_key is None:
+            counts["orphan_keys"] += 1
+            continue
+
+        answer = canonical_answer(value)
+        if answer is None:
+            counts["invalid_values"] += 1
+            continue
+        if answer != value:
+            counts["rewritten_values"] += 1
+
+        if canonical_key in compacted:
+            counts["duplicate_keys"] += 1
+            if key != canonical_key:
+                continue
+        elif key != canonical_key:
+            counts["rekeyed"] += 1
+        compacted[canonical_key] = answer
+    return compacted
+
+
+def _encoded_size(features):
+    return len(json.dumps(features or {}, separators=(',', ':')).encode('utf-8'))
+
+
+def compact_knowledge_base(batch_size=500, dry_run=False, top=10):
+    """
+    Rewrites Character.features in canonical form and reports on the result.
+
+    Args:
+        batch_size (int): Characters locked and rewritten per transaction.
+        dry_run (bool): Compute the report without writing anything.
+        top (int): How many of the least covered questions and sparsest characters to list.
+
+    Returns:
+        dict: Counts, bytes before and after, per-question coverage and per-character sparsity.
+    """
+    key_map = question_key_map()
+    questions = dict(Question.objects.values_list('id', 'text'))
+    coverage = dict.fromkeys((str(question_id) for question_id in questions), 0)
+    counts = {"characters": 0, "rewritten": 0, "orphan_keys": 0, "invalid_values": 0,
+              "duplicate_keys": 0, "rekeyed": 0, "rewritten_values": 0}
+    bytes_before = bytes_after = 0
+    answered_total = without_features = 0
+    sparsest = []  # heap of (-answered, -id, name): the `top` characters with the fewest answers
+
+    # --- Step 1: Stream the characters by ID, one locked batch at a time ---
+    last_id = 0
+    while True:
+        with transaction.atomic():
+            batch = list(
+                Character.objects.select_for_update().filter(id__gt=last_id)
+                .order_by('id').only('id', 'name', 'features')[:batch_size]
+            )
+            if not batch:
+                break
+            changed = []
+            for character in batch:
+                compacted = compact_features(character.features, key_map, counts)
+                bytes_before += _encoded_size(character.features)
+                bytes_after += _encoded_size(compacted)
+                if compacted != character.features:
+                    character.features = compacted
+                    changed.append(character)
+
+                # "dont_know" is stored but carries no information, so it does not count as coverage.
+                known = [key for key, answer in compacted.items() if answer != "dont_know"]
+                for key in known:
+                    coverage[key] += 1
+                answered_total += len(known)
+                without_features += not known
+                entry = (-len(known), -character.id, character.name)
+                if len(sparsest) < top:
+                    heapq.heappush(sparsest, entry)
+                elif top:
+                    heapq.heappushpop(sparsest, entry)
+
+            if changed and not dry_run:
+                Character.objects.bulk_update(changed, ['features'])
+            counts["characters"] += len(batch)
+            counts["rewritten"] += len(changed)
+            last_id = batch[-1].id
+
+    # --- Step 2: Coverage per question and sparsity per character ---
+    total = counts["characters"]
+    question_count = len(questions)
+    least_covered = sorted(coverage.items(), key=lambda item: (item[1], int(item[0])))[:top]
+    report = {
+        **counts,
+        "questions": question_count,
+        "bytes_before": bytes_before,
+        "bytes_after": bytes_after,
+        "bytes_saved": bytes_before - bytes_after,
+        "least_covered_questions": [
+            {"id": int(key), "text": questions[int(key)], "characters": covered,
+             "coverage": round(covered / total, 4) if total else 0}
+            for key, covered in least_covered
+        ],
+        "mean_coverage": round(answered_total / (total * question_count), 4) if total and question_count else 0,
+        "characters_without_features": without_features,
+        "sparsest_characters": [
+            {"id": -negative_id, "name": name, "answered": -negative_answered,
+             "sparsity": round(1 + negative_answered / question_count, 4) if question_count else 0}
+            for negative_answered, negative_id, name in sorted(sparsest, reverse=True)
+        ],
+        "dry_run": dry_run,
+    }
+
+    if counts["rewritten"] and not dry_run:
+        report["kb_version"] = KnowledgeBaseVersion.bump()
+    return report
@@ -0,0 +1,84 @@
+from .knowledge_base import best_question, is_game_over
+from .metrics import timed_phase
+from .posterior import is_confident, top_guesses, update_posterior
+
+# The steps of a game turn, shared by the sync views (views.py) and the async
+# ones (async_views.py). These run synchronously: the async views call them
+# through a bounded thread pool.
+
+
+def apply_answer(session, question, answer):
+    """Reweights the session's candidates by one answer and records it. Does not save the session."""
+    # Reweight the candidates by how well they match the answer and drop the unlikely ones.
+    with timed_phase("filtering"):
+        session.posterior, session.possible_character_ids = update_posterior(
+            session.posterior or {}, session.possible_character_ids, question, answer
+        )
+
+    # Save the current answer to the session.
+    # NOTE: session.answers uses the question ID as the key (e.g., {'5': 'yes'}).
+    session.answers[str(question.id)] = answer
+
+
+def choose_next_question(session):
+    """
+    Picks the session's next question after its latest answers, or ends the game.
+
+    Returns:
+        Question: The next question, or None when the game is over.
+    """
+    answers_so_far = session.answers
+    asked_question_ids = list(answers_so_far.keys())
+
+    # Once one candidate is likely enough, guess right away and skip the question selection.
+    next_q = None
+    confident = is_confident(session.posterior, session.possible_character_ids, len(answers_so_far))
+    if not confident:
+        # Find the next best question based on the new, smaller pool of candidates.
+        with timed_phase("question_selection"):
+            next_q = best_question(session.possible_character_ids, asked_question_ids, answers_so_far, session.posterior)
+
+    # End the game if we have no more good questions or are confident in the result.
+    if confident or is_game_over(next_q, session.possible_character_ids, asked_question_ids):
+        session.is_completed = True
+        session.current_question = None
+        return None
+
+    session.current_question = next_q
+    return next_q
+
+
+def advance_game(session, question, answer):
+    """
+    Applies one answer to the session and picks the next question. Does not save the session.
+
+    Returns:
+        Question: The next question, or None when the game is over.
+    """
+    apply_answer(session, question, answer)
+    return choose_next_question(session)
+
+
+def replay_answers(session, answered):
+    """
+    Applies answers given offline (e.g. by the client-side question tree) in
+    order, then picks the next question once. Does not save the session.
+
+    Args:
+        answered (list): (Question, answer) pairs, in the order they were asked.
+
+    Returns:
+        Question: The next question, or None when the game is over.
+    """
+    for question, answer in answered:
+        apply_answer(session, question, answer)
+    return choose_next_question(session)
+
+
+def best_guess(session):
+    """
+    The most likely character ID and its posterior probability, or (None, 0) without candidates.
+    """
+    with timed_phase("scoring"):
+        guesses = top_guesses(session.posterior or {}, session.possible_character_ids or [])
+    return guesses[0] if guesses else (None, 0)
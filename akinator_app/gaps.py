@@ -0,0 +1,184 @@
+import heapq
+import math
+from datetime import timedelta
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from .kb_snapshot import ANSWER_CODES, CODE_ANSWERS, UNKNOWN_CODE, KnowledgeBaseSnapshot, get_snapshot
+from .models import Character, Question, GameSession, FeedbackEvent, GapRankingState, KnowledgeGap
+from .posterior import ANSWER_LIKELIHOODS
+
+# Active-learning queue for curators.
+#
+# An empty (or "dont_know") cell leaves its character in the uninformative
+# bucket of that question: when the character is the one being played and the
+# question is asked, the answer barely moves its posterior, so the game needs
+# extra questions to become confident. Each gap is ranked by the questions per
+# game that filling it is expected to save:
+#
+#   P(character is played) x P(question is asked) x bits an answer would add / bits per question
+#
+# The bits an answer adds are the KL divergence between the player-answer
+# likelihoods of the true answer and those of the empty cell, averaged over
+# the question's known answers. The game statistics come from session history
+# and feedback events, accumulated incrementally in GapRankingState behind an
+# ID watermark; the answer matrix comes from the compiled snapshot.
+
+# How many gaps are kept in the KnowledgeGap table.
+GAP_QUEUE_SIZE = getattr(settings, 'AKINATOR_GAP_QUEUE_SIZE', 500)
+# Sessions younger than this (in seconds) may still be in progress and are left for the next run.
+GAP_SESSION_GRACE = getattr(settings, 'AKINATOR_GAP_SESSION_GRACE', 3600)
+
+UNINFORMATIVE_CODES = (UNKNOWN_CODE, ANSWER_CODES["dont_know"])
+
+
+def update_history(state, chunk_size=2000):
+    """
+    Adds the sessions and feedback events past the watermark to the running totals.
+
+    Returns:
+        tuple: (sessions read, feedback events read)
+    """
+    cutoff = timezone.now() - timedelta(seconds=GAP_SESSION_GRACE)
+    sessions = (
+        GameSession.objects.filter(id__gt=state.last_session_id, created_at__lte=cutoff)
+        .order_by('id').values_list('id', 'answers', 'is_completed')
+    )
+    session_count = 0
+    for session_id, answers, is_completed in sessions.iterator(chunk_size=chunk_size):
+        session_count += 1
+        state.last_session_id = session_id
+        if not answers:
+            continue
+        state.games += 1
+        for question_id in answers:
+            state.question_asks[question_id] = state.question_asks.get(question_id, 0) + 1
+        if is_completed:
+            state.completed_games += 1
+            state.completed_questions += len(answers)
+
+    events = (
+        FeedbackEvent.objects.filter(id__gt=state.last_feedback_id)
+        .order_by('id').values_list('id', 'character_id')
+    )
+    event_count = 0
+    for event_id, character_id in events.iterator(chunk_size=chunk_size):
+        event_count += 1
+        state.last_feedback_id = event_id
+        key = str(character_id)
+        state.target_games[key] = state.target_games.get(key, 0) + 1
+
+    return session_count, event_count
+
+
+def evidence_bits(answer_counts, current=None):
+    """
+    Expected information (in bits) one answer to the question adds about a
+    character whose cell holds `current`, if the cell held its true answer.
+
+    Args:
+        answer_counts (dict): {answer: characters with that answer} for the
+            question, used as the prior over the unknown true answer.
+    """
+    empty = ANSWER_LIKELIHOODS[current]
+    total = sum(answer_counts.values()) + len(answer_counts)
+    bits = 0.0
+    for answer, count in answer_counts.items():
+        row = ANSWER_LIKELIHOODS[answer]
+        divergence = sum(p * math.log2(p / empty[reply]) for reply, p in row.items() if p > 0)
+        bits += (count + 1) / total * divergence  # Laplace-smoothed prior
+    return bits
+
+
+def rank_gaps(state, snapshot, limit=GAP_QUEUE_SIZE):
+    """
+    The `limit` most valuable gaps of the snapshot.
+
+    Returns:
+        list: (turns saved, character ID, question ID, current answer, target share, ask rate, bits), best first.
+    """
+    num_characters = snapshot.num_characters
+    if not num_characters or not snapshot.question_rows or limit < 1:
+        return []
+
+    # Questions a game needs, as log2(candidates) spread over the average game length.
+    mean_questions = state.completed_questions / state.completed_games if state.completed_games else 0
+    bits_per_question = max(math.log2(num_characters) / mean_questions, 0.1) if mean_questions else 1.0
+
+    # Characters in order of how often they are played; unplayed ones share the smoothed minimum.
+    plays = [state.target_games.get(str(char_id), 0) for char_id in snapshot.character_ids]
+    total_plays = sum(plays)
+    by_demand = sorted(range(num_characters), key=lambda index: (-plays[index], index))
+
+    best = []  # min-heap of the `limit` best gaps seen so far
+    for question_index, row in enumerate(snapshot.question_rows):
+        column = snapshot.column(question_index)
+        cells = column.tobytes()
+        counts = {answer: cells.count(bytes([code])) for code, answer in CODE_ANSWERS.items()}
+
+        ask_rate = (state.question_asks.get(str(row["id"]), 0) + 1) / (state.games + 2)
+        bits = {code: evidence_bits(counts, CODE_ANSWERS.get(code)) for code in UNINFORMATIVE_CODES}
+        max_bits = max(bits.values())
+
+        # Walk the characters from most to least played and stop once no gap can enter the heap.
+        for index in by_demand:
+            target_share = (plays[index] + 1) / (total_plays + num_characters)
+            turns = target_share * ask_rate * max_bits / bits_per_question
+            if len(best) >= limit and turns <= best[0][0]:
+                break
+            code = column[index]
+            if code not in UNINFORMATIVE_CODES:
+                continue
+            turns = target_share * ask_rate * bits[code] / bits_per_question
+            entry = (turns, snapshot.character_ids[index], row["id"], CODE_ANSWERS.get(code),
+                     target_share, ask_rate, bits[code])
+            if len(best) < limit:
+                heapq.heappush(best, entry)
+            elif turns > best[0][0]:
+                heapq.heapreplace(best, entry)
+
+    return sorted(best, reverse=True)
+
+
+def refresh_knowledge_gaps(limit=GAP_QUEUE_SIZE, full=False):
+    """
+    Folds the new game history into GapRankingState and rewrites the KnowledgeGap queue.
+
+    Args:
+        limit (int): Gaps kept in the queue.
+        full (bool): Forget the running totals and re-read the whole history.
+
+    Returns:
+        dict: Sessions and feedback events read, and the number of gaps stored.
+    """
+    with transaction.atomic():
+        GapRankingState.objects.get_or_create(pk=1)
+        state = GapRankingState.objects.select_for_update().get(pk=1)
+        if full:
+            state = GapRankingState(pk=1)
+        sessions, events = update_history(state)
+        state.save()
+
+        snapshot = get_snapshot() or KnowledgeBaseSnapshot.from_database()
+        ranked = rank_gaps(state, snapshot, limit=limit)
+
+        # Skip characters and questions deleted since the snapshot was compiled.
+        characters = set(Character.objects.filter(id__in={entry[1] for entry in ranked}).values_list('id', flat=True))
+        questions = set(Question.objects.filter(id__in={entry[2] for entry in ranked}).values_list('id', flat=True))
+        KnowledgeGap.objects.all().delete()
+        KnowledgeGap.objects.bulk_create([
+            KnowledgeGap(
+                character_id=character_id, question_id=question_id, current_answer=current,
+                expected_turns_saved=turns, target_share=target_share, ask_rate=ask_rate, evidence_bits=bits,
+            )
+            for turns, character_id, question_id, current, target_share, ask_rate, bits in ranked
+            if character_id in characters and question_id in questions
+        ], batch_size=1000)
+
+    return {
+        "sessions": sessions,
+        "feedback_events": events,
+        "games": state.games,
+        "gaps": KnowledgeGap.objects.count(),
+        "kb_version": snapshot.kb_version,
+    }
@@ -0,0 +1,321 @@
+import io
+import json
+import logging
+import mmap
+import os
+import struct
+import tempfile
+import threading
+import time
+from array import array
+from django.conf import settings
+from django.db import connection
+from django.utils.functional import cached_property
+from .models import ANSWER_CHOICES, Character, Question, KnowledgeBaseVersion
+
+logger = logging.getLogger(__name__)
+
+# Compiled knowledge-base snapshots.
+#
+# compile_kb writes the whole knowledge base into one binary file that every
+# gunicorn worker maps with mmap, so the pages are shared between workers and
+# loading is near-instant. Layout (native byte order):
+#
+#   b"AKKB" | u32 format | u32 header length | JSON header | padding to 8 bytes
+#   character ids    int64 x C, sorted ascending
+#   name offsets     int64 x (C + 1) into the name table
+#   name table       UTF-8 names, back to back
+#   answer matrix    uint8 x Q x C, question-major: one contiguous column per question
+#
+# Matrix cells hold 0 for "no answer", otherwise 1 + the answer's index in ANSWER_CHOICES.
+
+MAGIC = b"AKKB"
+FORMAT_VERSION = 1
+PREAMBLE = struct.Struct("=4sII")
+
+ANSWER_CODES = {answer: code for code, answer in enumerate(ANSWER_CHOICES, start=1)}
+CODE_ANSWERS = {code: answer for answer, code in ANSWER_CODES.items()}
+UNKNOWN_CODE = 0
+
+SNAPSHOT_PATH = getattr(settings, 'AKINATOR_KB_SNAPSHOT_PATH', None)
+# How often (in seconds) a worker checks whether compile_kb swapped in a new file.
+SNAPSHOT_CHECK_INTERVAL = getattr(settings, 'AKINATOR_KB_SNAPSHOT_CHECK_INTERVAL', 1.0)
+
+
+def _pad(length):
+    return (-length) % 8
+
+
+def compile_snapshot(fileobj, chunk_size=2000):
+    """
+    Streams the knowledge base out of the database and writes a snapshot to `fileobj`.
+
+    Returns:
+        dict: The snapshot header.
+    """
+    # Imported here because knowledge_base imports this module.
+    from .knowledge_base import feature_answer
+
+    kb_version = KnowledgeBaseVersion.current()
+    questions = list(
+        Question.objects.order_by('id').prefetch_related('prerequisite_questions', 'contradictory_questions')
+    )
+
+    # --- Step 1: Stream the characters into per-question columns ---
+    character_ids = []
+    names = bytearray()
+    name_offsets = [0]
+    columns = [bytearray() for _ in questions]
+    rows = Character.objects.order_by('id').values_list('id', 'name', 'features')
+    for char_id, name, features in rows.iterator(chunk_size=chunk_size):
+        features = features or {}
+        character_ids.append(char_id)
+        names += name.encode('utf-8')
+        name_offsets.append(len(names))
+        for column, question in zip(columns, questions):
+            column.append(ANSWER_CODES.get(feature_answer(features, question), UNKNOWN_CODE))
+
+    # --- Step 2: Lay out the sections ---
+    header = {
+        "kb_version": kb_version,
+        "compiled_at": time.time(),
+        "num_characters": len(character_ids),
+        "questions": [
+            {
+                "id": q.id,
+                "text": q.text,
+                "popularity": q.popularity,
+                "information_value": q.information_value,
+                "answer_rate": q.answer_rate,
+                "dont_know_rate": q.dont_know_rate,
+                "prerequisites": [prereq.id for prereq in q.prerequisite_questions.all()],
+                "contradictions": [contra.id for contra in q.contradictory_questions.all()],
+            }
+            for q in questions
+        ],
+    }
+    # Section offsets depend on the header length, which depends on the offsets,
+    # so they are stored relative to the end of the padded header.
+    ids_size = 8 * len(character_ids)
+    offsets_size = 8 * len(name_offsets)
+    header["sections"] = {
+        "character_ids": 0,
+        "name_offsets": ids_size,
+        "names": ids_size + offsets_size,
+        "matrix": ids_size + offsets_size + len(names) + _pad(len(names)),
+    }
+    header_bytes = json.dumps(header, separators=(",", ":")).encode('utf-8')
+
+    # --- Step 3: Write everything out ---
+    fileobj.write(PREAMBLE.pack(MAGIC, FORMAT_VERSION, len(header_bytes)))
+    fileobj.write(header_bytes)
+    fileobj.write(b"\0" * _pad(PREAMBLE.size + len(header_bytes)))
+    fileobj.write(array('q', character_ids).tobytes())
+    fileobj.write(array('q', name_offsets).tobytes())
+    fileobj.write(names)
+    fileobj.write(b"\0" * _pad(len(names)))
+    for column in columns:
+        fileobj.write(column)
+    return header
+
+
+def write_snapshot(path, chunk_size=2000):
+    """
+    Compiles a snapshot to `path` atomically: the file is written next to the
+    target and renamed over it, so workers only ever map complete snapshots.
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.kb-', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            header = compile_snapshot(f, chunk_size=chunk_size)
+            f.flush()
+            os.fsync(f.fileno())
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+    return header
+
+
+class KnowledgeBaseSnapshot:
+    """
+    Read-only view over a compiled snapshot. `buffer` is either an mmap of a
+    snapshot file or the bytes of a snapshot compiled in memory.
+    """
+
+    def __init__(self, buffer):
+        view = memoryview(buffer)
+        magic, format_version, header_length = PREAMBLE.unpack_from(view, 0)
+        if magic != MAGIC or format_version != FORMAT_VERSION:
+            raise ValueError("Not a knowledge-base snapshot, or an unsupported format version.")
+
+        header_end = PREAMBLE.size + header_length
+        header = json.loads(bytes(view[PREAMBLE.size:header_end]))
+        base = header_end + _pad(header_end)
+        sections = header["sections"]
+        num_characters = header["num_characters"]
+
+        self.buffer = buffer
+        # Set when the snapshot maps a compiled file: its path and (inode, mtime).
+        self.path = None
+        self.file_id = None
+        self.kb_version = header["kb_version"]
+        self.num_characters = num_characters
+        self.character_ids = view[base:base + 8 * num_characters].cast('q')
+        offsets_start = base + sections["name_offsets"]
+        self._name_offsets = view[offsets_start:offsets_start + 8 * (num_characters + 1)].cast('q')
+        self._names = view[base + sections["names"]:base + sections["matrix"]]
+        self._matrix = view[base + sections["matrix"]:]
+
+        self.question_rows = header["questions"]
+        self.question_index = {q["id"]: i for i, q in enumerate(self.question_rows)}
+
+    @classmethod
+    def open(cls, path):
+        with open(path, 'rb') as f:
+            snapshot = cls(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+            stat = os.fstat(f.fileno())
+        snapshot.path = path
+        snapshot.file_id = (stat.st_ino, stat.st_mtime_ns)
+        return snapshot
+
+    @classmethod
+    def from_database(cls):
+        """Compiles a snapshot straight into memory, without touching the filesystem."""
+        buffer = io.BytesIO()
+        compile_snapshot(buffer)
+        return cls(buffer.getvalue())
+
+    @cached_property
+    def index_of(self):
+        """{character_id: matrix position}, built lazily once per process."""
+        return {char_id: i for i, char_id in enumerate(self.character_ids)}
+
+    def indices(self, candidate_ids):
+        """Maps character IDs to matrix positions. IDs compiled after the snapshot are skipped."""
+        index_of = self.index_of
+        return [index_of[char_id] for char_id in candidate_ids if char_id in index_of]
+
+    def name(self, index):
+        return bytes(self._names[self._name_offsets[index]:self._name_offsets[index + 1]]).decode('utf-8')
+
+    def column(self, question_index):
+        start = question_index * self.num_characters
+        return self._matrix[start:start + self.num_characters]
+
+    def codes(self, question_index, indices):
+        """The answer codes of the given characters for one question, as bytes."""
+        return bytes(map(self.column(question_index).__getitem__, indices))
+
+    def answer_code(self, question_index, index):
+        return self.column(question_index)[index]
+
+    def question(self, question_index):
+        """An unsaved Question instance built from the snapshot, so no query is needed."""
+        row = self.question_rows[question_index]
+        return Question(
+            id=row["id"],
+            text=row["text"],
+            popularity=row["popularity"],
+            information_value=row["information_value"],
+            answer_rate=row["answer_rate"],
+            dont_know_rate=row["dont_know_rate"],
+        )
+
+    def valid_question_indices(self, asked_question_ids, answers_so_far):
+        """The unasked questions whose prerequisite and contradiction rules allow them."""
+        asked = {int(q_id) for q_id in asked_question_ids}
+        valid = []
+        for i, row in enumerate(self.question_rows):
+            if row["id"] in asked:
+                continue
+            if any(answers_so_far.get(str(prereq)) != 'yes' for prereq in row["prerequisites"]):
+                continue
+            if any(answers_so_far.get(str(contra)) == 'yes' for contra in row["contradictions"]):
+                continue
+            valid.append(i)
+        return valid
+
+
+_snapshot_lock = threading.Lock()
+_snapshot = None
+_snapshot_file_id = None
+_snapshot_checked_at = 0.0
+_rebuild_thread = None
+
+
+def set_snapshot(snapshot):
+    """Installs a snapshot for this process, e.g. one compiled in memory at startup."""
+    global _snapshot
+    with _snapshot_lock:
+        _snapshot = snapshot
+
+
+def _rebuild(stale):
+    """
+    Compiles the current knowledge base and swaps it in for `stale`. Runs in a
+    background thread, so requests keep using `stale` in the meantime.
+    """
+    global _snapshot, _rebuild_thread
+    try:
+        snapshot = KnowledgeBaseSnapshot.from_database()
+        snapshot.index_of  # Built here rather than by the first request after the swap.
+        with _snapshot_lock:
+            # Leave it alone if someone installed another snapshot (or none) meanwhile.
+            if _snapshot is stale:
+                _snapshot = snapshot
+    except Exception:
+        logger.exception("Rebuilding the knowledge-base snapshot failed; keeping v%s.", stale.kb_version)
+    finally:
+        connection.close()  # This thread's own connection.
+        with _snapshot_lock:
+            _rebuild_thread = None
+
+
+def get_snapshot():
+    """
+    Returns the active snapshot, or None when the engine should read the database.
+
+    When AKINATOR_KB_SNAPSHOT_PATH is set, the file is re-checked at most every
+    AKINATOR_KB_SNAPSHOT_CHECK_INTERVAL seconds. compile_kb replaces it with a
+    rename, so a changed inode means a new version: it is mapped and swapped in,
+    while requests that still hold the old snapshot finish on the old pages.
+
+    A snapshot compiled in memory (see warmup) is instead rebuilt in a background
+    thread when the knowledge-base version moves on. Requests keep getting the
+    old snapshot until the new one is swapped in.
+    """
+    global _snapshot, _snapshot_file_id, _snapshot_checked_at, _rebuild_thread
+    if not SNAPSHOT_PATH and _snapshot is None:
+        return None
+
+    now = time.monotonic()
+    if now - _snapshot_checked_at < SNAPSHOT_CHECK_INTERVAL:
+        return _snapshot
+
+    if not SNAPSHOT_PATH:
+        _snapshot_checked_at = now
+        snapshot = _snapshot
+        if snapshot is not None and snapshot.kb_version != KnowledgeBaseVersion.current():
+            with _snapshot_lock:
+                if _rebuild_thread is None and _snapshot is snapshot:
+                    _rebuild_thread = threading.Thread(
+                        target=_rebuild, args=(snapshot,), name="kb-snapshot-rebuild", daemon=True,
+                    )
+                    _rebuild_thread.start()
+        return snapshot
+
+    with _snapshot_lock:
+        _snapshot_checked_at = now
+        try:
+            stat = os.stat(SNAPSHOT_PATH)
+        except FileNotFoundError:
+            return _snapshot
+        file_id = (stat.st_ino, stat.st_mtime_ns)
+        if file_id != _snapshot_file_id:
+            _snapshot = KnowledgeBaseSnapshot.open(SNAPSHOT_PATH)
+            _snapshot_file_id = file_id
+    return _snapshot
@@ -0,0 +1,244 @@
+import gzip
+import json
+import sys
+from django.db import transaction
+from django.utils import timezone
+from .models import ANSWER_CHOICES, Character, Question, KnowledgeBaseVersion, normalize_name
+
+# Portable knowledge-base dumps.
+#
+# A dump is NDJSON: one JSON object per line, tagged with a "type". The header
+# comes first, then every question, then the question rules, then the
+# characters, so an import can resolve each line against what it has already
+# written. Database IDs differ between environments, so rules and character
+# features refer to questions by their text.
+#
+#   {"type": "header", "format": "akinator-kb", "format_version": 1, "kb_version": 12, ...}
+#   {"type": "question", "text": "Is your character real?", "popularity": 0.2, ...}
+#   {"type": "rule", "kind": "prerequisite", "question": "...", "depends_on": "..."}
+#   {"type": "character", "name": "Marie Curie", "features": {"Is your character real?": "yes"}, ...}
+
+FORMAT = "akinator-kb"
+FORMAT_VERSION = 1
+QUESTION_FIELDS = ['popularity', 'information_value', 'answer_rate', 'dont_know_rate']
+# Rule kind -> the Question M2M field it is stored in.
+RULE_FIELDS = {"prerequisite": "prerequisite_questions", "contradiction": "contradictory_questions"}
+GZIP_MAGIC = b"\x1f\x8b"
+# Order of the record types in a dump.
+RECORD_TYPES = ["question", "rule", "character"]
+
+
+def open_dump(path, mode):
+    """
+    Opens a dump for text I/O. "-" is stdin/stdout. Paths ending in .gz are
+    written compressed; compressed input is detected from its first bytes.
+    """
+    if path == '-':
+        stream = sys.stdout if mode == 'w' else sys.stdin
+        return open(stream.fileno(), mode, encoding='utf-8', closefd=False)
+    if mode == 'w':
+        if path.endswith('.gz'):
+            return gzip.open(path, 'wt', encoding='utf-8')
+        return open(path, 'w', encoding='utf-8')
+    with open(path, 'rb') as f:
+        compressed = f.read(2) == GZIP_MAGIC
+    return gzip.open(path, 'rt', encoding='utf-8') if compressed else open(path, 'r', encoding='utf-8')
+
+
+def export_records(chunk_size=2000, stats=None):
+    """
+    Yields the knowledge base as dump records, streaming the characters so
+    memory stays flat however large the table is.
+
+    Args:
+        stats (dict): If given, filled with {"questions", "rules", "characters", "orphan_features"}.
+    """
+    stats = stats if stats is not None else {}
+    stats.update(questions=0, rules=0, characters=0, orphan_features=0)
+
+    yield {
+        "type": "header",
+        "format": FORMAT,
+        "format_version": FORMAT_VERSION,
+        "kb_version": KnowledgeBaseVersion.current(),
+        "exported_at": timezone.now().isoformat(),
+    }
+
+    # --- Step 1: Questions (a few thousand at most, so the ID map fits in memory) ---
+    texts = {}
+    for question in Question.objects.order_by('id').iterator(chunk_size=chunk_size):
+        texts[question.id] = question.text
+        stats["questions"] += 1
+        yield {"type": "question", "text": question.text} | {field: getattr(question, field) for field in QUESTION_FIELDS}
+
+    # --- Step 2: Rules ---
+    for kind, field in RULE_FIELDS.items():
+        through = getattr(Question, field).through
+        rows = through.objects.order_by('id').values_list('from_question_id', 'to_question_id')
+        for question_id, other_id in rows.iterator(chunk_size=chunk_size):
+            stats["rules"] += 1
+            yield {"type": "rule", "kind": kind, "question": texts[question_id], "depends_on": texts[other_id]}
+
+    # --- Step 3: Characters, with features re-keyed by question text ---
+    known_texts = set(texts.values())
+    rows = Character.objects.order_by('id').values_list('name', 'description', 'added_by', 'features')
+    for name, description, added_by, features in rows.iterator(chunk_size=chunk_size):
+        portable = {}
+        for key, answer in (features or {}).items():
+            if key.isdigit() and int(key) in texts:
+                # The ID key wins over a legacy text key, like in feature_answer.
+                portable[texts[int(key)]] = answer
+            elif key in known_texts:
+                portable.setdefault(key, answer)
+            else:
+                stats["orphan_features"] += 1
+        stats["characters"] += 1
+        yield {"type": "character", "name": name, "description": description, "added_by": added_by, "features": portable}
+
+
+def write_records(records, fileobj):
+    for record in records:
+        fileobj.write(json.dumps(record, ensure_ascii=False, separators=(',', ':')))
+        fileobj.write('\n')
+
+
+class KnowledgeBaseImporter:
+    """
+    Applies a dump in batches: questions and characters are upserted by text
+    and by normalized name, rules are added if missing. Existing characters
+    keep the features the dump does not mention, unless replace_features is set.
+    """
+
+    def __init__(self, batch_size=1000, replace_features=False):
+        self.batch_size = batch_size
+        self.replace_features = replace_features
+        self.pending = {kind: [] for kind in RECORD_TYPES}
+        self.question_ids = None
+        self.counts = {"questions": 0, "rules": 0, "characters_created": 0, "characters_updated": 0,
+                       "skipped_features": 0, "invalid_lines": 0}
+
+    def add(self, record):
+        kind = record.get("type")
+        if kind == "header":
+            if record.get("format") != FORMAT or record.get("format_version", 0) > FORMAT_VERSION:
+                raise ValueError(f"Unsupported dump: {record.get('format')} v{record.get('format_version')}.")
+            return
+        if kind not in self.pending:
+            self.counts["invalid_lines"] += 1
+            return
+        # Everything a record can refer to must be written first.
+        for earlier in RECORD_TYPES[:RECORD_TYPES.index(kind)]:
+            self.flush(earlier)
+        self.pending[kind].append(record)
+        if len(self.pending[kind]) >= self.batch_size:
+            self.flush(kind)
+
+    def flush(self, kind=None):
+        for name in ([kind] if kind else RECORD_TYPES):
+            batch, self.pending[name] = self.pending[name], []
+            if batch:
+                with transaction.atomic():
+                    getattr(self, f"_apply_{name}s")(batch)
+
+    def _resolve(self, text):
+        if self.question_ids is None:
+            self.question_ids = dict(Question.objects.values_list('text', 'id'))
+        return self.question_ids.get(text)
+
+    def _apply_questions(self, batch):
+        by_text = {record["text"]: record for record in batch if record.get("text")}
+        self.counts["invalid_lines"] += len(batch) - len(by_text)
+        questions = [
+            Question(text=text, **{field: record.get(field, 0.0) for field in QUESTION_FIELDS})
+            for text, record in by_text.items()
+        ]
+        Question.objects.bulk_create(
+            questions, update_conflicts=True, unique_fields=['text'], update_fields=QUESTION_FIELDS,
+        )
+        self.counts["questions"] += len(questions)
+        self.question_ids = None  # New questions may have been created.
+
+    def _apply_rules(self, batch):
+        rows = {field: [] for field in RULE_FIELDS.values()}
+        for record in batch:
+            field = RULE_FIELDS.get(record.get("kind"))
+            question_id, other_id = self._resolve(record.get("question")), self._resolve(record.get("depends_on"))
+            if field is None or question_id is None or other_id is None:
+                self.counts["invalid_lines"] += 1
+                continue
+            through = getattr(Question, field).through
+            rows[field].append(through(from_question_id=question_id, to_question_id=other_id))
+        for field, through_rows in rows.items():
+            getattr(Question, field).through.objects.bulk_create(through_rows, ignore_conflicts=True)
+            self.counts["rules"] += len(through_rows)
+
+    def _apply_characters(self, batch):
+        # --- Step 1: Resolve the features to question IDs ---
+        incoming = {}
+        for record in batch:
+            name = ' '.join((record.get("name") or '').split())
+            if not name:
+                self.counts["invalid_lines"] += 1
+                continue
+            features = {}
+            for text, answer in (record.get("features") or {}).items():
+                question_id = self._resolve(text)
+                if question_id is None or answer not in ANSWER_CHOICES:
+                    self.counts["skipped_features"] += 1
+                else:
+                    features[str(question_id)] = answer
+            incoming[normalize_name(name)] = (name, record, features)
+
+        # --- Step 2: Update the characters that exist, create the rest ---
+        existing = {
+            character.name_key: character
+            for character in Character.objects.filter(name_key__in=incoming.keys())
+        }
+        to_update, to_create = [], []
+        for name_key, (name, record, features) in incoming.items():
+            character = existing.get(name_key)
+            if character is None:
+                to_create.append(Character(
+                    name=name, name_key=name_key, features=features,
+                    description=record.get("description"), added_by=record.get("added_by") or 'import_kb',
+                ))
+                continue
+            character.features = features if self.replace_features else (character.features or {}) | features
+            if record.get("description"):
+                character.description = record["description"]
+            to_update.append(character)
+
+        Character.objects.bulk_update(to_update, ['features', 'description'])
+        Character.objects.bulk_create(to_create)
+        self.counts["characters_updated"] += len(to_update)
+        self.counts["characters_created"] += len(to_create)
+
+
+def import_records(lines, batch_size=1000, replace_features=False, progress=None):
+    """
+    Imports a dump from an iterable of NDJSON lines.
+
+    Args:
+        progress (callable): Called with the running counts after every 10 batches of lines.
+
+    Returns:
+        dict: Counts of what was written.
+    """
+    importer = KnowledgeBaseImporter(batch_size=batch_size, replace_features=replace_features)
+    for line_number, line in enumerate(lines, start=1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except json.JSONDecodeError:
+            importer.counts["invalid_lines"] += 1
+            continue
+        importer.add(record)
+        if progress and line_number % (batch_size * 10) == 0:
+            progress(importer.counts)
+    importer.flush()
+
+    counts = importer.counts
+    if counts["questions"] or counts["rules"] or counts["characters_created"] or counts["characters_updated"]:
+        counts["kb_version"] = KnowledgeBaseVersion.bump()
+    return counts
@@ -1,13 +1,66 @@
 import math
 import random
+from django.conf import settings
+from django.db import connection
+from django.db.models import F, Func, Q, TextField, Value
 from .models import Character, Question
+from .metrics import record_candidates
+from .kb_snapshot import ANSWER_CODES, CODE_ANSWERS, get_snapshot
+from .parallel import parallel_best_by_entropy, should_parallelize
 
 ALL_ANSWERS = ["yes", "no", "dont_know", "probably", "probably_not"]
 
+# Maximum number of questions scored exactly per turn. Larger pools are pruned to the
+# questions with the best offline statistics (see recompute_question_stats).
+QUESTION_POOL_SIZE = getattr(settings, 'AKINATOR_QUESTION_POOL_SIZE', 200)
+
+# How many questions ahead the engine plans. 1 is plain greedy entropy; 2 picks the
+# question that leaves the lowest expected posterior entropy after the best follow-up
+# (see lookahead.py). Lookahead only runs on the compiled snapshot, and only over the
+# top-k questions by entropy.
+LOOKAHEAD_DEPTH = getattr(settings, 'AKINATOR_LOOKAHEAD_DEPTH', 1)
+LOOKAHEAD_TOP_K = getattr(settings, 'AKINATOR_LOOKAHEAD_TOP_K', 10)
+
+def feature_answer(features, question):
+    """
+    Returns a character's answer for a question. Features are keyed by question
+    ID, but older rows still use the question text as the key.
+    """
+    return features.get(str(question.id)) or features.get(question.text)
+
 def calculate_entropy(probabilities):
     """Calculates the Shannon entropy for a list of probabilities."""
     return -sum(p * math.log2(p) for p in probabilities if p > 0)
 
+def distribution_from_codes(codes, total_candidates):
+    """
+    Same as calculate_answer_distribution, for answer codes read from a compiled
+    snapshot. Candidates without a code (unknown cells, or characters added after
+    the snapshot was compiled) count as "dont_know".
+    """
+    if total_candidates == 0:
+        return [0.0] * len(ALL_ANSWERS)
+    counts = [codes.count(ANSWER_CODES[answer]) for answer in ALL_ANSWERS]
+    counts[ALL_ANSWERS.index("dont_know")] += total_candidates - sum(counts)
+    return [count / total_candidates for count in counts]
+
+def prune_question_pool(pool, stats):
+    """
+    Keeps the QUESTION_POOL_SIZE questions with the best offline statistics, plus
+    every question that has none yet (information_value 0: new, or added since the
+    last recompute_question_stats run), so those still get asked and scored.
+
+    Args:
+        pool (list): Questions, or snapshot question indices.
+        stats (callable): Maps an item to its (information_value, dont_know_rate).
+    """
+    if not QUESTION_POOL_SIZE or len(pool) <= QUESTION_POOL_SIZE:
+        return pool
+    scored = [item for item in pool if stats(item)[0]]
+    unscored = [item for item in pool if not stats(item)[0]]
+    scored.sort(key=lambda item: stats(item)[0] * (1 - stats(item)[1]), reverse=True)
+    return scored[:QUESTION_POOL_SIZE] + unscored
+
 def calculate_answer_distribution(question, candidate_characters):
     """
     Calculates the distribution of answers for a single question based on a list
@@ -22,7 +75,7 @@ def calculate_answer_distribution(question, candidate_characters):
     # Count answers in memory
     for char in candidate_characters:
         features = char.features or {}
-        answer = features.get(str(question.id))
+        answer = feature_answer(features, question)
         if answer in answer_counts:
             answer_counts[answer] += 1
         else:
@@ -31,7 +84,7 @@ def calculate_answer_distribution(question, candidate_characters):
     # Return the probability distribution
     return [count / total_candidates for count in answer_counts.values()]
 
-def best_question(candidate_ids, asked_question_ids, answers_so_far):
+def best_question(candidate_ids, asked_question_ids, answers_so_far, posterior=None):
     """
     Finds the best question to ask next by maximizing information gain (entropy)
     while respecting logical dependencies between questions.
@@ -40,13 +93,20 @@ def best_question(candidate_ids, asked_question_ids, answers_so_far):
         candidate_ids (list): IDs of characters that are still possible candidates.
         asked_question_ids (list): IDs of questions that have already been asked.
         answers_so_far (dict): A dictionary of {question_id: answer} for the current session.
+        posterior (dict): The session's posterior, used by the depth-2 lookahead to weigh the candidates.
     
     Returns:
         Question: The best Question object to ask next, or None.
     """
+    record_candidates(len(candidate_ids))
     if not candidate_ids:
         return None
 
+    # Use the compiled knowledge base when one is loaded; it needs no queries at all.
+    snapshot = get_snapshot()
+    if snapshot is not None:
+        return _best_question_from_snapshot(snapshot, candidate_ids, asked_question_ids, answers_so_far, posterior)
+
     # --- Step 1: Efficiently fetch all candidate data in one query ---
     candidate_chars = list(Character.objects.filter(id__in=candidate_ids))
     
@@ -89,6 +149,13 @@ def best_question(candidate_ids, asked_question_ids, answers_so_far):
     if not logically_valid_qs:
         return None
 
+    # --- Step 3b: Prune large pools using the offline question statistics ---
+    # Questions that split the whole knowledge base well and that players can
+    # actually answer are scored first; the rest are skipped, except unscored ones.
+    logically_valid_qs = prune_question_pool(
+        logically_valid_qs, lambda question: (question.information_value, question.dont_know_rate)
+    )
+
     # --- Step 4: Calculate entropy for each valid question ---
     best_q = None
     max_entropy = -1
@@ -108,3 +175,122 @@ def best_question(candidate_ids, asked_question_ids, answers_so_far):
 
     return best_q
 
+
+def _best_question_from_snapshot(snapshot, candidate_ids, asked_question_ids, answers_so_far, posterior=None):
+    """best_question over a compiled snapshot: same rules, pruning and scoring, no queries."""
+    indices = snapshot.indices(candidate_ids)
+    valid = snapshot.valid_question_indices(asked_question_ids, answers_so_far)
+    if not valid:
+        return None
+
+    rows = snapshot.question_rows
+    valid = prune_question_pool(valid, lambda i: (rows[i]["information_value"], rows[i]["dont_know_rate"]))
+
+    if LOOKAHEAD_DEPTH >= 2 and len(candidate_ids) > 2:
+        from .lookahead import select_with_lookahead  # lookahead.py imports this module.
+        return snapshot.question(select_with_lookahead(snapshot, candidate_ids, valid, posterior, LOOKAHEAD_TOP_K))
+
+    # Huge pools are split across the process pool (see parallel.py).
+    if should_parallelize(len(indices), len(valid)):
+        _, best_index = parallel_best_by_entropy(snapshot, indices, len(candidate_ids), valid)
+    else:
+        _, best_index = best_by_entropy(snapshot, indices, len(candidate_ids), valid)
+
+    return snapshot.question(best_index)
+
+def set_lookahead(depth, top_k=None):
+    """Changes the lookahead depth at runtime (used by simulate_games)."""
+    global LOOKAHEAD_DEPTH, LOOKAHEAD_TOP_K
+    LOOKAHEAD_DEPTH = depth
+    if top_k is not None:
+        LOOKAHEAD_TOP_K = top_k
+
+def best_by_entropy(snapshot, indices, total_candidates, question_indices):
+    """
+    Scores snapshot questions by the entropy of their answers over the candidates.
+
+    Returns:
+        tuple: (max entropy, index of the best question)
+    """
+    best_index = None
+    max_entropy = -1
+    for question_index in question_indices:
+        probabilities = distribution_from_codes(snapshot.codes(question_index, indices), total_candidates)
+        current_entropy = calculate_entropy(probabilities)
+        if current_entropy > max_entropy:
+            max_entropy = current_entropy
+            best_index = question_index
+    return max_entropy, best_index
+
+def is_game_over(next_question, candidate_ids, asked_question_ids):
+    """
+    The game ends when there is no good question left, or when a single
+    candidate remains after enough questions to be confident.
+    """
+    return not next_question or (len(candidate_ids) < 2 and len(asked_question_ids) > 5)
+
+def candidate_answers(candidate_ids, question):
+    """
+    Yields (character ID, recorded answer) for the candidates that have an answer
+    to the question; candidates without one are skipped.
+
+    Reads the compiled snapshot when it has the question. On Postgres the
+    answering characters are found with an index-served containment query and
+    only their two answer keys come back; elsewhere the features are streamed.
+    """
+    snapshot = get_snapshot()
+    if snapshot is not None and question.id in snapshot.question_index:
+        column = snapshot.column(snapshot.question_index[question.id])
+        index_of = snapshot.index_of
+        for char_id in candidate_ids:
+            index = index_of.get(char_id)
+            # Characters added after the snapshot was compiled have no known answers.
+            if index is not None and column[index]:
+                yield char_id, CODE_ANSWERS[column[index]]
+        return
+
+    if connection.vendor == 'postgresql':
+        for char_id, by_id, by_text in _answer_rows(candidate_ids, question).iterator(chunk_size=2000):
+            yield char_id, by_id or by_text
+        return
+
+    # --- SQLITE WORKAROUND ---
+    # SQLite does not support __contains on JSON fields, so the features are
+    # read in Python. Only the id and features columns are streamed, never whole rows.
+    rows = Character.objects.filter(id__in=candidate_ids).values_list('id', 'features')
+    for char_id, features in rows.iterator(chunk_size=2000):
+        answer = feature_answer(features or {}, question)
+        if answer:
+            yield char_id, answer
+
+def _answer_rows(candidate_ids, question):
+    """Postgres: (id, answer by ID key, answer by text key) of the candidates that answer the question."""
+    return (
+        Character.objects.filter(_answering(question, ALL_ANSWERS), id__in=candidate_ids)
+        .annotate(by_id=_answer_text(str(question.id)), by_text=_answer_text(question.text))
+        .values_list('id', 'by_id', 'by_text')
+    )
+
+def _answer_text(key):
+    """
+    Expression for features->>key on Postgres. KeyTextTransform would send a
+    digit-only key such as a question ID as an array index (->> 5), which never
+    matches an object key; jsonb_extract_path_text always takes the key as text.
+    """
+    return Func(F('features'), Value(key), function='jsonb_extract_path_text', output_field=TextField())
+
+def _answering(question, values):
+    """
+    Q for the characters whose recorded answer to `question` is one of `values`.
+
+    Only positive JSONB containment (@>) is used, which the GIN jsonb_path_ops
+    index on Character.features can serve; a negated containment cannot.
+    """
+    id_key = str(question.id)
+    by_id = Q()
+    by_text = Q()
+    for value in values:
+        by_id |= Q(features__contains={id_key: value})
+        by_text |= Q(features__contains={question.text: value})
+    # Same lookup order as feature_answer: the ID key wins, the legacy text key is the fallback.
+    return by_id | (by_text & ~Q(features__has_key=id_key))
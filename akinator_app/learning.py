@@ -0,0 +1,205 @@
+import logging
+from collections import Counter, defaultdict
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from .knowledge_base import feature_answer
+from .models import ANSWER_CHOICES, Character, Question, FeedbackEvent, KnowledgeBaseVersion, CharacterQuestionStats
+
+logger = logging.getLogger(__name__)
+
+# A cell needs at least this many votes before the stats override Character.features.
+MIN_FEATURE_VOTES = getattr(settings, 'AKINATOR_MIN_FEATURE_VOTES', 3)
+# A curated feature enters the stats with this many votes the first time players vote
+# on its cell, so a handful of careless or hostile games cannot overwrite it.
+CURATED_FEATURE_VOTES = getattr(settings, 'AKINATOR_CURATED_FEATURE_VOTES', 3)
+
+
+def enqueue_feedback(session, character, was_correct):
+    """
+    Appends the session's answers to the feedback queue instead of writing
+    them into the character row right away.
+    """
+    return FeedbackEvent.objects.create(
+        session=session,
+        character=character,
+        answers=dict(session.answers or {}),
+        was_correct=bool(was_correct),
+    )
+
+
+def increment_stats(counts):
+    """
+    Adds vote counts to CharacterQuestionStats in bulk.
+
+    Args:
+        counts (Counter): {(character_id, question_id, answer): votes}
+
+    Missing rows are created first (ignoring rows another worker created in the
+    meantime), then every affected row is locked and incremented, so concurrent
+    batches never lose votes. Must be called inside a transaction.
+    """
+    if not counts:
+        return
+    CharacterQuestionStats.objects.bulk_create(
+        [CharacterQuestionStats(character_id=c, question_id=q, answer=a, count=0) for (c, q, a) in counts],
+        ignore_conflicts=True,
+        batch_size=1000,
+    )
+
+    character_ids = {c for (c, _, _) in counts}
+    question_ids = {q for (_, q, _) in counts}
+    rows = CharacterQuestionStats.objects.select_for_update().filter(
+        character_id__in=character_ids, question_id__in=question_ids
+    )
+
+    changed = []
+    for row in rows:
+        votes = counts.get((row.character_id, row.question_id, row.answer))
+        if votes:
+            row.count += votes
+            changed.append(row)
+    CharacterQuestionStats.objects.bulk_update(changed, ['count'], batch_size=1000)
+
+
+def curated_prior_votes(counts, votes=CURATED_FEATURE_VOTES):
+    """
+    Seed votes for the curated features of cells that players vote on for the first time.
+
+    Args:
+        counts (Counter): {(character_id, question_id, answer): votes} about to be applied.
+
+    Returns:
+        Counter: {(character_id, question_id, curated answer): votes} for cells without statistics yet.
+    """
+    cells = {(c, q) for (c, q, _) in counts}
+    if not cells or votes <= 0:
+        return Counter()
+    character_ids = {c for (c, _) in cells}
+    question_ids = {q for (_, q) in cells}
+    seen = set(
+        CharacterQuestionStats.objects.filter(character_id__in=character_ids, question_id__in=question_ids)
+        .values_list('character_id', 'question_id')
+    )
+    questions = Question.objects.in_bulk(question_ids)
+    features = dict(Character.objects.filter(id__in=character_ids).values_list('id', 'features'))
+
+    seeds = Counter()
+    for c, q in cells - seen:
+        answer = feature_answer(features.get(c) or {}, questions[q]) if q in questions else None
+        if answer in ANSWER_CHOICES:
+            seeds[(c, q, answer)] += votes
+    return seeds
+
+
+def consensus_answer(answer_counts, min_votes=MIN_FEATURE_VOTES):
+    """
+    Picks the answer a strict majority of players agree on, or None when the
+    cell is contested or has too few votes to be trusted.
+    """
+    total = sum(answer_counts.values())
+    if total < min_votes:
+        return None
+    answer, votes = max(answer_counts.items(), key=lambda item: item[1])
+    return answer if votes * 2 > total else None
+
+
+def materialize_features(character_ids=None, batch_size=500):
+    """
+    Rewrites Character.features from the aggregated answer statistics.
+
+    Only cells that have a consensus are written; curated features without
+    any votes are left untouched. Features are keyed by question ID, which is
+    what the engine reads.
+
+    Args:
+        character_ids (iterable): Restrict the refresh to these characters.
+            None refreshes every character that has statistics.
+
+    Returns:
+        int: Number of characters whose features changed.
+    """
+    stats = CharacterQuestionStats.objects.filter(count__gt=0)
+    if character_ids is not None:
+        stats = stats.filter(character_id__in=list(character_ids))
+    stats = stats.order_by('character_id').values_list('character_id', 'question_id', 'answer', 'count')
+
+    updated = 0
+
+    def flush(cells):
+        # cells is {character_id: {question_id: {answer: count}}}
+        nonlocal updated
+        characters = list(Character.objects.select_for_update().filter(id__in=cells.keys()).only('id', 'features'))
+        changed = []
+        for character in characters:
+            features = dict(character.features or {})
+            for q_id, answer_counts in cells[character.id].items():
+                answer = consensus_answer(answer_counts)
+                if answer:
+                    features[str(q_id)] = answer
+            if features != character.features:
+                character.features = features
+                changed.append(character)
+        Character.objects.bulk_update(changed, ['features'])
+        updated += len(changed)
+
+    with transaction.atomic():
+        # Stream the statistics ordered by character, flushing every batch_size characters.
+        cells = defaultdict(lambda: defaultdict(dict))
+        for character_id, question_id, answer, count in stats.iterator(chunk_size=2000):
+            if character_id not in cells and len(cells) >= batch_size:
+                flush(cells)
+                cells = defaultdict(lambda: defaultdict(dict))
+            cells[character_id][question_id][answer] = count
+        if cells:
+            flush(cells)
+
+    return updated
+
+
+def process_feedback_batch(batch_size=500):
+    """
+    Merges up to `batch_size` pending feedback events into the knowledge base.
+
+    Every answer in the batch becomes a vote in CharacterQuestionStats. Votes
+    are aggregated first and applied in a single transaction with the rows
+    locked, then the features of the touched characters are re-materialized.
+    The knowledge-base version is bumped once for the whole batch.
+
+    Returns:
+        tuple: (events processed, characters updated)
+    """
+    with transaction.atomic():
+        # skip_locked lets several workers drain the queue side by side.
+        events = list(
+            FeedbackEvent.objects.select_for_update(skip_locked=True)
+            .filter(processed_at__isnull=True)
+            .order_by('id')[:batch_size]
+        )
+        if not events:
+            return 0, 0
+
+        # --- Step 1: Aggregate the votes of the whole batch ---
+        question_ids = {int(q_id) for event in events for q_id in event.answers.keys() if q_id.isdigit()}
+        known_question_ids = set(Question.objects.filter(id__in=question_ids).values_list('id', flat=True))
+
+        counts = Counter()
+        for event in events:
+            for q_id_str, answer in event.answers.items():
+                if not q_id_str.isdigit() or int(q_id_str) not in known_question_ids:
+                    logger.warning("process_feedback_batch: question ID %s not found, skipping the answer.", q_id_str)
+                elif answer in ANSWER_CHOICES:
+                    counts[(event.character_id, int(q_id_str), answer)] += 1
+
+        # --- Step 2: Apply the votes and refresh the affected characters ---
+        # Curated answers join the vote first, so they are outvoted rather than overwritten.
+        counts.update(curated_prior_votes(counts))
+        increment_stats(counts)
+        characters_updated = materialize_features({character_id for (character_id, _, _) in counts})
+
+        FeedbackEvent.objects.filter(id__in=[event.id for event in events]).update(processed_at=timezone.now())
+
+        if characters_updated:
+            KnowledgeBaseVersion.bump()
+
+    return len(events), characters_updated
@@ -0,0 +1,168 @@
+import asyncio
+import random
+import time
+from collections import defaultdict
+import httpx
+from .benchmarks import summarize_latencies
+from .knowledge_base import ALL_ANSWERS
+
+# HTTP load generator for the game flow.
+#
+# Virtual players run as asyncio tasks against a live server:
+# start_game -> answer ... -> get_result, answering from the features of a
+# target character fetched through /api/characters/. It only speaks HTTP, so
+# it measures any deployment (runserver, gunicorn, uvicorn, SQLite or
+# Postgres) without touching its database directly. Sending the /api/learn/
+# feedback after each game is opt-in, because it writes to the server's
+# knowledge base.
+
+# Endpoints of the sync and async game API, keyed by the name used in the report.
+ENDPOINTS = {
+    "sync": {"start_game": "/api/start_game/", "answer": "/api/answer/", "get_result": "/api/get_result/"},
+    "async": {"start_game": "/api/async/start_game/", "answer": "/api/async/answer/", "get_result": "/api/async/get_result/"},
+}
+LEARN_PATH = "/api/learn/"
+
+
+class LoadTestStats:
+    """Latencies and errors per endpoint."""
+
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.error_samples = []
+        self.games = 0
+        self.correct = 0
+
+    def record(self, endpoint, started, error=None):
+        self.latencies[endpoint].append((time.perf_counter() - started) * 1000)
+        if error:
+            self.errors[endpoint] += 1
+            if len(self.error_samples) < 20:
+                self.error_samples.append(f"{endpoint}: {error}")
+
+    def report(self, elapsed):
+        endpoints = {}
+        for endpoint, latencies in sorted(self.latencies.items()):
+            endpoints[endpoint] = summarize_latencies(latencies) | {
+                "requests_per_second": round(len(latencies) / elapsed, 2),
+                "errors": self.errors[endpoint],
+                "error_rate": round(self.errors[endpoint] / len(latencies), 4),
+            }
+        requests = sum(len(latencies) for latencies in self.latencies.values())
+        errors = sum(self.errors.values())
+        return {
+            "elapsed_seconds": round(elapsed, 2),
+            "games": self.games,
+            "games_per_second": round(self.games / elapsed, 2) if elapsed else 0,
+            "accuracy": round(self.correct / self.games, 4) if self.games else None,
+            "requests": requests,
+            "requests_per_second": round(requests / elapsed, 2) if elapsed else 0,
+            "error_rate": round(errors / requests, 4) if requests else 0,
+            "endpoints": endpoints,
+            "error_samples": self.error_samples,
+        }
+
+
+async def fetch_targets(client, limit=500):
+    """Characters with features, fetched through the cacheable /api/characters/ endpoint."""
+    response = await client.get("/api/characters/", params={"limit": limit})
+    response.raise_for_status()
+    return [character for character in response.json()["results"] if character.get("features")]
+
+
+async def call(client, stats, endpoint, method, path, **kwargs):
+    """One timed request. Returns the JSON body, or None if the request failed."""
+    started = time.perf_counter()
+    try:
+        response = await client.request(method, path, **kwargs)
+    except httpx.HTTPError as e:
+        stats.record(endpoint, started, error=f"{type(e).__name__}: {e}")
+        return None
+    if response.status_code >= 400:
+        stats.record(endpoint, started, error=f"HTTP {response.status_code}")
+        return None
+    stats.record(endpoint, started)
+    return response.json()
+
+
+async def play_game(client, stats, target, rng, endpoints, noise=0.0, max_questions=50, learn=False):
+    """One virtual player's game, through the real HTTP API."""
+    features = target["features"]
+
+    data = await call(client, stats, "start_game", "GET", endpoints["start_game"])
+    if data is None:
+        return
+    session_id, question = data["session_id"], data["question"]
+
+    for _ in range(max_questions):
+        answer = features.get(str(question["id"])) or features.get(question["text"])
+        answer = answer if answer in ALL_ANSWERS else "dont_know"
+        if rng.random() < noise:
+            answer = rng.choice([other for other in ALL_ANSWERS if other != answer])
+        data = await call(client, stats, "answer", "POST", endpoints["answer"], json={
+            "session_id": session_id, "question_id": question["id"], "answer": answer,
+        })
+        if data is None:
+            return
+        question = data["next_question"]
+        if not question:
+            break
+
+    data = await call(client, stats, "get_result", "GET", endpoints["get_result"], params={"session_id": session_id})
+    if data is None:
+        return
+    guess = data.get("guessed_character")
+    correct = bool(guess) and guess["id"] == target["id"]
+    stats.games += 1
+    stats.correct += correct
+
+    if learn:
+        payload = {"session_id": session_id, "was_correct": correct}
+        if correct:
+            payload["guessed_character_id"] = guess["id"]
+        else:
+            payload["correct_character_name"] = target["name"]
+        await call(client, stats, "learn", "POST", LEARN_PATH, json=payload)
+
+
+async def run_load_test(base_url, players=10, games=100, duration=None, api="sync", noise=0.0,
+                        max_questions=50, learn=False, timeout=30.0, seed=0):
+    """
+    Runs `players` concurrent virtual players until `games` games are played
+    (or `duration` seconds have passed, if given).
+
+    Returns:
+        dict: JSON-serializable report with overall and per-endpoint numbers.
+    """
+    rng = random.Random(seed)
+    stats = LoadTestStats()
+    limits = httpx.Limits(max_connections=players, max_keepalive_connections=players)
+    async with httpx.AsyncClient(base_url=base_url, timeout=timeout, limits=limits) as client:
+        targets = await fetch_targets(client)
+        if not targets:
+            raise ValueError("The server has no characters with features to play with.")
+
+        remaining = games
+        started = time.perf_counter()
+        deadline = started + duration if duration else None
+
+        async def player(player_rng):
+            nonlocal remaining
+            while remaining > 0 and (deadline is None or time.perf_counter() < deadline):
+                remaining -= 1
+                await play_game(
+                    client, stats, player_rng.choice(targets), player_rng, ENDPOINTS[api],
+                    noise=noise, max_questions=max_questions, learn=learn,
+                )
+
+        await asyncio.gather(*(player(random.Random(rng.random())) for _ in range(players)))
+        elapsed = time.perf_counter() - started
+
+    report = stats.report(elapsed)
+    report["parameters"] = {
+        "base_url": base_url, "players": players, "games": games, "duration": duration, "api": api,
+        "noise": noise, "max_questions": max_questions, "learn": learn, "seed": seed,
+    }
+    report["timestamp"] = time.strftime("%Y-%m-%dT%H:%M:%S")
+    return report
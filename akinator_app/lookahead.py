@@ -0,0 +1,136 @@
+import math
+from .kb_snapshot import CODE_ANSWERS, UNKNOWN_CODE
+from .knowledge_base import ALL_ANSWERS, calculate_entropy, distribution_from_codes
+from .posterior import ANSWER_LIKELIHOODS
+
+# Two-step lookahead question selection.
+#
+# One-step entropy picks questions one at a time, so with correlated questions
+# ("Is your character real?" / "Is your character human?") the second question
+# often learns almost nothing new. The depth-2 selector instead picks the
+# question that leaves the lowest expected entropy of the game's posterior (see
+# posterior.py) once it and the best follow-up are answered, with the player's
+# answers drawn from ANSWER_LIKELIHOODS.
+#
+# A player's answer only depends on the character's recorded answer, so the
+# expected drop in entropy of an answer is I(A; R) = H(R) - H(R | A), computed
+# from the posterior mass of the candidates per recorded answer code. To bound
+# the cost, only the top-k one-step questions are considered at either level,
+# and every (q1, q2) pair is evaluated from one joint histogram of that mass.
+
+NUM_CODES = len(CODE_ANSWERS) + 1
+
+# P(player answer | recorded answer code), one row per code; UNKNOWN_CODE uses the None row.
+LIKELIHOODS = [
+    [row.get(answer, row["dont_know"]) for answer in ALL_ANSWERS]
+    for row in (ANSWER_LIKELIHOODS[CODE_ANSWERS.get(code)] for code in range(NUM_CODES))
+]
+# H(R | A = code): how noisy the player's answer is for each recorded answer.
+ANSWER_NOISE = [calculate_entropy(row) for row in LIKELIHOODS]
+
+
+def information_gain(code_masses):
+    """
+    Expected drop in posterior entropy (in bits) from one answer.
+
+    Args:
+        code_masses (list): Posterior mass of the candidates per recorded answer code; need not sum to 1.
+    """
+    total = sum(code_masses)
+    if total <= 0:
+        return 0.0
+    answer_probabilities = [
+        sum(mass * row[answer] for mass, row in zip(code_masses, LIKELIHOODS)) / total
+        for answer in range(len(ALL_ANSWERS))
+    ]
+    noise = sum(mass * entropy for mass, entropy in zip(code_masses, ANSWER_NOISE)) / total
+    return calculate_entropy(answer_probabilities) - noise
+
+
+def information_gain_after_two(first_masses, joint_masses):
+    """
+    Expected drop in posterior entropy after asking q1 and then the best follow-up q2.
+
+    Args:
+        first_masses (list): q1's mass per answer code.
+        joint_masses (dict): {q2 index: mass per (code1, code2), flattened as code1 * NUM_CODES + code2}
+    """
+    total = sum(first_masses)
+    expected = 0.0
+    for answer in range(len(ALL_ANSWERS)):
+        # The posterior reweights each code of q1 by how likely it makes this answer.
+        factors = [row[answer] for row in LIKELIHOODS]
+        probability = sum(mass * factor for mass, factor in zip(first_masses, factors)) / total
+        if not probability:
+            continue
+        best_follow_up = 0.0
+        for pair_masses in joint_masses.values():
+            follow_up_masses = [
+                sum(pair_masses[code1 * NUM_CODES + code2] * factors[code1] for code1 in range(NUM_CODES))
+                for code2 in range(NUM_CODES)
+            ]
+            best_follow_up = max(best_follow_up, information_gain(follow_up_masses))
+        expected += probability * best_follow_up
+    return information_gain(first_masses) + expected
+
+
+def select_with_lookahead(snapshot, candidate_ids, question_indices, posterior=None, top_k=10):
+    """
+    Picks the question that minimizes the expected posterior entropy after two questions.
+
+    Args:
+        posterior (dict): The session's {str(character_id): log weight}; None weighs every candidate alike.
+
+    Returns:
+        int: Index of the best question in the snapshot.
+    """
+    # --- Step 1: Weigh the candidates by the posterior ---
+    # Candidates missing from the snapshot have no known answers at all.
+    posterior = posterior or {}
+    top = max(posterior.get(str(char_id), 0.0) for char_id in candidate_ids)
+    index_of = snapshot.index_of
+    indices, weights, unknown_mass = [], [], 0.0
+    for char_id in candidate_ids:
+        weight = math.exp(posterior.get(str(char_id), 0.0) - top)
+        index = index_of.get(char_id)
+        if index is None:
+            unknown_mass += weight
+        else:
+            indices.append(index)
+            weights.append(weight)
+
+    # --- Step 2: Rank by one-step entropy and keep the top k ---
+    codes = {}
+    ranked = []
+    for question_index in question_indices:
+        question_codes = snapshot.codes(question_index, indices)
+        codes[question_index] = question_codes
+        ranked.append((calculate_entropy(distribution_from_codes(question_codes, len(candidate_ids))), question_index))
+    ranked.sort(key=lambda item: item[0], reverse=True)
+    shortlist = [question_index for _, question_index in ranked[:top_k]]
+    if len(shortlist) < 2 or len(candidate_ids) < 3:
+        return shortlist[0]
+
+    # --- Step 3: Score every (q1, q2) pair from its joint mass histogram ---
+    best_index = None
+    best_gain = None
+    for first in shortlist:
+        first_masses = [0.0] * NUM_CODES
+        for code, weight in zip(codes[first], weights):
+            first_masses[code] += weight
+        first_masses[UNKNOWN_CODE] += unknown_mass
+        joint_masses = {}
+        for second in shortlist:
+            if second == first:
+                continue
+            pair_masses = [0.0] * (NUM_CODES * NUM_CODES)
+            for code1, code2, weight in zip(codes[first], codes[second], weights):
+                pair_masses[code1 * NUM_CODES + code2] += weight
+            pair_masses[UNKNOWN_CODE * NUM_CODES + UNKNOWN_CODE] += unknown_mass
+            joint_masses[second] = pair_masses
+        gain = information_gain_after_two(first_masses, joint_masses)
+        # Strict comparison: ties keep the question with the higher one-step entropy.
+        if best_gain is None or gain > best_gain + 1e-12:
+            best_gain = gain
+            best_index = first
+    return best_index
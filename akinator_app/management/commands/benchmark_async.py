@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand, CommandError
+from akinator_app.benchmarks import run_api_benchmark, save_results
+
+
+class Command(BaseCommand):
+    help = 'Plays the same games through the sync (WSGI) and async (ASGI) game endpoints and compares throughput and latency.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--games', type=int, default=100, help='Games played per mode.')
+        parser.add_argument('--concurrency', type=int, default=10, help='Games in flight at once.')
+        parser.add_argument('--max-questions', type=int, default=30, help='Give up a game after this many questions.')
+        parser.add_argument('--seed', type=int, default=0, help='Random seed.')
+        parser.add_argument('--output', type=str, default=None, help='Write the results as JSON to this path.')
+
+    def handle(self, *args, **options):
+        try:
+            results = run_api_benchmark(
+                games=options['games'],
+                concurrency=options['concurrency'],
+                max_questions=options['max_questions'],
+                seed=options['seed'],
+            )
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        self.stdout.write(self.style.NOTICE(
+            f"--- {options['games']} games per mode, {options['concurrency']} in flight ---"
+        ))
+        for mode, stats in results.items():
+            self.stdout.write(
+                f"{mode:6} {stats['games_per_second']:>8.2f} games/s  {stats['requests_per_second']:>8.2f} req/s   "
+                f"p50 {stats.get('p50_ms', 0):>8.2f} ms   p95 {stats.get('p95_ms', 0):>8.2f} ms   "
+                f"{stats['failed_games']} failed games"
+            )
+
+        if options['output']:
+            save_results(results, options['output'])
+            self.stdout.write(self.style.SUCCESS(f"Results saved to {options['output']}"))
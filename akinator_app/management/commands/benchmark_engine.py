@@ -0,0 +1,51 @@
+from django.core.management.base import BaseCommand, CommandError
+from akinator_app.benchmarks import run_engine_benchmarks, run_parallel_benchmark, save_results
+from akinator_app.parallel import default_worker_counts
+
+
+class Command(BaseCommand):
+    help = 'Times best_question, candidate filtering and get_result against the current knowledge base and reports p50/p95 latency, peak memory and query counts.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=20, help='Timed runs per scenario.')
+        parser.add_argument('--candidate-fraction', type=float, default=0.1, help='Share of characters still in play for the mid-game scenarios.')
+        parser.add_argument('--answered', type=int, default=8, help='Number of answered questions in the top_guesses scenario.')
+        parser.add_argument('--seed', type=int, default=0, help='Random seed.')
+        parser.add_argument('--label', type=str, default='', help='Free-form label stored with the results, e.g. a branch name.')
+        parser.add_argument('--parallel', nargs='?', const='', default=None, metavar='COUNTS',
+                            help='Also measure parallel entropy evaluation for these comma-separated worker counts '
+                                 '(default: 1, 2, 4, ... up to the number of cores).')
+        parser.add_argument('--output', type=str, default=None, help='Write the results as JSON to this path.')
+
+    def handle(self, *args, **options):
+        try:
+            results = run_engine_benchmarks(
+                repeat=options['repeat'],
+                candidate_fraction=options['candidate_fraction'],
+                answered=options['answered'],
+                seed=options['seed'],
+            )
+        except ValueError as e:
+            raise CommandError(str(e))
+        results["label"] = options['label']
+
+        kb = results["knowledge_base"]
+        self.stdout.write(self.style.NOTICE(
+            f"--- Engine benchmark: {kb['characters']} characters x {kb['questions']} questions ({results['database']}) ---"
+        ))
+        for name, stats in results["results"].items():
+            self.stdout.write(
+                f"{name:28} p50 {stats['p50_ms']:>9.2f} ms   p95 {stats['p95_ms']:>9.2f} ms   "
+                f"peak {stats['peak_memory_kb']:>9.1f} KiB   {stats['queries']:>4} queries"
+            )
+
+        if options['parallel'] is not None:
+            worker_counts = [int(n) for n in options['parallel'].split(',') if n] or default_worker_counts()
+            results["parallel"] = run_parallel_benchmark(worker_counts, repeat=options['repeat'])
+            self.stdout.write(self.style.NOTICE("--- Opening best_question by worker count (snapshot) ---"))
+            for workers, stats in results["parallel"].items():
+                self.stdout.write(f"{workers:>3} workers   p50 {stats['p50_ms']:>9.2f} ms   speedup x{stats['speedup']}")
+
+        if options['output']:
+            save_results(results, options['output'])
+            self.stdout.write(self.style.SUCCESS(f"Results saved to {options['output']}"))
@@ -0,0 +1,35 @@
+import time
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from akinator_app.question_tree import TREE_BUNDLE_PATH, TREE_DEPTH, build_bundle, write_bundle
+
+
+class Command(BaseCommand):
+    help = 'Plays the first questions of every game ahead of time and writes them as a static JSON bundle the frontend walks without server round trips.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--depth', type=int, default=TREE_DEPTH,
+                            help='Questions answered in the browser before the server takes over. '
+                                 'At most AKINATOR_QUESTION_TREE_DEPTH, which bounds what resume_game accepts.')
+        parser.add_argument('--collectstatic', action='store_true', help='Run collectstatic afterwards, so the hashed and compressed copy is served.')
+
+    def handle(self, *args, **options):
+        if not 1 <= options['depth'] <= TREE_DEPTH:
+            raise CommandError(f"--depth must be between 1 and {TREE_DEPTH}; raise AKINATOR_QUESTION_TREE_DEPTH for deeper trees.")
+
+        self.stdout.write(self.style.NOTICE(f"--- Building the question tree, {options['depth']} questions deep ---"))
+        started = time.perf_counter()
+        bundle, stats = build_bundle(depth=options['depth'])
+        if bundle["tree"] is None:
+            raise CommandError("The engine has no opening question; add questions and characters first.")
+        size = write_bundle(bundle)
+        self.stdout.write(
+            f"{stats['nodes']} tree nodes ({len(bundle['questions'])} distinct questions, "
+            f"{stats['leaves']} paths ending the game early), knowledge base v{bundle['kb_version']}, "
+            f"{size:,} bytes, built in {time.perf_counter() - started:.1f}s."
+        )
+
+        if options['collectstatic']:
+            call_command('collectstatic', interactive=False, verbosity=0)
+            self.stdout.write("Collected static files.")
+        self.stdout.write(self.style.SUCCESS(f"Bundle written to {TREE_BUNDLE_PATH}"))
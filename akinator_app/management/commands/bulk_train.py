@@ -1,7 +1,8 @@
 import json
 from django.core.management.base import BaseCommand, CommandError
 from django.db import transaction
-from akinator_app.models import Character, Question
+from akinator_app.models import Question, KnowledgeBaseVersion
+from akinator_app.names import get_or_create_character
 # Import the scraper and the mapping from your other app files
 from akinator_app.ai_data_collector import get_character_info
 from akinator_app.views import WIKIDATA_TO_QUESTION_MAP
@@ -39,10 +40,7 @@ class Command(BaseCommand):
             self.stdout.write(f"Processing '{name}'...")
 
             # Check if character already exists
-            character, created = Character.objects.get_or_create(
-                name__iexact=name,
-                defaults={'name': name, 'added_by': 'bulk_scrape_script'}
-            )
+            character, created = get_or_create_character(name, added_by='bulk_scrape_script')
 
             # Scrape data from external sources
             try:
@@ -83,6 +81,9 @@ class Command(BaseCommand):
                 characters_updated += 1
                 self.stdout.write(self.style.SUCCESS(f"   > Updated existing character: '{name}' with scraped data."))
 
+        if characters_created or characters_updated:
+            KnowledgeBaseVersion.bump()
+
         self.stdout.write(self.style.SUCCESS("\n--- Bulk Training Complete! ---"))
         self.stdout.write(f"Characters Created: {characters_created}")
         self.stdout.write(f"Characters Updated: {characters_updated}")
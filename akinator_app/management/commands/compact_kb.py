@@ -0,0 +1,56 @@
+import json
+from django.core.management.base import BaseCommand, CommandError
+from akinator_app.compaction import compact_knowledge_base
+
+
+class Command(BaseCommand):
+    help = 'Rewrites Character.features with canonical question-ID keys, dropping orphaned keys and invalid values, and reports coverage and sparsity.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500, help='Characters rewritten per transaction.')
+        parser.add_argument('--dry-run', action='store_true', help='Report what would change without writing anything.')
+        parser.add_argument('--top', type=int, default=10, help='How many of the least covered questions and sparsest characters to list.')
+        parser.add_argument('--output', type=str, default=None, help='Write the full report as JSON to this path.')
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError("--batch-size must be at least 1.")
+
+        mode = " (dry run)" if options['dry_run'] else ""
+        self.stdout.write(self.style.NOTICE(f"--- Compacting character features{mode} ---"))
+        report = compact_knowledge_base(
+            batch_size=options['batch_size'],
+            dry_run=options['dry_run'],
+            top=max(options['top'], 0),
+        )
+
+        saved = report['bytes_saved']
+        percent = saved / report['bytes_before'] if report['bytes_before'] else 0
+        self.stdout.write(
+            f"{report['rewritten']} of {report['characters']} characters {'would change' if options['dry_run'] else 'rewritten'}: "
+            f"{report['rekeyed']} text keys re-keyed, {report['duplicate_keys']} duplicate keys, "
+            f"{report['orphan_keys']} orphaned keys, {report['invalid_values']} invalid values dropped, "
+            f"{report['rewritten_values']} values normalized."
+        )
+        self.stdout.write(f"Features: {report['bytes_before']:,} -> {report['bytes_after']:,} bytes ({saved:,} saved, {percent:.1%}).")
+        self.stdout.write(
+            f"Mean coverage {report['mean_coverage']:.1%} over {report['questions']} questions; "
+            f"{report['characters_without_features']} characters without any answer."
+        )
+
+        if report['least_covered_questions']:
+            self.stdout.write(self.style.NOTICE("Least covered questions:"))
+            for question in report['least_covered_questions']:
+                self.stdout.write(f"  {question['coverage']:>6.1%}  {question['characters']:>6}  [{question['id']}] {question['text']}")
+        if report['sparsest_characters']:
+            self.stdout.write(self.style.NOTICE("Sparsest characters:"))
+            for character in report['sparsest_characters']:
+                self.stdout.write(f"  {character['sparsity']:>6.1%}  {character['answered']:>4} answered  [{character['id']}] {character['name']}")
+
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as f:
+                json.dump(report, f, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"Report saved to {options['output']}"))
+        if 'kb_version' in report:
+            self.stdout.write(f"Knowledge base is now at version {report['kb_version']}.")
+        self.stdout.write(self.style.SUCCESS("Done."))
@@ -0,0 +1,35 @@
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from akinator_app.kb_snapshot import write_snapshot
+from akinator_app.models import KnowledgeBaseVersion
+
+
+class Command(BaseCommand):
+    help = 'Compiles the knowledge base into a binary snapshot that gunicorn workers share through mmap.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output', type=str, default=getattr(settings, 'AKINATOR_KB_SNAPSHOT_PATH', None),
+                            help='Snapshot path. Defaults to AKINATOR_KB_SNAPSHOT_PATH.')
+        parser.add_argument('--watch', action='store_true', help='Keep running and recompile whenever the knowledge-base version changes.')
+        parser.add_argument('--interval', type=float, default=10.0, help='Seconds between version checks when --watch is set.')
+
+    def handle(self, *args, **options):
+        path = options['output']
+        if not path:
+            raise CommandError('No output path. Pass --output or set AKINATOR_KB_SNAPSHOT_PATH.')
+
+        compiled_version = None
+        while True:
+            version = KnowledgeBaseVersion.current()
+            if version != compiled_version:
+                started = time.perf_counter()
+                header = write_snapshot(path)
+                compiled_version = header["kb_version"]
+                self.stdout.write(self.style.SUCCESS(
+                    f"Compiled knowledge base v{compiled_version}: {header['num_characters']} characters x "
+                    f"{len(header['questions'])} questions -> {path} ({time.perf_counter() - started:.2f}s)"
+                ))
+            if not options['watch']:
+                break
+            time.sleep(options['interval'])
@@ -0,0 +1,28 @@
+import time
+from django.core.management.base import BaseCommand
+from akinator_app.kb_transfer import export_records, open_dump, write_records
+
+
+class Command(BaseCommand):
+    help = 'Streams questions, rules and characters to a portable NDJSON dump (gzip-compressed when the path ends in .gz).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('output', type=str, help='Dump path, e.g. kb.ndjson.gz. Use - for stdout.')
+        parser.add_argument('--chunk-size', type=int, default=2000, help='Rows fetched from the database at a time.')
+
+    def handle(self, *args, **options):
+        stats = {}
+        started = time.perf_counter()
+        with open_dump(options['output'], 'w') as f:
+            write_records(export_records(chunk_size=options['chunk_size'], stats=stats), f)
+        elapsed = time.perf_counter() - started
+
+        rows = stats["questions"] + stats["rules"] + stats["characters"]
+        # Keep stdout clean when the dump itself goes there.
+        out = self.stderr if options['output'] == '-' else self.stdout
+        out.write(self.style.SUCCESS(
+            f"Exported {stats['questions']} questions, {stats['rules']} rules and {stats['characters']} characters "
+            f"in {elapsed:.2f}s ({rows / elapsed if elapsed else 0:,.0f} rows/s)."
+        ))
+        if stats["orphan_features"]:
+            out.write(self.style.WARNING(f"Skipped {stats['orphan_features']} features of questions that no longer exist."))
@@ -0,0 +1,42 @@
+import time
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from akinator_app.models import KnowledgeBaseVersion
+from akinator_app.synthetic import clear_synthetic_kb, generate_synthetic_kb
+
+
+class Command(BaseCommand):
+    help = 'Generates a synthetic knowledge base for benchmarking. Run it against a benchmark database, not production.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--characters', type=int, default=1000, help='Number of synthetic characters.')
+        parser.add_argument('--questions', type=int, default=100, help='Number of synthetic questions.')
+        parser.add_argument('--sparsity', type=float, default=0.3, help='Share of (character, question) cells left without an answer (0-1).')
+        parser.add_argument('--skew', type=float, default=0.5, help='How far the yes/no split of a question may drift from 50/50 (0-1).')
+        parser.add_argument('--seed', type=int, default=0, help='Random seed.')
+        parser.add_argument('--clear', action='store_true', help='Only delete the existing synthetic data.')
+
+    def handle(self, *args, **options):
+        if options['clear']:
+            characters, questions = clear_synthetic_kb()
+            self.stdout.write(self.style.SUCCESS(f"Deleted {characters} synthetic characters and {questions} synthetic questions."))
+            return
+
+        if not 0 <= options['sparsity'] <= 1 or not 0 <= options['skew'] <= 1:
+            raise CommandError('--sparsity and --skew must be between 0 and 1.')
+
+        self.stdout.write(self.style.NOTICE(
+            f"--- Generating {options['characters']} characters x {options['questions']} questions ---"
+        ))
+        started = time.perf_counter()
+        with transaction.atomic():
+            generate_synthetic_kb(
+                characters=options['characters'],
+                questions=options['questions'],
+                sparsity=options['sparsity'],
+                skew=options['skew'],
+                seed=options['seed'],
+            )
+            KnowledgeBaseVersion.bump()
+
+        self.stdout.write(self.style.SUCCESS(f"Done in {time.perf_counter() - started:.2f}s."))
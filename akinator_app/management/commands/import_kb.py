@@ -0,0 +1,46 @@
+import time
+from django.core.management.base import BaseCommand, CommandError
+from akinator_app.kb_transfer import import_records, open_dump
+
+
+class Command(BaseCommand):
+    help = 'Imports an NDJSON dump written by export_kb, upserting questions and characters in batches.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('input', type=str, help='Dump path (plain or gzip-compressed). Use - for stdin.')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Rows written per bulk query.')
+        parser.add_argument('--replace-features', action='store_true',
+                            help="Replace existing characters' features instead of merging the dump into them.")
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+
+        def progress(counts):
+            rows = counts["questions"] + counts["rules"] + counts["characters_created"] + counts["characters_updated"]
+            elapsed = time.perf_counter() - started
+            self.stdout.write(f"  {rows:,} rows ({rows / elapsed:,.0f} rows/s)")
+
+        try:
+            with open_dump(options['input'], 'r') as f:
+                counts = import_records(
+                    f, batch_size=options['batch_size'], replace_features=options['replace_features'], progress=progress,
+                )
+        except FileNotFoundError:
+            raise CommandError(f'File not found at "{options["input"]}"')
+        except ValueError as e:
+            raise CommandError(str(e))
+        elapsed = time.perf_counter() - started
+
+        rows = counts["questions"] + counts["rules"] + counts["characters_created"] + counts["characters_updated"]
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {counts['questions']} questions, {counts['rules']} rules, "
+            f"{counts['characters_created']} new and {counts['characters_updated']} updated characters "
+            f"in {elapsed:.2f}s ({rows / elapsed if elapsed else 0:,.0f} rows/s)."
+        ))
+        if counts["skipped_features"] or counts["invalid_lines"]:
+            self.stdout.write(self.style.WARNING(
+                f"Skipped {counts['skipped_features']} features with unknown questions or answers "
+                f"and {counts['invalid_lines']} invalid lines."
+            ))
+        if "kb_version" in counts:
+            self.stdout.write(f"Knowledge base is now at version {counts['kb_version']}.")
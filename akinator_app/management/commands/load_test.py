@@ -0,0 +1,69 @@
+import asyncio
+import httpx
+from django.core.management.base import BaseCommand, CommandError
+from akinator_app.benchmarks import save_results
+from akinator_app.load_test import ENDPOINTS, run_load_test
+
+
+class Command(BaseCommand):
+    help = 'Plays games with concurrent virtual players against a running server and reports throughput, errors and latency per endpoint.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', type=str, default='http://127.0.0.1:8000', help='Base URL of the server under test.')
+        parser.add_argument('--players', type=int, default=10, help='Virtual players playing at once.')
+        parser.add_argument('--games', type=int, default=100, help='Total games to play.')
+        parser.add_argument('--duration', type=float, default=None, help='Stop starting new games after this many seconds.')
+        parser.add_argument('--api', choices=sorted(ENDPOINTS), default='sync', help='Play through the sync or the async game endpoints.')
+        parser.add_argument('--noise', type=float, default=0.0, help='Chance that a player gives a random answer.')
+        parser.add_argument('--max-questions', type=int, default=50, help='Give up a game after this many questions.')
+        parser.add_argument('--learn', action='store_true',
+                            help='Also send the /api/learn/ feedback after each game. This changes the knowledge base '
+                                 'of the server under test, so only use it against a disposable copy.')
+        parser.add_argument('--timeout', type=float, default=30.0, help='Per-request timeout in seconds.')
+        parser.add_argument('--seed', type=int, default=0, help='Random seed.')
+        parser.add_argument('--output', type=str, default=None, help='Write the results as JSON to this path.')
+
+    def handle(self, *args, **options):
+        if options['players'] < 1 or options['games'] < 1:
+            raise CommandError("--players and --games must be at least 1.")
+
+        self.stdout.write(self.style.NOTICE(
+            f"--- {options['games']} games, {options['players']} players against {options['url']} ({options['api']} API) ---"
+        ))
+        try:
+            results = asyncio.run(run_load_test(
+                options['url'].rstrip('/'),
+                players=options['players'],
+                games=options['games'],
+                duration=options['duration'],
+                api=options['api'],
+                noise=options['noise'],
+                max_questions=options['max_questions'],
+                learn=options['learn'],
+                timeout=options['timeout'],
+                seed=options['seed'],
+            ))
+        except ValueError as e:
+            raise CommandError(str(e))
+        except httpx.HTTPError as e:
+            raise CommandError(f"Could not reach {options['url']}: {e}")
+
+        for endpoint, stats in results['endpoints'].items():
+            line = (
+                f"{endpoint:11} {stats['runs']:>7} req  {stats['requests_per_second']:>8.2f} req/s   "
+                f"p50 {stats['p50_ms']:>8.2f} ms   p95 {stats['p95_ms']:>8.2f} ms   max {stats['max_ms']:>8.2f} ms   "
+                f"{stats['error_rate']:>6.1%} errors"
+            )
+            self.stdout.write(self.style.WARNING(line) if stats['errors'] else line)
+        accuracy = f"{results['accuracy']:.1%}" if results['accuracy'] is not None else "n/a"
+        self.stdout.write(
+            f"Total: {results['games']} games in {results['elapsed_seconds']}s "
+            f"({results['games_per_second']} games/s, {results['requests_per_second']} req/s), "
+            f"accuracy {accuracy}, {results['error_rate']:.1%} errors"
+        )
+        for sample in results['error_samples'][:5]:
+            self.stdout.write(self.style.WARNING(f"  {sample}"))
+
+        if options['output']:
+            save_results(results, options['output'])
+            self.stdout.write(self.style.SUCCESS(f"Results saved to {options['output']}"))
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+from akinator_app.learning import materialize_features
+from akinator_app.models import KnowledgeBaseVersion
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds Character.features from the aggregated CharacterQuestionStats votes. Meant to run periodically (e.g. from cron).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500, help='Number of characters rewritten per bulk update.')
+
+    def handle(self, *args, **options):
+        self.stdout.write(self.style.NOTICE("--- Materializing features from answer statistics ---"))
+        updated = materialize_features(batch_size=options['batch_size'])
+        if updated:
+            version = KnowledgeBaseVersion.bump()
+            self.stdout.write(f"Knowledge base is now at version {version}.")
+        self.stdout.write(self.style.SUCCESS(f"Updated features for {updated} characters."))
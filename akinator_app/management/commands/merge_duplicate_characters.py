@@ -0,0 +1,68 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Count
+from akinator_app.models import Character, KnowledgeBaseVersion
+from akinator_app.names import get_name_index, merge_characters
+
+
+class Command(BaseCommand):
+    # Since migration 0015, Character.name_key is unique and exact duplicates cannot be
+    # created; the migration refuses to run until this command has merged the old ones.
+    help = ('Merges characters whose names only differ by case, accents or whitespace into the oldest one, '
+            'lists likely typo duplicates for review and merges the reviewed pairs.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='Only report what would be merged.')
+        parser.add_argument('--fuzzy', type=float, default=None, metavar='SIMILARITY',
+                            help='Also list pairs of different names at least this similar (0-1), e.g. 0.6.')
+        parser.add_argument('--merge', action='append', default=[], metavar='SOURCE_ID:TARGET_ID',
+                            help='Merge one reviewed pair, e.g. a typo found with --fuzzy. Can be repeated.')
+
+    def handle(self, *args, **options):
+        dry_run = options['dry_run']
+        merged = 0
+
+        # Validate the reviewed pairs before anything is merged.
+        pairs = []
+        for pair in options['merge']:
+            try:
+                source_id, target_id = (int(part) for part in pair.split(':'))
+                pairs.append((Character.objects.get(id=source_id), Character.objects.get(id=target_id)))
+            except (ValueError, Character.DoesNotExist):
+                raise CommandError(f"Invalid --merge value '{pair}': expected SOURCE_ID:TARGET_ID of two existing characters.")
+
+        # --- Step 1: Exact duplicates of the normalized name ---
+        keys = (
+            Character.objects.values('name_key')
+            .annotate(copies=Count('id'))
+            .filter(copies__gt=1)
+            .values_list('name_key', flat=True)
+        )
+        for name_key in keys:
+            characters = list(Character.objects.filter(name_key=name_key).order_by('id'))
+            keep, duplicates = characters[0], characters[1:]
+            names = ", ".join(f"'{c.name}' (#{c.id})" for c in duplicates)
+            self.stdout.write(f"{names} -> '{keep.name}' (#{keep.id})")
+            merged += len(duplicates) if dry_run else merge_characters(keep, duplicates)
+
+        # --- Step 2: Pairs reviewed by hand ---
+        for source, target in pairs:
+            self.stdout.write(f"'{source.name}' (#{source.id}) -> '{target.name}' (#{target.id})")
+            merged += 1 if dry_run else merge_characters(target, [source])
+
+        if merged and not dry_run:
+            version = KnowledgeBaseVersion.bump()
+            self.stdout.write(f"Knowledge base is now at version {version}.")
+
+        # --- Step 3: Likely typos, for review ---
+        if options['fuzzy'] is not None:
+            self.stdout.write(self.style.NOTICE(f"--- Names at least {options['fuzzy']} similar ---"))
+            index = get_name_index()
+            names = dict(Character.objects.values_list('id', 'name'))
+            for char_id, name in names.items():
+                for other_id, score in index.search(name, limit=5, min_similarity=options['fuzzy']):
+                    # Each pair once; exact duplicates were handled above.
+                    if other_id > char_id and other_id in names:
+                        self.stdout.write(f"{score:.2f}  '{name}' (#{char_id})  ~  '{names[other_id]}' (#{other_id})")
+
+        verb = "would be" if dry_run else "were"
+        self.stdout.write(self.style.SUCCESS(f"--- {merged} duplicate characters {verb} merged ---"))
@@ -0,0 +1,34 @@
+import time
+from django.core.management.base import BaseCommand
+from akinator_app.learning import process_feedback_batch
+
+
+class Command(BaseCommand):
+    help = 'Merges queued player feedback into the knowledge base in batches.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500, help='Maximum number of feedback events merged per transaction.')
+        parser.add_argument('--loop', action='store_true', help='Keep polling the queue instead of exiting once it is empty.')
+        parser.add_argument('--interval', type=float, default=5.0, help='Seconds to sleep between polls when --loop is set.')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        total_events = 0
+        total_characters = 0
+
+        while True:
+            events, characters = process_feedback_batch(batch_size)
+            total_events += events
+            total_characters += characters
+
+            if events:
+                self.stdout.write(f"Merged {events} feedback events into {characters} characters.")
+                continue  # Drain the queue before sleeping.
+
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
+
+        self.stdout.write(self.style.SUCCESS(
+            f"--- Feedback processing complete: {total_events} events, {total_characters} character updates ---"
+        ))
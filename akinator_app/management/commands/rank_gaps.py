@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand, CommandError
+from akinator_app.gaps import GAP_QUEUE_SIZE, refresh_knowledge_gaps
+from akinator_app.models import KnowledgeGap
+
+
+class Command(BaseCommand):
+    help = 'Ranks missing (character, question) cells by the questions per game filling them would save. Reads only the history added since the last run; meant to run periodically (e.g. from cron).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--limit', type=int, default=GAP_QUEUE_SIZE, help='Number of gaps kept in the curation queue.')
+        parser.add_argument('--full', action='store_true', help='Forget the running totals and re-read the whole session history.')
+        parser.add_argument('--show', type=int, default=10, help='How many of the top gaps to print.')
+
+    def handle(self, *args, **options):
+        if options['limit'] < 1:
+            raise CommandError("--limit must be at least 1.")
+
+        self.stdout.write(self.style.NOTICE("--- Ranking knowledge gaps ---"))
+        result = refresh_knowledge_gaps(limit=options['limit'], full=options['full'])
+        self.stdout.write(
+            f"Read {result['sessions']} new sessions and {result['feedback_events']} feedback events "
+            f"({result['games']} games in total), ranked against knowledge base v{result['kb_version']}."
+        )
+
+        top = KnowledgeGap.objects.select_related('character', 'question').order_by('-expected_turns_saved')[:options['show']]
+        for gap in top:
+            self.stdout.write(
+                f"  {gap.expected_turns_saved:.5f} turns/game  {gap.character.name} / {gap.question.text}"
+                f"{' (dont_know)' if gap.current_answer else ''}"
+            )
+        self.stdout.write(self.style.SUCCESS(f"{result['gaps']} gaps in the curation queue."))
@@ -0,0 +1,74 @@
+import time
+from django.core.management.base import BaseCommand
+from akinator_app.models import Character, Question, GameSession, KnowledgeBaseVersion
+from akinator_app.knowledge_base import ALL_ANSWERS, calculate_entropy, feature_answer
+
+
+class Command(BaseCommand):
+    help = 'Recomputes Question.popularity, information_value, answer_rate and dont_know_rate from the knowledge base and the session history.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=1000, help='Rows fetched per database round trip while streaming.')
+        parser.add_argument('--interval', type=float, default=None, help='Re-run every N seconds instead of exiting after one pass.')
+
+    def handle(self, *args, **options):
+        while True:
+            self.recompute(options['chunk_size'])
+            if options['interval'] is None:
+                break
+            time.sleep(options['interval'])
+
+    def recompute(self, chunk_size):
+        started = time.perf_counter()
+        questions = list(Question.objects.all())
+        if not questions:
+            self.stdout.write(self.style.WARNING("No questions in the database. Nothing to do."))
+            return
+
+        # --- Step 1: Stream the knowledge base and count the answers per question ---
+        answer_counts = {question.id: {answer: 0 for answer in ALL_ANSWERS} for question in questions}
+        total_characters = 0
+        for features in Character.objects.values_list('features', flat=True).iterator(chunk_size=chunk_size):
+            features = features or {}
+            total_characters += 1
+            for question in questions:
+                answer = feature_answer(features, question)
+                # Missing answers count as "dont_know", exactly like the engine does.
+                answer_counts[question.id][answer if answer in ALL_ANSWERS else "dont_know"] += 1
+
+        # --- Step 2: Stream the session history and count asks and "dont_know" answers ---
+        times_asked = {question.id: 0 for question in questions}
+        times_dont_know = {question.id: 0 for question in questions}
+        # Old sessions may still be keyed by question text.
+        question_keys = {str(question.id): question.id for question in questions}
+        question_keys.update({question.text: question.id for question in questions})
+        total_sessions = 0
+        for answers in GameSession.objects.values_list('answers', flat=True).iterator(chunk_size=chunk_size):
+            total_sessions += 1
+            for key, answer in (answers or {}).items():
+                q_id = question_keys.get(key)
+                if q_id is not None:
+                    times_asked[q_id] += 1
+                    if answer == "dont_know":
+                        times_dont_know[q_id] += 1
+
+        # --- Step 3: Write everything back in one bulk update ---
+        fields = ['popularity', 'information_value', 'answer_rate', 'dont_know_rate']
+        before = [[getattr(question, field) for field in fields] for question in questions]
+        for question in questions:
+            counts = answer_counts[question.id]
+            if total_characters:
+                question.information_value = calculate_entropy([count / total_characters for count in counts.values()])
+                question.answer_rate = (total_characters - counts["dont_know"]) / total_characters
+            question.popularity = times_asked[question.id] / total_sessions if total_sessions else 0.0
+            question.dont_know_rate = times_dont_know[question.id] / times_asked[question.id] if times_asked[question.id] else 0.0
+
+        Question.objects.bulk_update(questions, fields, batch_size=500)
+        # Question payloads are cached per knowledge-base version.
+        if before != [[getattr(question, field) for field in fields] for question in questions]:
+            KnowledgeBaseVersion.bump()
+
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"Updated {len(questions)} questions from {total_characters} characters and {total_sessions} sessions in {elapsed:.2f}s."
+        ))
@@ -0,0 +1,94 @@
+import multiprocessing
+import os
+import random
+import statistics
+import time
+from concurrent.futures import ProcessPoolExecutor
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from akinator_app.benchmarks import save_results, summarize_latencies
+from akinator_app.kb_snapshot import KnowledgeBaseSnapshot, get_snapshot
+from akinator_app.models import Character
+from akinator_app.simulation import init_worker, play_games
+
+
+class Command(BaseCommand):
+    help = 'Plays simulated games against the real engine and reports throughput, questions per game, accuracy and per-turn latency.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--games', type=int, default=1000, help='Number of games to play.')
+        parser.add_argument('--noise', type=float, default=0.0, help='Probability that the simulated player gives a wrong answer (0-1).')
+        parser.add_argument('--max-questions', type=int, default=50, help='Give up a game after this many questions.')
+        parser.add_argument('--workers', type=int, default=os.cpu_count(), help='Number of worker processes.')
+        parser.add_argument('--chunk-size', type=int, default=25, help='Games handed to a worker at a time.')
+        parser.add_argument('--seed', type=int, default=0, help='Random seed.')
+        parser.add_argument('--snapshot', action='store_true',
+                            help='Play against a snapshot compiled in memory (unless one is already configured).')
+        parser.add_argument('--lookahead', type=int, choices=[1, 2], default=None,
+                            help='Question selection depth: 1 is greedy entropy, 2 plans two questions ahead '
+                                 '(snapshot only; default: AKINATOR_LOOKAHEAD_DEPTH).')
+        parser.add_argument('--top-k', type=int, default=None, help='Questions considered by the depth-2 lookahead.')
+        parser.add_argument('--output', type=str, default=None, help='Write the results as JSON to this path.')
+
+    def handle(self, *args, **options):
+        if not 0 <= options['noise'] <= 1:
+            raise CommandError('--noise must be between 0 and 1.')
+
+        # Only characters with at least one known feature can answer questions.
+        playable_ids = list(Character.objects.exclude(features={}).values_list('id', flat=True))
+        if not playable_ids:
+            raise CommandError('No characters with features in the knowledge base.')
+
+        rng = random.Random(options['seed'])
+        target_ids = [rng.choice(playable_ids) for _ in range(options['games'])]
+        chunks = [target_ids[i:i + options['chunk_size']] for i in range(0, len(target_ids), options['chunk_size'])]
+
+        snapshot = None
+        if options['snapshot'] or options['lookahead'] == 2:
+            snapshot = get_snapshot() or KnowledgeBaseSnapshot.from_database()
+
+        self.stdout.write(self.style.NOTICE(
+            f"--- Simulating {len(target_ids)} games on {options['workers']} workers (noise {options['noise']}) ---"
+        ))
+
+        # Forked workers must not share the parent's database connection.
+        connections.close_all()
+        started = time.perf_counter()
+        games = []
+        with ProcessPoolExecutor(
+            max_workers=options['workers'],
+            mp_context=multiprocessing.get_context('fork'),
+            initializer=init_worker,
+            initargs=(snapshot, options['lookahead'], options['top_k']),
+        ) as pool:
+            futures = [
+                pool.submit(play_games, chunk, options['seed'] + i, options['noise'], options['max_questions'])
+                for i, chunk in enumerate(chunks)
+            ]
+            for future in futures:
+                games.extend(future.result())
+        elapsed = time.perf_counter() - started
+
+        questions = [game["questions"] for game in games]
+        turn_latencies = [latency for game in games for latency in game["turn_latencies_ms"]]
+        results = {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "parameters": {
+                key: options[key]
+                for key in ('games', 'noise', 'max_questions', 'workers', 'seed', 'snapshot', 'lookahead', 'top_k')
+            },
+            "games_per_second": round(len(games) / elapsed, 2),
+            "mean_questions": round(statistics.fmean(questions), 2),
+            "accuracy": round(sum(game["correct"] for game in games) / len(games), 4),
+            "turn_latency": summarize_latencies(turn_latencies),
+        }
+
+        self.stdout.write(f"Games per second:   {results['games_per_second']}")
+        self.stdout.write(f"Mean questions:     {results['mean_questions']}")
+        self.stdout.write(f"Accuracy:           {results['accuracy']:.1%}")
+        latency = results["turn_latency"]
+        self.stdout.write(f"Turn latency:       p50 {latency['p50_ms']} ms, p95 {latency['p95_ms']} ms, max {latency['max_ms']} ms")
+
+        if options['output']:
+            save_results(results, options['output'])
+            self.stdout.write(self.style.SUCCESS(f"Results saved to {options['output']}"))
@@ -1,23 +1,37 @@
 from django.core.management.base import BaseCommand, CommandError
-from akinator_app.models import Character, Question
+from akinator_app.models import Question, KnowledgeBaseVersion
+from akinator_app.names import get_or_create_character, suggest_characters
+from akinator_app.training import ANSWER_ALIASES, import_feature_file
 
 class Command(BaseCommand):
     help = 'Manually train the AI on a specific character by answering a series of questions.'
 
     def add_arguments(self, parser):
-        parser.add_argument('character_name', type=str, help='The name of the character to train.')
+        parser.add_argument('character_name', type=str, nargs='?', help='The name of the character to train.')
+        parser.add_argument('--file', type=str, default=None,
+                            help='Non-interactive mode: apply (character, question, answer) rows from a CSV file with a header '
+                                 'or a JSONL file. Questions can be given by ID or text.')
+        parser.add_argument('--create-missing', action='store_true', help='With --file, create characters that do not exist yet.')
+        parser.add_argument('--chunk-size', type=int, default=1000, help='With --file, characters written per bulk update.')
+        parser.add_argument('--dry-run', action='store_true', help='With --file, only validate the rows.')
 
     def handle(self, *args, **options):
+        if options['file']:
+            return self.train_from_file(options)
+        if not options['character_name']:
+            raise CommandError('Give a character name, or --file for a bulk import.')
+
         character_name = options['character_name']
         
         # Find the character or create a new one.
-        character, created = Character.objects.get_or_create(
-            name__iexact=character_name,
-            defaults={'name': character_name, 'added_by': 'manual_training'}
-        )
+        character, created = get_or_create_character(character_name, added_by='manual_training')
 
         if created:
             self.stdout.write(self.style.SUCCESS(f"Created new character: '{character.name}'"))
+            suggestions = suggest_characters(character_name, exclude_id=character.id)
+            if suggestions:
+                names = ", ".join(f"'{s['name']}'" for s in suggestions)
+                self.stdout.write(self.style.WARNING(f"Similar existing characters: {names}. Run merge_duplicate_characters if this is a duplicate."))
         else:
             self.stdout.write(self.style.SUCCESS(f"Found existing character: '{character.name}'"))
 
@@ -41,14 +55,7 @@ class Command(BaseCommand):
                 # Get user input.
                 raw_answer = input(prompt).lower().strip()
                 
-                answer_map = {
-                    'y': 'yes',
-                    'n': 'no',
-                    'p': 'probably',
-                    'pn': 'probably_not',
-                    'd': 'dont_know',
-                    's': None # Skip
-                }
+                answer_map = {**ANSWER_ALIASES, 's': None}  # s skips the question
 
                 if raw_answer in answer_map:
                     answer = answer_map[raw_answer]
@@ -62,6 +69,33 @@ class Command(BaseCommand):
         # Save the updated features to the character.
         character.features = features_to_update
         character.save()
+        KnowledgeBaseVersion.bump()
 
         self.stdout.write(self.style.SUCCESS(f"\n--- Training Complete! ---"))
         self.stdout.write(f"Updated {questions_answered} features for '{character.name}'.")
+
+    def train_from_file(self, options):
+        path = options['file']
+        self.stdout.write(self.style.NOTICE(f"--- Importing features from {path} ---"))
+        try:
+            result = import_feature_file(
+                path,
+                chunk_size=options['chunk_size'],
+                create_missing=options['create_missing'],
+                dry_run=options['dry_run'],
+            )
+        except FileNotFoundError:
+            raise CommandError(f'File not found at "{path}"')
+
+        for error in result["errors"]:
+            self.stdout.write(self.style.WARNING(f"  {error}"))
+        if result["skipped"] > len(result["errors"]):
+            self.stdout.write(self.style.WARNING(f"  ... and {result['skipped'] - len(result['errors'])} more skipped rows"))
+
+        verb = "Validated" if options['dry_run'] else "Applied"
+        self.stdout.write(self.style.SUCCESS(
+            f"{verb} {result['applied']} of {result['rows']} rows: {result['characters_created']} characters created, "
+            f"{result['characters_updated']} characters updated, {result['skipped']} rows skipped."
+        ))
+        if "kb_version" in result:
+            self.stdout.write(f"Knowledge base is now at version {result['kb_version']}.")
@@ -0,0 +1,93 @@
+# Request instrumentation. Histograms live in process memory, so every
+# gunicorn worker reports its own numbers on /api/metrics/.
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+SECONDS_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+COUNT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 5000, 10000, 50000, 100000)
+
+# The phases recorded for the request currently being handled, as [(name, seconds)].
+_current_phases = ContextVar('akinator_current_phases', default=None)
+
+
+class Histogram:
+    """A cumulative Prometheus-style histogram, one series per label set."""
+
+    def __init__(self, name, help_text, buckets):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = buckets
+        self._series = {}  # {labels: [bucket counts..., sum, count]}
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self._series.setdefault(key, [0] * len(self.buckets) + [0.0, 0])
+            index = bisect.bisect_left(self.buckets, value)
+            if index < len(self.buckets):
+                series[index] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series_items = [(key, list(values)) for key, values in self._series.items()]
+        for key, values in sorted(series_items):
+            labels = ",".join(f'{name}="{value}"' for name, value in key)
+            prefix = f"{labels}," if labels else ""
+            cumulative = 0
+            for bound, count in zip(self.buckets, values):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{{{prefix}le="{bound}"}} {cumulative}')
+            lines.append(f'{self.name}_bucket{{{prefix}le="+Inf"}} {values[-1]}')
+            suffix = f"{{{labels}}}" if labels else ""
+            lines.append(f"{self.name}_sum{suffix} {values[-2]}")
+            lines.append(f"{self.name}_count{suffix} {values[-1]}")
+        return "\n".join(lines)
+
+
+REQUEST_SECONDS = Histogram('akinator_request_seconds', 'Time spent handling API requests.', SECONDS_BUCKETS)
+PHASE_SECONDS = Histogram('akinator_phase_seconds', 'Time spent in each phase of a game request.', SECONDS_BUCKETS)
+REQUEST_QUERIES = Histogram('akinator_request_queries', 'SQL queries issued per API request.', COUNT_BUCKETS)
+CANDIDATES = Histogram('akinator_candidates', 'Candidate characters left when the next question is selected.', COUNT_BUCKETS)
+
+HISTOGRAMS = [REQUEST_SECONDS, PHASE_SECONDS, REQUEST_QUERIES, CANDIDATES]
+
+
+@contextmanager
+def timed_phase(name):
+    """Times a block of code as a named request phase."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        PHASE_SECONDS.observe(elapsed, phase=name)
+        phases = _current_phases.get()
+        if phases is not None:
+            phases.append((name, elapsed))
+
+
+def record_candidates(count):
+    CANDIDATES.observe(count)
+
+
+def start_request():
+    """Starts collecting phases for a new request. Returns a token for finish_request."""
+    return _current_phases.set([])
+
+
+def finish_request(token):
+    """Stops collecting phases and returns them as [(name, seconds)]."""
+    phases = _current_phases.get() or []
+    _current_phases.reset(token)
+    return phases
+
+
+def render_prometheus():
+    return "\n".join(histogram.render() for histogram in HISTOGRAMS) + "\n"
@@ -0,0 +1,98 @@
+import cProfile
+import os
+import random
+import time
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connection
+from . import metrics
+
+
+class MetricsMiddleware:
+    """
+    Times every request, counts its SQL queries and reports both, together
+    with the phases recorded through metrics.timed_phase, in the
+    `Server-Timing` response header.
+
+    Setting AKINATOR_PROFILE_SAMPLE_RATE (0-1) profiles that share of requests
+    with cProfile; profiles of requests slower than AKINATOR_PROFILE_SLOW_MS
+    are dumped to AKINATOR_PROFILE_DIR for inspection with pstats/snakeviz.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+        self.profile_sample_rate = getattr(settings, 'AKINATOR_PROFILE_SAMPLE_RATE', 0.0)
+        self.profile_slow_ms = getattr(settings, 'AKINATOR_PROFILE_SLOW_MS', 500)
+        self.profile_dir = getattr(settings, 'AKINATOR_PROFILE_DIR', os.path.join(settings.BASE_DIR, 'profiles'))
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        query_count = 0
+        db_seconds = 0.0
+
+        def count_queries(execute, sql, params, many, context):
+            nonlocal query_count, db_seconds
+            started = time.perf_counter()
+            try:
+                return execute(sql, params, many, context)
+            finally:
+                query_count += 1
+                db_seconds += time.perf_counter() - started
+
+        profiler = cProfile.Profile() if random.random() < self.profile_sample_rate else None
+        token = metrics.start_request()
+        started = time.perf_counter()
+        try:
+            with connection.execute_wrapper(count_queries):
+                if profiler:
+                    response = profiler.runcall(self.get_response, request)
+                else:
+                    response = self.get_response(request)
+        finally:
+            phases = metrics.finish_request(token)
+        elapsed = time.perf_counter() - started
+
+        route = self.record(request, response, phases, elapsed, query_count, db_seconds)
+        if profiler and elapsed * 1000 >= self.profile_slow_ms:
+            self.dump_profile(profiler, route, elapsed)
+
+        return response
+
+    async def __acall__(self, request):
+        # Under ASGI, queries run on sync_to_async threads with their own
+        # connections, so they cannot be counted here; neither is profiling done.
+        token = metrics.start_request()
+        started = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            phases = metrics.finish_request(token)
+        self.record(request, response, phases, time.perf_counter() - started)
+        return response
+
+    def record(self, request, response, phases, elapsed, query_count=None, db_seconds=0.0):
+        """Observes the request in the histograms and sets Server-Timing. Returns the route."""
+        match = getattr(request, 'resolver_match', None)
+        route = match.route if match else 'unmatched'
+        metrics.REQUEST_SECONDS.observe(elapsed, route=route)
+
+        timings = [f"{name};dur={seconds * 1000:.2f}" for name, seconds in phases]
+        if query_count is not None:
+            metrics.REQUEST_QUERIES.observe(query_count, route=route)
+            timings.append(f'db;dur={db_seconds * 1000:.2f};desc="{query_count} queries"')
+        timings.append(f"total;dur={elapsed * 1000:.2f}")
+        response['Server-Timing'] = ", ".join(timings)
+        return route
+
+    def dump_profile(self, profiler, route, elapsed):
+        os.makedirs(self.profile_dir, exist_ok=True)
+        slug = route.strip('/').replace('/', '_') or 'root'
+        filename = f"{time.strftime('%Y%m%d-%H%M%S')}-{slug}-{elapsed * 1000:.0f}ms.prof"
+        profiler.dump_stats(os.path.join(self.profile_dir, filename))
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-18 23:40
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('akinator_app', '0007_feedback_queue'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CharacterQuestionStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('answer', models.CharField(choices=[('yes', 'yes'), ('no', 'no'), ('dont_know', 'dont_know'), ('probably', 'probably'), ('probably_not', 'probably_not')], max_length=20)),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('character', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='question_stats', to='akinator_app.character')),
+                ('question', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='character_stats', to='akinator_app.question')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['question', 'character'], name='stats_question_character_idx')],
+                'constraints': [models.UniqueConstraint(fields=('character', 'question', 'answer'), name='unique_character_question_answer')],
+            },
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-18 23:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('akinator_app', '0008_character_question_stats'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='question',
+            name='answer_rate',
+            field=models.FloatField(default=0.0),
+        ),
+        migrations.AddField(
+            model_name='question',
+            name='dont_know_rate',
+            field=models.FloatField(default=0.0),
+        ),
+    ]
@@ -0,0 +1,30 @@
+from django.db import migrations
+
+INDEX_NAME = 'akinator_character_features_gin'
+
+
+def create_gin_index(apps, schema_editor):
+    # JSONB containment queries (features @> {...}) can only use a GIN index on Postgres.
+    # SQLite filters candidates in Python and needs no index.
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(
+        f'CREATE INDEX IF NOT EXISTS {INDEX_NAME} ON akinator_app_character USING GIN (features jsonb_path_ops)'
+    )
+
+
+def drop_gin_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(f'DROP INDEX IF EXISTS {INDEX_NAME}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('akinator_app', '0009_question_answer_rates'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_gin_index, drop_gin_index),
+    ]
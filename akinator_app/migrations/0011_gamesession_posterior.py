@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 23:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('akinator_app', '0010_character_features_gin_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='gamesession',
+            name='posterior',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
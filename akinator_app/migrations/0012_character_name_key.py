@@ -0,0 +1,42 @@
+# Generated by Django 5.2.18 on 2026-10-18 23:58
+
+import unicodedata
+
+from django.db import migrations, models
+
+
+def normalize_name(name):
+    # Frozen copy of akinator_app.models.normalize_name as of this migration.
+    decomposed = unicodedata.normalize('NFKD', name or '')
+    stripped = ''.join(c for c in decomposed if not unicodedata.combining(c))
+    return ' '.join(stripped.casefold().split())
+
+
+def fill_name_keys(apps, schema_editor):
+    # Historical models have no custom save(), so the keys are computed here.
+    Character = apps.get_model('akinator_app', 'Character')
+    batch = []
+    for character in Character.objects.only('id', 'name').iterator(chunk_size=2000):
+        character.name_key = normalize_name(character.name)
+        batch.append(character)
+        if len(batch) >= 2000:
+            Character.objects.bulk_update(batch, ['name_key'])
+            batch = []
+    if batch:
+        Character.objects.bulk_update(batch, ['name_key'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('akinator_app', '0011_gamesession_posterior'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='character',
+            name='name_key',
+            field=models.CharField(db_index=True, default='', editable=False, max_length=100),
+        ),
+        migrations.RunPython(fill_name_keys, migrations.RunPython.noop),
+    ]
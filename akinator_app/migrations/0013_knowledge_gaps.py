@@ -0,0 +1,45 @@
+# Generated by Django 5.2.18 on 2026-10-19 00:11
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('akinator_app', '0012_character_name_key'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GapRankingState',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('last_session_id', models.PositiveBigIntegerField(default=0)),
+                ('last_feedback_id', models.PositiveBigIntegerField(default=0)),
+                ('games', models.PositiveIntegerField(default=0)),
+                ('completed_games', models.PositiveIntegerField(default=0)),
+                ('completed_questions', models.PositiveIntegerField(default=0)),
+                ('question_asks', models.JSONField(default=dict)),
+                ('target_games', models.JSONField(default=dict)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='KnowledgeGap',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('current_answer', models.CharField(blank=True, max_length=20, null=True)),
+                ('expected_turns_saved', models.FloatField(db_index=True)),
+                ('target_share', models.FloatField()),
+                ('ask_rate', models.FloatField()),
+                ('evidence_bits', models.FloatField()),
+                ('ranked_at', models.DateTimeField(auto_now_add=True)),
+                ('character', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='knowledge_gaps', to='akinator_app.character')),
+                ('question', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='knowledge_gaps', to='akinator_app.question')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('character', 'question'), name='unique_knowledge_gap')],
+            },
+        ),
+    ]
@@ -0,0 +1,30 @@
+from django.db import migrations
+
+# Renames the GIN index created by migration 0010 (index names are limited to
+# 30 characters). The index stays out of the model state: declared there, other
+# databases would build it as a plain index on the features column.
+OLD_NAME = 'akinator_character_features_gin'
+NEW_NAME = 'character_features_gin'
+
+
+def rename_gin_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(f'ALTER INDEX IF EXISTS {OLD_NAME} RENAME TO {NEW_NAME}')
+
+
+def restore_gin_index_name(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(f'ALTER INDEX IF EXISTS {NEW_NAME} RENAME TO {OLD_NAME}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('akinator_app', '0013_knowledge_gaps'),
+    ]
+
+    operations = [
+        migrations.RunPython(rename_gin_index, restore_gin_index_name),
+    ]
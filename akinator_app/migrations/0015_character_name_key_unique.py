@@ -0,0 +1,42 @@
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def check_duplicate_name_keys(apps, schema_editor):
+    """
+    Stops before the unique constraint is added if characters still share a name
+    key. Merging deletes rows, so it is left to the operator:
+    `manage.py merge_duplicate_characters --dry-run` shows what would be merged.
+    """
+    Character = apps.get_model('akinator_app', 'Character')
+    duplicates = (
+        Character.objects.values('name_key')
+        .annotate(copies=Count('id'))
+        .filter(copies__gt=1)
+        .count()
+    )
+    if duplicates:
+        raise RuntimeError(
+            f"Some characters share a normalized name ({duplicates} names differ only by case, accents or whitespace). "
+            "Run `python manage.py merge_duplicate_characters` (try --dry-run first) to merge them, then migrate again."
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('akinator_app', '0014_character_features_gin_index_state'),
+    ]
+
+    operations = [
+        migrations.RunPython(check_duplicate_name_keys, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='character',
+            name='name_key',
+            field=models.CharField(default='', editable=False, max_length=100),
+        ),
+        migrations.AddConstraint(
+            model_name='character',
+            constraint=models.UniqueConstraint(fields=('name_key',), name='unique_character_name_key'),
+        ),
+    ]
@@ -0,0 +1,24 @@
+from django.db import migrations
+
+# Until migration 0014 was corrected, it declared the Postgres GIN index in the
+# model state, and databases migrated with that version got it as a plain index
+# on the features column (SQLite built it when 0015 rebuilt the table). It only
+# slows down feature writes there, so it is dropped. Postgres keeps its GIN index.
+INDEX_NAME = 'character_features_gin'
+
+
+def drop_plain_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        return
+    schema_editor.execute(f'DROP INDEX IF EXISTS {INDEX_NAME}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('akinator_app', '0015_character_name_key_unique'),
+    ]
+
+    operations = [
+        migrations.RunPython(drop_plain_index, migrations.RunPython.noop),
+    ]
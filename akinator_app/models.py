@@ -1,13 +1,28 @@
+from django.core.exceptions import ValidationError
 from django.db import models
+from django.utils import timezone
+import unicodedata
 import uuid
 
 ANSWER_CHOICES = ["yes", "no", "dont_know", "probably", "probably_not"]
 
+
+def normalize_name(name):
+    """
+    Lookup key for character names: casefolded, accents stripped and whitespace
+    collapsed, so "  Marie  CURIE" and "Marie Curie" (with accents or not) match.
+    """
+    decomposed = unicodedata.normalize('NFKD', name or '')
+    stripped = ''.join(c for c in decomposed if not unicodedata.combining(c))
+    return ' '.join(stripped.casefold().split())
+
 class Question(models.Model):
     text = models.CharField(max_length=255, unique=True)
-    # These fields are for future use in a more advanced knowledge_base
-    popularity = models.FloatField(default=0.0)
-    information_value = models.FloatField(default=0.0)
+    # These fields are recomputed offline by the recompute_question_stats command.
+    popularity = models.FloatField(default=0.0)  # share of games that asked this question
+    information_value = models.FloatField(default=0.0)  # entropy of the answers over all characters
+    answer_rate = models.FloatField(default=0.0)  # share of characters with a definite answer
+    dont_know_rate = models.FloatField(default=0.0)  # share of players who answered "dont_know"
     # --- NEW LOGIC FIELDS ---
     # This question should only be asked if the answers to the prerequisite questions were 'yes'.
     prerequisite_questions = models.ManyToManyField('self', symmetrical=False, blank=True, related_name='unlocks')
@@ -19,16 +34,62 @@ class Question(models.Model):
 
 class Character(models.Model):
     name = models.CharField(max_length=100, unique=True)
+    # normalize_name(name), kept in sync by save() and unique. Look characters up by this, not name__iexact.
+    name_key = models.CharField(max_length=100, editable=False, default='')
     description = models.TextField(blank=True, null=True)
     # The features dictionary now uses the question's ID as the key.
+    # On Postgres this column has a GIN (jsonb_path_ops) index for containment (@>) lookups.
+    # Migration 0010 creates it with raw SQL; it is kept out of the model state so other databases never build it.
     features = models.JSONField(default=dict)  # {question_id: answer}
     added_by = models.CharField(max_length=50, default='system')
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['name_key'], name='unique_character_name_key'),
+        ]
+
+    def clean(self):
+        # name_key is not a form field, so forms (e.g. the admin) would not check its constraint.
+        name_key = normalize_name(self.name)
+        if Character.objects.filter(name_key=name_key).exclude(pk=self.pk).exists():
+            raise ValidationError({'name': f"A character named like '{self.name}' already exists."})
+
+    def save(self, *args, **kwargs):
+        # bulk_create() skips this, so callers that use it must set name_key themselves.
+        self.name_key = normalize_name(self.name)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'name' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'name_key'}
+        super().save(*args, **kwargs)
+
     def __str__(self):
         return self.name
 
 
+class CharacterQuestionStats(models.Model):
+    """
+    How many players gave each answer for a (character, question) pair.
+    Character.features is materialized from these counts, so a single bad
+    game can no longer flip an established fact.
+    """
+    character = models.ForeignKey(Character, on_delete=models.CASCADE, related_name='question_stats')
+    question = models.ForeignKey(Question, on_delete=models.CASCADE, related_name='character_stats')
+    answer = models.CharField(max_length=20, choices=[(a, a) for a in ANSWER_CHOICES])
+    count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['character', 'question', 'answer'], name='unique_character_question_answer'),
+        ]
+        indexes = [
+            models.Index(fields=['question', 'character'], name='stats_question_character_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.character_id}/{self.question_id}: {self.answer} x{self.count}"
+
+
 class GameSession(models.Model):
     session_id = models.UUIDField(default=uuid.uuid4, editable=False, unique=True)
     current_question = models.ForeignKey(Question, on_delete=models.SET_NULL, null=True, blank=True)
@@ -42,8 +103,102 @@ class GameSession(models.Model):
     # List of question IDs that have already been asked in this session.
     asked_question_ids = models.JSONField(default=list)
 
+    # Log weights of the candidates' posterior, {character_id: log weight}; see posterior.py.
+    posterior = models.JSONField(default=dict, blank=True)
+
     is_completed = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
 
     def __str__(self):
         return f"Session {self.session_id}"
+
+
+class KnowledgeBaseVersion(models.Model):
+    """
+    Single-row counter that is bumped whenever the knowledge base changes.
+    Writers bump it once per batch, readers use it to invalidate caches.
+    """
+    version = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    @classmethod
+    def current(cls):
+        row, _ = cls.objects.get_or_create(pk=1)
+        return row.version
+
+    @classmethod
+    def bump(cls):
+        # Atomic increment, so concurrent writers never lose a bump.
+        cls.objects.get_or_create(pk=1)
+        cls.objects.filter(pk=1).update(version=models.F('version') + 1, updated_at=timezone.now())
+        return cls.current()
+
+    def __str__(self):
+        return f"Knowledge base v{self.version}"
+
+
+class FeedbackEvent(models.Model):
+    """
+    A player's answers queued for learning. Events are appended by the
+    learn endpoint and merged into the knowledge base by the
+    process_feedback batch worker.
+    """
+    session = models.ForeignKey(GameSession, on_delete=models.SET_NULL, null=True, blank=True)
+    character = models.ForeignKey(Character, on_delete=models.CASCADE, related_name='feedback_events')
+
+    # Snapshot of the session answers, keyed by question ID.
+    answers = models.JSONField(default=dict)  # {question_id: answer}
+
+    was_correct = models.BooleanField(default=True)
+    processed_at = models.DateTimeField(null=True, blank=True, db_index=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"Feedback for {self.character_id} ({'processed' if self.processed_at else 'pending'})"
+
+
+class GapRankingState(models.Model):
+    """
+    Single-row watermark and running totals of the rank_gaps job, so each run
+    only reads the sessions and feedback events added since the last one.
+    """
+    last_session_id = models.PositiveBigIntegerField(default=0)
+    last_feedback_id = models.PositiveBigIntegerField(default=0)
+    games = models.PositiveIntegerField(default=0)  # sessions with at least one answer
+    completed_games = models.PositiveIntegerField(default=0)
+    completed_questions = models.PositiveIntegerField(default=0)  # questions asked in completed games
+    question_asks = models.JSONField(default=dict)  # {question_id: games that asked it}
+    target_games = models.JSONField(default=dict)  # {character_id: games played for it, from feedback}
+    updated_at = models.DateTimeField(auto_now=True)
+
+    @classmethod
+    def load(cls):
+        row, _ = cls.objects.get_or_create(pk=1)
+        return row
+
+    def __str__(self):
+        return f"Gap ranking up to session {self.last_session_id}"
+
+
+class KnowledgeGap(models.Model):
+    """
+    A (character, question) cell with no usable answer, ranked by how many
+    questions per game filling it is expected to save. Rewritten by rank_gaps.
+    """
+    character = models.ForeignKey(Character, on_delete=models.CASCADE, related_name='knowledge_gaps')
+    question = models.ForeignKey(Question, on_delete=models.CASCADE, related_name='knowledge_gaps')
+    # None when the cell is empty, "dont_know" when it holds no information.
+    current_answer = models.CharField(max_length=20, null=True, blank=True)
+    expected_turns_saved = models.FloatField(db_index=True)  # per game
+    target_share = models.FloatField()  # estimated share of games played for the character
+    ask_rate = models.FloatField()  # share of games that ask the question
+    evidence_bits = models.FloatField()  # information an answer would add each time the question is asked
+    ranked_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['character', 'question'], name='unique_knowledge_gap'),
+        ]
+
+    def __str__(self):
+        return f"{self.character_id}/{self.question_id}: {self.expected_turns_saved:.4f} turns"
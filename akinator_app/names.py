@@ -0,0 +1,209 @@
+import logging
+import threading
+import time
+from collections import Counter, defaultdict
+from django.conf import settings
+from django.db import IntegrityError, connection, transaction
+from .learning import increment_stats, materialize_features
+from .models import Character, CharacterQuestionStats, FeedbackEvent, KnowledgeBaseVersion, normalize_name
+
+logger = logging.getLogger(__name__)
+
+# Character lookup by normalized name, plus "did you mean" suggestions.
+#
+# Exact lookups go through the indexed Character.name_key column. Fuzzy matches
+# come from an in-memory trigram index over every name key: a name's
+# candidates are the characters sharing at least one trigram with it, ranked
+# by the Jaccard similarity of the two trigram sets.
+
+# Suggestions below this similarity (0-1) are not shown.
+FUZZY_MIN_SIMILARITY = getattr(settings, 'AKINATOR_FUZZY_MIN_SIMILARITY', 0.4)
+# The trigram index is rebuilt in the background after this many seconds, to pick
+# up characters created by other processes.
+NAME_INDEX_TTL = getattr(settings, 'AKINATOR_NAME_INDEX_TTL', 300)
+
+
+def trigrams(name_key):
+    """Character trigrams of a normalized name, padded so short names and word starts count."""
+    padded = f"  {name_key} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def similarity(a, b):
+    """Jaccard similarity of the trigram sets of two normalized names."""
+    ta, tb = trigrams(a), trigrams(b)
+    return len(ta & tb) / len(ta | tb) if ta or tb else 0.0
+
+
+class NameIndex:
+    """Trigram -> character IDs, built from (id, name_key) pairs."""
+
+    def __init__(self, rows=()):
+        self.sizes = {}
+        self.postings = defaultdict(set)
+        for char_id, name_key in rows:
+            self.add(char_id, name_key)
+
+    def add(self, char_id, name_key):
+        grams = trigrams(name_key)
+        self.sizes[char_id] = len(grams)
+        for gram in grams:
+            self.postings[gram].add(char_id)
+
+    def search(self, name, limit=5, min_similarity=FUZZY_MIN_SIMILARITY):
+        """
+        Returns:
+            list: [(character ID, similarity)], best match first.
+        """
+        query = trigrams(normalize_name(name))
+        shared = defaultdict(int)
+        for gram in query:
+            for char_id in self.postings.get(gram, ()):
+                shared[char_id] += 1
+
+        matches = []
+        for char_id, common in shared.items():
+            score = common / (len(query) + self.sizes[char_id] - common)
+            if score >= min_similarity:
+                matches.append((char_id, score))
+        matches.sort(key=lambda item: (-item[1], item[0]))
+        return matches[:limit]
+
+
+_index = None
+_index_built_at = 0.0
+_index_lock = threading.Lock()
+_rebuild_thread = None
+# Characters this process created while a rebuild was running; see _rebuild.
+_added_during_rebuild = []
+
+
+def _build_index():
+    rows = Character.objects.values_list('id', 'name_key').iterator(chunk_size=5000)
+    return NameIndex(rows)
+
+
+def _rebuild():
+    """
+    Builds a fresh index and swaps it in. Runs in a background thread, so
+    requests keep searching the old index in the meantime.
+    """
+    global _index, _rebuild_thread
+    try:
+        index = _build_index()
+        with _index_lock:
+            # The new index may have read the table before these were created.
+            for char_id, name_key in _added_during_rebuild:
+                index.add(char_id, name_key)
+            _index = index
+    except Exception:
+        logger.exception("Rebuilding the name index failed; keeping the old one.")
+    finally:
+        connection.close()  # This thread's own connection.
+        with _index_lock:
+            _added_during_rebuild.clear()
+            _rebuild_thread = None
+
+
+def get_name_index():
+    """
+    The process-wide trigram index. It is built on first use (the warm-up does
+    that before the workers fork), then rebuilt in a background thread every
+    NAME_INDEX_TTL seconds while the old one keeps serving.
+    """
+    global _index, _index_built_at, _rebuild_thread
+    with _index_lock:
+        if _index is None:
+            _index = _build_index()
+            _index_built_at = time.monotonic()
+        elif time.monotonic() - _index_built_at > NAME_INDEX_TTL and _rebuild_thread is None:
+            # Also counts as a build when it fails, so a broken rebuild is not retried on every request.
+            _index_built_at = time.monotonic()
+            _rebuild_thread = threading.Thread(target=_rebuild, name="name-index-rebuild", daemon=True)
+            _rebuild_thread.start()
+        return _index
+
+
+def find_character(name):
+    """The character whose normalized name matches exactly, or None."""
+    return Character.objects.filter(name_key=normalize_name(name)).first()
+
+
+def get_or_create_character(name, added_by):
+    """
+    Same contract as Character.objects.get_or_create(name__iexact=...), but the
+    lookup uses the name_key index and ignores accents and extra whitespace.
+
+    Returns:
+        tuple: (Character, created)
+    """
+    character = find_character(name)
+    if character is not None:
+        return character, False
+    try:
+        with transaction.atomic():
+            character = Character.objects.create(name=' '.join(name.split()), added_by=added_by)
+    except IntegrityError:
+        # Another request created it in the meantime.
+        return find_character(name), False
+    KnowledgeBaseVersion.bump()
+    with _index_lock:
+        if _index is not None:
+            _index.add(character.id, character.name_key)
+        if _rebuild_thread is not None:
+            _added_during_rebuild.append((character.id, character.name_key))
+    return character, True
+
+
+def suggest_characters(name, limit=5, exclude_id=None):
+    """
+    "Did you mean" candidates for a name, most similar first.
+
+    Returns:
+        list: [{"id", "name", "similarity"}]
+    """
+    matches = [(char_id, score) for char_id, score in get_name_index().search(name, limit + 1) if char_id != exclude_id]
+    names = dict(Character.objects.filter(id__in=[char_id for char_id, _ in matches]).values_list('id', 'name'))
+    return [
+        {"id": char_id, "name": names[char_id], "similarity": round(score, 3)}
+        for char_id, score in matches[:limit]
+        if char_id in names
+    ]
+
+
+def merge_characters(keep, duplicates):
+    """
+    Folds duplicate characters into `keep` and deletes them.
+
+    Features the kept character lacks are copied over, answer statistics are
+    added up, and queued feedback is re-pointed, so no player votes are lost.
+    The caller is responsible for bumping the knowledge-base version.
+
+    Returns:
+        int: Number of characters deleted.
+    """
+    duplicates = [character for character in duplicates if character.id != keep.id]
+    if not duplicates:
+        return 0
+    duplicate_ids = [character.id for character in duplicates]
+
+    with transaction.atomic():
+        features = {}
+        for character in duplicates:
+            features.update(character.features or {})
+        features.update(keep.features or {})
+
+        counts = Counter()
+        stats = CharacterQuestionStats.objects.filter(character_id__in=duplicate_ids, count__gt=0)
+        for question_id, answer, count in stats.values_list('question_id', 'answer', 'count'):
+            counts[(keep.id, question_id, answer)] += count
+        increment_stats(counts)
+
+        FeedbackEvent.objects.filter(character_id__in=duplicate_ids).update(character=keep)
+        Character.objects.filter(id__in=duplicate_ids).delete()
+
+        keep.features = features
+        keep.save(update_fields=['features'])
+        if counts:
+            materialize_features([keep.id])
+    return len(duplicate_ids)
@@ -0,0 +1,166 @@
+import multiprocessing
+import os
+import threading
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing.shared_memory import SharedMemory
+from django.conf import settings
+
+# Parallel entropy evaluation for very large question banks.
+#
+# The question pool is split into chunks that a persistent process pool scores
+# side by side. The scoring loop holds the GIL, which is why this uses
+# processes, not threads.
+#
+# The pool is created lazily, from a web worker that is already running
+# request threads, so it uses the forkserver start method: forking a threaded
+# process can copy a lock another thread holds. Workers map the file compiled
+# by compile_kb themselves, so its pages are shared through the page cache; an
+# in-memory snapshot is copied once into shared memory for the pool. The
+# candidate indices are handed over once per turn through shared memory.
+
+# Number of worker processes. 0 or 1 keeps every game single-process.
+PARALLEL_WORKERS = getattr(settings, 'AKINATOR_PARALLEL_WORKERS', 0)
+# Only go parallel when candidates x questions reaches this many cells;
+# below it, the round trip to the pool costs more than it saves.
+PARALLEL_MIN_CELLS = getattr(settings, 'AKINATOR_PARALLEL_MIN_CELLS', 2_000_000)
+
+
+class StaleSnapshotError(Exception):
+    """A worker mapped a different snapshot file than the process that owns the pool."""
+
+
+_pool = None
+_pool_snapshot = None
+_pool_shm = None
+_pool_lock = threading.Lock()
+_worker_snapshot = None
+_worker_shm = None
+
+
+def set_parallelism(workers, min_cells=None):
+    """Changes the pool size at runtime (used by the benchmarks)."""
+    global PARALLEL_WORKERS, PARALLEL_MIN_CELLS
+    shutdown_pool()
+    PARALLEL_WORKERS = workers
+    if min_cells is not None:
+        PARALLEL_MIN_CELLS = min_cells
+
+
+def should_parallelize(num_candidates, num_questions):
+    return PARALLEL_WORKERS > 1 and num_candidates * num_questions >= PARALLEL_MIN_CELLS
+
+
+def shutdown_pool():
+    with _pool_lock:
+        _shutdown_pool()
+
+
+def _shutdown_pool():
+    global _pool, _pool_snapshot, _pool_shm
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+    if _pool_shm is not None:
+        # Workers that still have it attached keep their mapping until they exit.
+        _pool_shm.close()
+        _pool_shm.unlink()
+    _pool = None
+    _pool_snapshot = None
+    _pool_shm = None
+
+
+def _init_worker(path, file_id, shm_name):
+    """Runs once per worker: sets Django up and opens the parent's snapshot."""
+    global _worker_snapshot, _worker_shm
+    import django
+    django.setup()
+    from .kb_snapshot import KnowledgeBaseSnapshot
+
+    if path is not None:
+        snapshot = KnowledgeBaseSnapshot.open(path)
+        # compile_kb may have swapped the file since the parent mapped it.
+        _worker_snapshot = snapshot if snapshot.file_id == file_id else None
+    else:
+        _worker_shm = SharedMemory(name=shm_name)
+        _worker_snapshot = KnowledgeBaseSnapshot(_worker_shm.buf)
+
+
+def _get_pool(snapshot):
+    """The pool is tied to one snapshot; a hot-swapped snapshot gets a fresh pool."""
+    global _pool, _pool_snapshot, _pool_shm
+    with _pool_lock:
+        if _pool is None or _pool_snapshot is not snapshot:
+            _shutdown_pool()
+            shm_name = None
+            if snapshot.path is None:
+                _pool_shm = SharedMemory(create=True, size=len(snapshot.buffer))
+                _pool_shm.buf[:len(snapshot.buffer)] = snapshot.buffer
+                shm_name = _pool_shm.name
+            _pool = ProcessPoolExecutor(
+                max_workers=PARALLEL_WORKERS,
+                mp_context=multiprocessing.get_context('forkserver'),
+                initializer=_init_worker,
+                initargs=(snapshot.path, snapshot.file_id, shm_name),
+            )
+            _pool_snapshot = snapshot
+        return _pool
+
+
+def _score_chunk(shm_name, num_indices, question_indices, total_candidates):
+    """Runs in a worker: the best (entropy, question index) within one chunk."""
+    from .knowledge_base import best_by_entropy
+
+    if _worker_snapshot is None:
+        raise StaleSnapshotError()
+    shm = SharedMemory(name=shm_name)
+    indices = shm.buf[:8 * num_indices].cast('q')
+    try:
+        return best_by_entropy(_worker_snapshot, indices, total_candidates, question_indices)
+    finally:
+        indices.release()
+        shm.close()
+
+
+def parallel_best_by_entropy(snapshot, indices, total_candidates, question_indices):
+    """
+    Same result as knowledge_base.best_by_entropy, computed by the process pool.
+
+    Returns:
+        tuple: (max entropy, best question index)
+    """
+    pool = _get_pool(snapshot)
+    chunk_count = min(len(question_indices), PARALLEL_WORKERS * 2)
+    chunk_size = -(-len(question_indices) // chunk_count)
+    chunks = [question_indices[i:i + chunk_size] for i in range(0, len(question_indices), chunk_size)]
+
+    payload = array('q', indices).tobytes()
+    shm = SharedMemory(create=True, size=max(len(payload), 1))
+    try:
+        shm.buf[:len(payload)] = payload
+        futures = [
+            pool.submit(_score_chunk, shm.name, len(indices), chunk, total_candidates)
+            for chunk in chunks
+        ]
+        # Chunks are merged in order with a strict comparison, so ties resolve
+        # exactly like the single-process loop.
+        best = (-1, None)
+        for future in futures:
+            entropy, question_index = future.result()
+            if entropy > best[0]:
+                best = (entropy, question_index)
+        return best
+    except StaleSnapshotError:
+        # Workers on a newer file: score here until the parent swaps in the new snapshot too.
+        from .knowledge_base import best_by_entropy
+        return best_by_entropy(snapshot, indices, total_candidates, question_indices)
+    finally:
+        shm.close()
+        shm.unlink()
+
+
+def default_worker_counts():
+    """1, 2, 4, ... up to the number of cores, for the scaling benchmark."""
+    counts = [1]
+    while counts[-1] * 2 <= (os.cpu_count() or 1):
+        counts.append(counts[-1] * 2)
+    return counts
@@ -0,0 +1,104 @@
+import heapq
+import math
+from django.conf import settings
+from .knowledge_base import candidate_answers
+
+# Probabilistic candidate scoring.
+#
+# Instead of dropping every candidate that contradicts a single answer, each
+# game keeps a posterior over its candidates: every answer multiplies a
+# candidate's weight by how likely a player thinking of that character would
+# give it. One careless answer only costs the right character a factor, so
+# noisy players can still win. Candidates fall out of the game once they are
+# PRUNE_RATIO times less likely than the leader, and the engine guesses as soon
+# as the leader's probability reaches GUESS_THRESHOLD.
+#
+# The posterior is stored per session as {character_id: log weight}, relative
+# to a character with no known answer to any question asked so far. Characters
+# missing from it are at that baseline (log weight 0), so a session only holds
+# the candidates whose recorded answers moved them, not one entry per character.
+
+# P(player answer | character's recorded answer). None is a cell with no known answer.
+ANSWER_LIKELIHOODS = getattr(settings, 'AKINATOR_ANSWER_LIKELIHOODS', {
+    "yes":          {"yes": 0.70, "probably": 0.12, "dont_know": 0.08, "probably_not": 0.05, "no": 0.05},
+    "probably":     {"yes": 0.30, "probably": 0.40, "dont_know": 0.15, "probably_not": 0.10, "no": 0.05},
+    "dont_know":    {"yes": 0.15, "probably": 0.15, "dont_know": 0.40, "probably_not": 0.15, "no": 0.15},
+    "probably_not": {"yes": 0.05, "probably": 0.10, "dont_know": 0.15, "probably_not": 0.40, "no": 0.30},
+    "no":           {"yes": 0.05, "probably": 0.05, "dont_know": 0.08, "probably_not": 0.12, "no": 0.70},
+    None:           {"yes": 0.20, "probably": 0.20, "dont_know": 0.20, "probably_not": 0.20, "no": 0.20},
+})
+
+# Stop and guess once the top candidate's probability reaches this value (above 1 disables it)...
+GUESS_THRESHOLD = getattr(settings, 'AKINATOR_GUESS_THRESHOLD', 0.9)
+# ...but never before this many questions have been answered.
+GUESS_MIN_QUESTIONS = getattr(settings, 'AKINATOR_GUESS_MIN_QUESTIONS', 3)
+# Drop candidates that are this many times less likely than the leader.
+PRUNE_RATIO = getattr(settings, 'AKINATOR_POSTERIOR_PRUNE_RATIO', 10_000)
+
+
+def _log_likelihoods(answer):
+    """{character answer: log P(answer | character answer)} for one player answer."""
+    return {
+        char_answer: math.log(row.get(answer, row["dont_know"]))
+        for char_answer, row in ANSWER_LIKELIHOODS.items()
+    }
+
+
+def update_posterior(posterior, candidate_ids, question, answer):
+    """
+    Folds one answer into the posterior and prunes the candidates that fell too far behind.
+
+    Weights are kept relative to a character with no known answer, so only the
+    candidates that answer the question are read and touched; everyone else
+    keeps their weight, and weights that are back to 0 are not stored.
+
+    Args:
+        posterior (dict): {str(character_id): log weight} from the session.
+        candidate_ids (list): IDs of characters that are still possible candidates.
+        question (Question): The question that was just answered.
+        answer (str): The player's answer.
+
+    Returns:
+        tuple: (new posterior, remaining candidate IDs)
+    """
+    if not candidate_ids:
+        return {}, []
+
+    log_likelihoods = _log_likelihoods(answer)
+    unknown = log_likelihoods[None]
+    updated = dict(posterior)
+    for char_id, char_answer in candidate_answers(candidate_ids, question):
+        key = str(char_id)
+        updated[key] = updated.get(key, 0.0) + log_likelihoods.get(char_answer, unknown) - unknown
+
+    # --- Prune the candidates that are PRUNE_RATIO times less likely than the leader ---
+    # Candidates missing from the posterior have weight 0.
+    weights = [(char_id, updated.get(str(char_id), 0.0)) for char_id in candidate_ids]
+    floor = max(weight for _, weight in weights) - math.log(PRUNE_RATIO)
+    kept = [(char_id, weight) for char_id, weight in weights if weight >= floor]
+    remaining = [char_id for char_id, _ in kept]
+    updated = {str(char_id): round(weight, 4) for char_id, weight in kept if round(weight, 4)}
+    return updated, remaining
+
+
+def top_guesses(posterior, candidate_ids, k=1):
+    """
+    The k most likely candidates with their normalized probabilities.
+
+    Returns:
+        list: [(character ID, probability)], most likely first. Ties go to the lowest ID.
+    """
+    if not candidate_ids:
+        return []
+    weights = {char_id: posterior.get(str(char_id), 0.0) for char_id in candidate_ids}
+    top = max(weights.values())
+    total = sum(math.exp(weight - top) for weight in weights.values())
+    best = heapq.nsmallest(k, weights.items(), key=lambda item: (-item[1], item[0]))
+    return [(char_id, math.exp(weight - top) / total) for char_id, weight in best]
+
+
+def is_confident(posterior, candidate_ids, answered_count):
+    """True once the top candidate is likely enough to stop asking questions."""
+    if answered_count < GUESS_MIN_QUESTIONS or not candidate_ids:
+        return False
+    return top_guesses(posterior, candidate_ids)[0][1] >= GUESS_THRESHOLD
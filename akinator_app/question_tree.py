@@ -0,0 +1,146 @@
+import json
+import os
+import tempfile
+from django.conf import settings
+from django.contrib.staticfiles.storage import staticfiles_storage
+from .game import apply_answer, choose_next_question
+from .kb_snapshot import KnowledgeBaseSnapshot, get_snapshot, set_snapshot
+from .models import ANSWER_CHOICES, GameSession
+
+# Client-side question tree.
+#
+# The first turns of every game only depend on the knowledge base, so
+# build_question_tree plays them ahead of time: starting from the opening
+# question, every answer path is run through the engine down to a fixed
+# depth, and the questions it would ask are written to a static JSON bundle.
+# The frontend walks the bundle locally and only talks to the server once it
+# runs out, posting the answers so far to /api/resume_game/, which replays
+# them into a new session. A stale bundle is still correct, since the
+# server replays whatever the client answered; it only asks slightly worse
+# questions until it is rebuilt.
+#
+# Bundle layout:
+#   {"format": 1, "kb_version": 12, "depth": 3,
+#    "questions": {"4": "Is your character real?", ...},
+#    "tree": {"q": 4, "a": {"yes": {"q": 9, "a": {...}}, "no": {...}, ...}}}
+# An answer missing from "a" (or a node without "a") means the client hands
+# the game to the server.
+
+BUNDLE_FORMAT = 1
+TREE_DEPTH = getattr(settings, 'AKINATOR_QUESTION_TREE_DEPTH', 3)
+# Longest answer path resume_game accepts: the tree, plus a little slack for
+# clients still holding a bundle built before the depth was lowered.
+MAX_RESUMED_ANSWERS = TREE_DEPTH + 2
+# Where build_question_tree writes the bundle, and where bundle_url looks for it;
+# collectstatic then hashes and compresses it.
+TREE_BUNDLE_NAME = 'akinator_app/question_tree.json'
+TREE_BUNDLE_PATH = getattr(
+    settings, 'AKINATOR_QUESTION_TREE_PATH',
+    os.path.join(os.path.dirname(__file__), 'static', TREE_BUNDLE_NAME),
+)
+
+
+def _branch(session):
+    """An unsaved copy of a session, so each answer path gets its own state."""
+    return GameSession(
+        possible_character_ids=list(session.possible_character_ids),
+        posterior=dict(session.posterior),
+        answers=dict(session.answers),
+    )
+
+
+def build_tree(session, depth, questions, stats):
+    """
+    The subtree the engine would play from `session`, `depth` questions deep.
+
+    Args:
+        questions (dict): Filled with {question_id: text} for every question used.
+        stats (dict): Counts of "nodes" (questions) and "leaves" (paths where the game ends early).
+
+    Returns:
+        dict: {"q": question_id, "a": {answer: subtree}}, or None when the game ends here.
+    """
+    question = choose_next_question(session)
+    if question is None:
+        stats["leaves"] += 1
+        return None
+
+    stats["nodes"] += 1
+    questions[str(question.id)] = question.text
+    node = {"q": question.id}
+    if depth > 1:
+        children = {}
+        for answer in ANSWER_CHOICES:
+            child = _branch(session)
+            apply_answer(child, question, answer)
+            subtree = build_tree(child, depth - 1, questions, stats)
+            if subtree is not None:
+                children[answer] = subtree
+        if children:
+            node["a"] = children
+    return node
+
+
+def build_bundle(depth=TREE_DEPTH):
+    """
+    Plays every answer path of the first `depth` questions through the engine.
+
+    Returns:
+        tuple: (bundle dict, stats dict)
+    """
+    previous_snapshot = get_snapshot()
+    snapshot = previous_snapshot or KnowledgeBaseSnapshot.from_database()
+    set_snapshot(snapshot)
+    try:
+        root = GameSession(possible_character_ids=list(snapshot.character_ids), posterior={}, answers={})
+        questions = {}
+        stats = {"nodes": 0, "leaves": 0}
+        tree = build_tree(root, depth, questions, stats)
+    finally:
+        set_snapshot(previous_snapshot)
+
+    bundle = {
+        "format": BUNDLE_FORMAT,
+        "kb_version": snapshot.kb_version,
+        "depth": depth,
+        "questions": questions,
+        "tree": tree,
+    }
+    return bundle, stats
+
+
+def write_bundle(bundle, path=TREE_BUNDLE_PATH):
+    """
+    Writes the bundle as compact JSON, atomically (written next to the target and
+    renamed over it).
+
+    Returns:
+        int: Size of the file in bytes.
+    """
+    payload = json.dumps(bundle, separators=(',', ':')).encode('utf-8')
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.tree-', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(payload)
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+    return len(payload)
+
+
+def bundle_url():
+    """
+    The URL of the bundle (hashed once collectstatic has run), or None when it
+    has not been built or collected, in which case the frontend plays every turn on the server.
+    """
+    if not os.path.exists(TREE_BUNDLE_PATH):
+        return None
+    try:
+        return staticfiles_storage.url(TREE_BUNDLE_NAME)
+    except ValueError:
+        # Built, but missing from the collectstatic manifest.
+        return None
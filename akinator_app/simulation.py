@@ -0,0 +1,78 @@
+import random
+import time
+import django
+from django.db import connections
+from .game import advance_game, best_guess
+from .kb_snapshot import set_snapshot
+from .knowledge_base import ALL_ANSWERS, best_question, feature_answer, set_lookahead
+from .models import Character, GameSession
+
+
+def noisy_answer(rng, true_answer, noise):
+    """With probability `noise`, the simulated player gives a different answer than the truth."""
+    if rng.random() < noise:
+        return rng.choice([answer for answer in ALL_ANSWERS if answer != true_answer])
+    return true_answer
+
+
+def play_game(target, all_ids, rng, noise=0.0, max_questions=50):
+    """
+    Plays one headless game against the real engine: an unsaved GameSession
+    goes through the same turn functions (game.py) as the game views.
+
+    Args:
+        target (Character): The character the simulated player thinks of.
+        all_ids (list): IDs of every character in the knowledge base.
+
+    Returns:
+        dict: questions asked, whether the guess was right and the latency of each turn.
+    """
+    features = target.features or {}
+    turn_latencies = []
+
+    started = time.perf_counter()
+    session = GameSession(possible_character_ids=list(all_ids), answers={})
+    question = best_question(session.possible_character_ids, [], {})
+    turn_latencies.append((time.perf_counter() - started) * 1000)
+
+    while question and len(session.answers) < max_questions:
+        answer = noisy_answer(rng, feature_answer(features, question) or "dont_know", noise)
+
+        started = time.perf_counter()
+        question = advance_game(session, question, answer)
+        turn_latencies.append((time.perf_counter() - started) * 1000)
+
+    started = time.perf_counter()
+    guessed_id, _ = best_guess(session)
+    turn_latencies.append((time.perf_counter() - started) * 1000)
+
+    return {
+        "questions": len(session.answers),
+        "correct": guessed_id == target.id,
+        "turn_latencies_ms": turn_latencies,
+    }
+
+
+def init_worker(snapshot=None, lookahead=None, top_k=None):
+    """
+    Process-pool initializer: every worker needs Django and its own database connection.
+    With a fork context, a snapshot compiled by the parent is shared copy-on-write.
+    """
+    django.setup()
+    connections.close_all()
+    if snapshot is not None:
+        set_snapshot(snapshot)
+    if lookahead is not None:
+        set_lookahead(lookahead, top_k)
+
+
+def play_games(target_ids, seed, noise=0.0, max_questions=50):
+    """Plays one game per target ID. Runs inside a pool worker."""
+    rng = random.Random(seed)
+    all_ids = list(Character.objects.values_list('id', flat=True))
+    targets = Character.objects.in_bulk(target_ids)
+    return [
+        play_game(targets[target_id], all_ids, rng, noise=noise, max_questions=max_questions)
+        for target_id in target_ids
+        if target_id in targets
+    ]
@@ -0,0 +1,69 @@
+import random
+from .models import Character, Question, normalize_name
+
+SYNTHETIC_PREFIX = "[synthetic]"
+SYNTHETIC_SOURCE = "synthetic"
+
+
+def clear_synthetic_kb():
+    """Deletes every synthetic character and question. Real data is left alone."""
+    characters, _ = Character.objects.filter(added_by=SYNTHETIC_SOURCE).delete()
+    questions, _ = Question.objects.filter(text__startswith=SYNTHETIC_PREFIX).delete()
+    return characters, questions
+
+
+def random_answer(rng, p_yes):
+    """Draws a character's answer for a question whose 'yes' rate is p_yes."""
+    if rng.random() < p_yes:
+        return "yes" if rng.random() < 0.85 else "probably"
+    return "no" if rng.random() < 0.85 else "probably_not"
+
+
+def generate_synthetic_kb(characters=1000, questions=100, sparsity=0.3, skew=0.5, seed=0, batch_size=1000):
+    """
+    Replaces any previous synthetic data with a fresh synthetic knowledge base
+    for benchmarking.
+
+    Args:
+        characters (int): Number of characters to create.
+        questions (int): Number of questions to create.
+        sparsity (float): Share of (character, question) cells left empty.
+        skew (float): 0 gives every question a 50/50 yes/no split, 1 allows
+            questions where almost every character answers the same way.
+        seed (int): Random seed, so runs are reproducible.
+
+    Returns:
+        tuple: (number of characters created, number of questions created)
+    """
+    rng = random.Random(seed)
+    clear_synthetic_kb()
+
+    # --- Step 1: Create the questions ---
+    Question.objects.bulk_create(
+        [Question(text=f"{SYNTHETIC_PREFIX} Question {i}") for i in range(questions)],
+        batch_size=batch_size,
+    )
+    question_ids = list(
+        Question.objects.filter(text__startswith=SYNTHETIC_PREFIX).order_by('id').values_list('id', flat=True)
+    )
+
+    # Each question gets its own 'yes' rate, spread further from 0.5 as skew grows.
+    yes_rates = {q_id: 0.5 + rng.uniform(-0.5, 0.5) * skew for q_id in question_ids}
+
+    # --- Step 2: Create the characters in batches ---
+    batch = []
+    for i in range(characters):
+        features = {
+            str(q_id): random_answer(rng, p_yes)
+            for q_id, p_yes in yes_rates.items()
+            if rng.random() >= sparsity
+        }
+        name = f"{SYNTHETIC_PREFIX} Character {i}"
+        batch.append(Character(name=name, name_key=normalize_name(name), features=features, added_by=SYNTHETIC_SOURCE))
+        if len(batch) >= batch_size:
+            Character.objects.bulk_create(batch)
+            batch = []
+    if batch:
+        Character.objects.bulk_create(batch)
+
+    return characters, questions
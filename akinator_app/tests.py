@@ -1,3 +1,1049 @@
-from django.test import TestCase
+import io
+import math
+import os
+import random
+import tempfile
+from datetime import timedelta
+from unittest import mock, skipUnless
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.db import DatabaseError, IntegrityError, connection, transaction
+from django.db.backends.postgresql.base import DatabaseWrapper as PostgresDatabaseWrapper
+from django.test import TestCase, TransactionTestCase
+from django.utils import timezone
+from . import kb_snapshot, knowledge_base, lookahead, names, parallel
+from .benchmarks import percentile, run_engine_benchmarks
+from .compaction import compact_knowledge_base
+from .game import advance_game
+from .gaps import GAP_SESSION_GRACE, refresh_knowledge_gaps
+from .kb_snapshot import KnowledgeBaseSnapshot, get_snapshot, set_snapshot, write_snapshot
+from .kb_transfer import export_records, import_records, write_records
+from .knowledge_base import ALL_ANSWERS, best_question, candidate_answers, feature_answer
+from .learning import consensus_answer, materialize_features, process_feedback_batch
+from .metrics import Histogram
+from .models import (
+    Character, Question, GameSession, FeedbackEvent, KnowledgeBaseVersion, CharacterQuestionStats, GapRankingState,
+    KnowledgeGap, normalize_name,
+)
+from .names import find_character, get_name_index, get_or_create_character, merge_characters, suggest_characters
+from .posterior import ANSWER_LIKELIHOODS, is_confident, top_guesses, update_posterior
+from .question_tree import MAX_RESUMED_ANSWERS, build_bundle
+from .simulation import play_game
+from .synthetic import SYNTHETIC_SOURCE, clear_synthetic_kb, generate_synthetic_kb
+from .warmup import WARMUP_STATE, warm_up
 
-# Create your tests here.
+
+def make_questions(*texts):
+    return [Question.objects.create(text=text) for text in texts]
+
+
+def make_characters(questions, table):
+    """
+    Creates one character per row of `table`: {name: answers}, where answers
+    is a string with one letter per question (y/n/p/q/d for yes/no/probably/
+    probably_not/dont_know, "." for no answer).
+    """
+    letters = {"y": "yes", "n": "no", "p": "probably", "q": "probably_not", "d": "dont_know"}
+    characters = []
+    for name, answers in table.items():
+        features = {str(q.id): letters[a] for q, a in zip(questions, answers) if a != "."}
+        characters.append(Character.objects.create(name=name, features=features))
+    return characters
+
+
+class SnapshotTestCase(TestCase):
+    """Restores the engine to its database paths after each test."""
+
+    def install_snapshot(self):
+        set_snapshot(KnowledgeBaseSnapshot.from_database())
+        self.addCleanup(set_snapshot, None)
+
+
+def vote(character, question, answer, times=1):
+    """Queues `times` games in which the player answered `question` about `character`."""
+    for _ in range(times):
+        FeedbackEvent.objects.create(character=character, answers={str(question.id): answer}, was_correct=True)
+
+
+class FeedbackQueueTests(TestCase):
+    def setUp(self):
+        self.question, = make_questions("Is your character real?")
+        self.key = str(self.question.id)
+
+    def test_learn_only_queues_the_answers(self):
+        character = Character.objects.create(name="Ada Lovelace")
+        session = GameSession.objects.create(answers={self.key: "yes"}, possible_character_ids=[character.id])
+
+        response = self.client.post("/api/learn/", {
+            "session_id": str(session.session_id), "was_correct": True, "guessed_character_id": character.id,
+        }, content_type="application/json")
+
+        self.assertEqual(response.status_code, 200)
+        event = FeedbackEvent.objects.get()
+        self.assertEqual((event.character_id, event.answers, event.processed_at), (character.id, {self.key: "yes"}, None))
+        character.refresh_from_db()
+        self.assertEqual(character.features, {})
+
+    def test_batch_is_aggregated_and_bumps_once(self):
+        character = Character.objects.create(name="Ada Lovelace")
+        vote(character, self.question, "yes", times=3)
+        version = KnowledgeBaseVersion.current()
+
+        self.assertEqual(process_feedback_batch(batch_size=2), (2, 0))
+        self.assertEqual(process_feedback_batch(batch_size=2), (1, 1))
+        self.assertEqual(process_feedback_batch(), (0, 0))
+
+        character.refresh_from_db()
+        self.assertEqual(character.features, {self.key: "yes"})
+        self.assertEqual(KnowledgeBaseVersion.current(), version + 1)
+        self.assertFalse(FeedbackEvent.objects.filter(processed_at__isnull=True).exists())
+
+    def test_text_keyed_answers_are_skipped(self):
+        character = Character.objects.create(name="Ada Lovelace")
+        FeedbackEvent.objects.create(character=character, answers={self.question.text: "yes"}, was_correct=True)
+        with self.assertLogs('akinator_app.learning', 'WARNING'):
+            self.assertEqual(process_feedback_batch(), (1, 0))
+        self.assertFalse(CharacterQuestionStats.objects.exists())
+
+
+class AnswerStatisticsTests(TestCase):
+    def setUp(self):
+        self.question, = make_questions("Is your character real?")
+        self.key = str(self.question.id)
+
+    def test_consensus(self):
+        self.assertIsNone(consensus_answer({"yes": 2}))
+        self.assertEqual(consensus_answer({"yes": 3}), "yes")
+        self.assertIsNone(consensus_answer({"yes": 2, "no": 2}))
+        self.assertEqual(consensus_answer({"yes": 3, "no": 1}), "yes")
+
+    def test_curated_feature_needs_a_majority_to_flip(self):
+        character = Character.objects.create(name="Ada Lovelace", features={self.key: "yes"})
+        vote(character, self.question, "no")
+        process_feedback_batch()
+        character.refresh_from_db()
+        self.assertEqual(character.features[self.key], "yes")
+        # The curated answer entered the statistics with its seed votes.
+        self.assertEqual(CharacterQuestionStats.objects.get(character=character, answer="yes").count, 3)
+
+        vote(character, self.question, "no", times=3)
+        process_feedback_batch()
+        character.refresh_from_db()
+        self.assertEqual(character.features[self.key], "no")  # 4 "no" against 3 curated "yes"
+
+    def test_contested_cells_keep_their_feature(self):
+        character = Character.objects.create(name="Ada Lovelace", features={self.key: "probably"})
+        CharacterQuestionStats.objects.create(character=character, question=self.question, answer="yes", count=2)
+        CharacterQuestionStats.objects.create(character=character, question=self.question, answer="no", count=2)
+        self.assertEqual(materialize_features(), 0)
+        character.refresh_from_db()
+        self.assertEqual(character.features, {self.key: "probably"})
+
+
+class QuestionStatisticsTests(TestCase):
+    def test_recompute_from_characters_and_sessions(self):
+        split, sparse = make_questions("Is your character real?", "Can your character fly?")
+        make_characters([split, sparse], {"A": "yy", "B": "y.", "C": "n.", "D": "n."})
+        GameSession.objects.create(answers={str(split.id): "yes"})
+        GameSession.objects.create(answers={split.text: "dont_know"})  # Legacy text key.
+        version = KnowledgeBaseVersion.current()
+
+        call_command('recompute_question_stats', stdout=io.StringIO())
+
+        split.refresh_from_db()
+        sparse.refresh_from_db()
+        self.assertAlmostEqual(split.information_value, 1.0)
+        self.assertEqual((split.answer_rate, split.popularity, split.dont_know_rate), (1.0, 1.0, 0.5))
+        self.assertEqual((sparse.answer_rate, sparse.popularity), (0.25, 0.0))
+        self.assertEqual(KnowledgeBaseVersion.current(), version + 1)
+
+    def test_pruning_keeps_unscored_questions(self):
+        pool = [("best", 1.0, 0.0), ("noisy", 1.0, 0.9), ("new", 0.0, 0.0)]
+        with mock.patch.object(knowledge_base, 'QUESTION_POOL_SIZE', 1):
+            kept = knowledge_base.prune_question_pool(pool, lambda item: item[1:])
+        self.assertEqual([item[0] for item in kept], ["best", "new"])
+
+
+class SyntheticKnowledgeBaseTests(TestCase):
+    def features(self):
+        # Keyed by question position, since every run creates new questions.
+        first_id = Question.objects.order_by('id').first().id
+        rows = Character.objects.filter(added_by=SYNTHETIC_SOURCE).order_by('name').values_list('features', flat=True)
+        return [{int(key) - first_id: answer for key, answer in features.items()} for features in rows]
+
+    def test_generation_is_reproducible_and_leaves_real_data_alone(self):
+        real = Character.objects.create(name="Ada Lovelace")
+        self.assertEqual(generate_synthetic_kb(characters=50, questions=10, sparsity=0.5, seed=1), (50, 10))
+        first = self.features()
+        generate_synthetic_kb(characters=50, questions=10, sparsity=0.5, seed=1)
+        self.assertEqual(self.features(), first)
+
+        cells = sum(len(features) for features in first)
+        self.assertTrue(150 < cells < 350, cells)  # About half of the 500 cells.
+
+        self.assertEqual(clear_synthetic_kb(), (50, 10))
+        self.assertEqual(list(Character.objects.all()), [real])
+
+    def test_engine_benchmark_reports_every_scenario(self):
+        generate_synthetic_kb(characters=40, questions=8)
+        report = run_engine_benchmarks(repeat=2, answered=3)
+        self.assertEqual(report["knowledge_base"]["characters"], 40)
+        self.assertEqual(set(report["results"]), {
+            "best_question_opening", "best_question_mid_game", "update_posterior_opening", "top_guesses_mid_game",
+        })
+        for result in report["results"].values():
+            self.assertEqual(result["runs"], 2)
+            self.assertIn("queries", result)
+
+    def test_percentile(self):
+        self.assertEqual(percentile([5, 1, 4, 2, 3], 50), 3)
+        self.assertEqual(percentile([5, 1, 4, 2, 3], 95), 5)
+
+
+class SimulationTests(TestCase):
+    def setUp(self):
+        self.questions = make_questions("q1", "q2", "q3", "q4")
+        self.characters = make_characters(self.questions, {
+            "A": "yyyy", "B": "yynn", "C": "ynyn", "D": "nyyn", "E": "nnny", "F": "nnnn",
+        })
+        self.ids = [character.id for character in self.characters]
+
+    def test_honest_players_are_guessed(self):
+        rng = random.Random(0)
+        for target in self.characters:
+            game = play_game(target, self.ids, rng)
+            self.assertTrue(game["correct"], target.name)
+            self.assertEqual(len(game["turn_latencies_ms"]), game["questions"] + 2)
+        # The simulator never writes sessions.
+        self.assertFalse(GameSession.objects.exists())
+
+    def test_question_limit(self):
+        game = play_game(self.characters[0], self.ids, random.Random(0), max_questions=1)
+        self.assertEqual(game["questions"], 1)
+
+
+class InstrumentationTests(TestCase):
+    def setUp(self):
+        make_characters(make_questions("Is your character real?"), {"A": "y", "B": "n"})
+
+    def test_server_timing_reports_phases_and_queries(self):
+        response = self.client.get("/api/start_game/")
+
+        timings = dict(entry.split(";", 1) for entry in response["Server-Timing"].split(", "))
+        self.assertTrue({"question_selection", "save", "db", "total"} <= set(timings), timings)
+        queries = int(timings["db"].split('desc="')[1].split()[0])
+        self.assertGreater(queries, 0)
+
+    def test_metrics_endpoint_counts_requests_per_route(self):
+        def count():
+            for line in self.client.get("/api/metrics/").content.decode().splitlines():
+                if line.startswith('akinator_request_seconds_count{route="api/start_game/"}'):
+                    return int(line.split()[-1])
+            return 0
+
+        before = count()
+        self.client.get("/api/start_game/")
+        self.client.get("/api/start_game/")
+        self.assertEqual(count(), before + 2)
+
+    def test_histogram_buckets_are_cumulative(self):
+        histogram = Histogram('test_seconds', 'Test.', (0.1, 1.0))
+        for value in (0.05, 0.5, 5.0):
+            histogram.observe(value, route="x")
+        lines = histogram.render().splitlines()
+        self.assertIn('test_seconds_bucket{route="x",le="0.1"} 1', lines)
+        self.assertIn('test_seconds_bucket{route="x",le="1.0"} 2', lines)
+        self.assertIn('test_seconds_bucket{route="x",le="+Inf"} 3', lines)
+        self.assertIn('test_seconds_count{route="x"} 3', lines)
+
+
+class CandidateFilterTests(TestCase):
+    def setUp(self):
+        self.question, self.other = make_questions("Is your character real?", "Can your character fly?")
+        key = str(self.question.id)
+        for name, features in {
+            "by ID": {key: "yes"},
+            "by text": {self.question.text: "probably"},
+            "both keys": {key: "no", self.question.text: "yes"},  # The ID key wins.
+            "unknown": {str(self.other.id): "yes"},
+            "not an answer": {key: "maybe"},
+        }.items():
+            Character.objects.create(name=name, features=features)
+        self.ids = list(Character.objects.values_list('id', flat=True))
+
+    def expected(self):
+        answers = {char_id: feature_answer(features, self.question)
+                   for char_id, features in Character.objects.values_list('id', 'features')}
+        return sorted((char_id, answer) for char_id, answer in answers.items() if answer in ALL_ANSWERS)
+
+    def test_postgres_query_is_index_friendly(self):
+        # Compiled only, so this runs on every database.
+        postgres = PostgresDatabaseWrapper({**connection.settings_dict, 'ENGINE': 'django.db.backends.postgresql'}, 'postgres')
+        sql, params = knowledge_base._answer_rows(self.ids, self.question).query.get_compiler(connection=postgres).as_sql()
+
+        self.assertIn('"features" @> %s', sql)
+        self.assertNotIn('NOT ("akinator_app_character"."features" @>', sql)
+        # The question ID is read as an object key, not as an array index.
+        self.assertNotIn("->>", sql)
+        self.assertIn("jsonb_extract_path_text", sql)
+        self.assertIn(str(self.question.id), params)
+
+    @skipUnless(connection.vendor == 'postgresql', "Runs the containment query, which needs Postgres.")
+    def test_postgres_answers_match_feature_answer(self):
+        self.assertEqual(sorted(candidate_answers(self.ids, self.question)), self.expected())
+
+    @skipUnless(connection.vendor != 'postgresql', "Covers the streaming path used by other databases.")
+    def test_streamed_answers_match_feature_answer(self):
+        answers = sorted(candidate_answers(self.ids, self.question))
+        self.assertEqual([pair for pair in answers if pair[1] in ALL_ANSWERS], self.expected())
+
+
+class SnapshotTests(TestCase):
+    def setUp(self):
+        self.questions = make_questions("Is your character real?", "Can your character fly?")
+        make_characters(self.questions, {"Ada Lovelace": "y.", "Superman": "ny"})
+        Character.objects.create(name="Zoë", features={self.questions[0].text: "probably"})  # Legacy text key.
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, "kb.snapshot")
+
+    def test_compiled_file_round_trip(self):
+        call_command('compile_kb', output=self.path, stdout=io.StringIO())
+        snapshot = KnowledgeBaseSnapshot.open(self.path)
+
+        self.assertEqual(snapshot.kb_version, KnowledgeBaseVersion.current())
+        self.assertEqual(list(snapshot.character_ids), list(Character.objects.order_by('id').values_list('id', flat=True)))
+        self.assertEqual([snapshot.name(i) for i in range(3)], ["Ada Lovelace", "Superman", "Zoë"])
+        real = snapshot.question_index[self.questions[0].id]
+        fly = snapshot.question_index[self.questions[1].id]
+        codes = kb_snapshot.ANSWER_CODES
+        self.assertEqual(snapshot.codes(real, [0, 1, 2]), bytes([codes["yes"], codes["no"], codes["probably"]]))
+        self.assertEqual(snapshot.codes(fly, [0, 1, 2]), bytes([kb_snapshot.UNKNOWN_CODE, codes["yes"], kb_snapshot.UNKNOWN_CODE]))
+        self.assertEqual(snapshot.question(real).text, "Is your character real?")
+
+    def test_workers_swap_in_a_recompiled_file(self):
+        write_snapshot(self.path)
+        patches = mock.patch.multiple(kb_snapshot, SNAPSHOT_PATH=self.path, SNAPSHOT_CHECK_INTERVAL=0, _snapshot_file_id=None)
+        patches.start()
+        self.addCleanup(patches.stop)
+        self.addCleanup(set_snapshot, None)
+
+        old = get_snapshot()
+        self.assertEqual(old.num_characters, 3)
+        self.assertIs(get_snapshot(), old)
+
+        Character.objects.create(name="Marie Curie")
+        KnowledgeBaseVersion.bump()
+        write_snapshot(self.path)
+
+        new = get_snapshot()
+        self.assertIsNot(new, old)
+        self.assertEqual((new.num_characters, new.kb_version), (4, KnowledgeBaseVersion.current()))
+        # Requests still holding the old snapshot keep reading its pages.
+        self.assertEqual(old.name(2), "Zoë")
+
+
+class SnapshotParityTests(SnapshotTestCase):
+    def setUp(self):
+        self.questions = make_questions("Is your character real?", "Is your character human?", "Can your character fly?")
+        make_characters(self.questions, {
+            "A": "yyn", "B": "yn.", "C": "nnp", "D": "d.q", "E": "...", "F": "qpy",
+        })
+        # A legacy row keyed by question text.
+        Character.objects.create(name="G", features={self.questions[0].text: "no", str(self.questions[1].id): "yes"})
+        self.ids = list(Character.objects.order_by('id').values_list('id', flat=True))
+
+    def run_both(self, func):
+        from_database = func()
+        self.install_snapshot()
+        from_snapshot = func()
+        set_snapshot(None)
+        return from_database, from_snapshot
+
+    def test_candidate_answers_match(self):
+        for question in self.questions:
+            database, snapshot = self.run_both(lambda: sorted(candidate_answers(self.ids, question)))
+            self.assertEqual(database, snapshot)
+
+    def test_posterior_updates_match(self):
+        for question in self.questions:
+            for answer in ALL_ANSWERS:
+                database, snapshot = self.run_both(lambda: update_posterior({}, self.ids, question, answer))
+                self.assertEqual(database, snapshot)
+
+    def test_best_question_matches(self):
+        cases = [
+            (self.ids, [], {}),
+            (self.ids[:4], [str(self.questions[0].id)], {str(self.questions[0].id): "yes"}),
+        ]
+        for candidate_ids, asked, answers in cases:
+            database, snapshot = self.run_both(lambda: best_question(candidate_ids, asked, answers).id)
+            self.assertEqual(database, snapshot)
+
+
+class WarmUpTests(TestCase):
+    def setUp(self):
+        make_characters(make_questions("Is your character real?"), {"A": "y", "B": "n"})
+        fresh_state = {"enabled": False, "ready": False, "kb_version": None, "characters": None, "timings_ms": {}, "error": None}
+        for patch in (
+            mock.patch.dict(WARMUP_STATE, fresh_state),
+            # Closing the connection would break the test's transaction.
+            mock.patch('akinator_app.warmup.connections'),
+            mock.patch.object(names, '_index', None),
+        ):
+            patch.start()
+            self.addCleanup(patch.stop)
+        self.addCleanup(set_snapshot, None)
+
+    def test_warm_up_installs_the_snapshot(self):
+        with self.assertLogs('akinator_app.warmup', 'INFO'):
+            warm_up()
+
+        self.assertEqual(get_snapshot().num_characters, 2)
+        response = self.client.get("/api/ready/")
+        self.assertEqual(response.status_code, 200)
+        body = response.json()
+        self.assertTrue(body["ready"] and body["warm"])
+        self.assertEqual((body["kb_version"], body["characters"]), (KnowledgeBaseVersion.current(), 2))
+        self.assertIn("opening_question", body["timings_ms"])
+        self.assertEqual(len(names._index.sizes), 2)
+
+    def test_failed_warm_up_serves_cold(self):
+        with mock.patch.object(KnowledgeBaseSnapshot, 'from_database', side_effect=DatabaseError("connection refused")), \
+                self.assertLogs('akinator_app.warmup', 'ERROR'):
+            warm_up()
+
+        self.assertIsNone(get_snapshot())
+        response = self.client.get("/api/ready/")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((response.json()["warm"], response.json()["error"]), (False, "connection refused"))
+
+    def test_not_ready_without_a_database(self):
+        with mock.patch.object(KnowledgeBaseVersion, 'current', side_effect=DatabaseError("connection refused")):
+            response = self.client.get("/api/ready/")
+        self.assertEqual(response.status_code, 503)
+        self.assertIn("connection refused", response.json()["error"])
+
+
+class SnapshotRebuildTests(TransactionTestCase):
+    # The rebuild thread has its own connection, so the data must be committed.
+
+    def test_stale_snapshot_is_rebuilt_in_the_background(self):
+        make_characters(make_questions("Is your character real?"), {"A": "y"})
+        patch = mock.patch.object(kb_snapshot, 'SNAPSHOT_CHECK_INTERVAL', 0)
+        patch.start()
+        self.addCleanup(patch.stop)
+        self.addCleanup(set_snapshot, None)
+        stale = KnowledgeBaseSnapshot.from_database()
+        set_snapshot(stale)
+
+        Character.objects.create(name="B")
+        KnowledgeBaseVersion.bump()
+        # The request that notices the new version still gets the old snapshot.
+        self.assertIs(get_snapshot(), stale)
+        thread = kb_snapshot._rebuild_thread
+        if thread is not None:
+            thread.join(timeout=30)
+
+        fresh = get_snapshot()
+        self.assertEqual((fresh.kb_version, fresh.num_characters), (KnowledgeBaseVersion.current(), 2))
+
+
+class ParallelScoringTests(SnapshotTestCase):
+    def setUp(self):
+        generate_synthetic_kb(characters=300, questions=40, seed=3)
+        self.ids = list(Character.objects.values_list('id', flat=True))
+        previous = (parallel.PARALLEL_WORKERS, parallel.PARALLEL_MIN_CELLS)
+        self.addCleanup(parallel.set_parallelism, *previous)
+
+    def picks(self, snapshot):
+        set_snapshot(snapshot)
+        self.addCleanup(set_snapshot, None)
+        cases = [(self.ids, []), (self.ids[::3], []), (self.ids[::2], [str(snapshot.question_rows[0]["id"])])]
+        return [best_question(candidate_ids, asked, {}).id for candidate_ids, asked in cases]
+
+    def test_pool_picks_the_same_questions(self):
+        snapshot = KnowledgeBaseSnapshot.from_database()
+        serial = self.picks(snapshot)
+        parallel.set_parallelism(2, min_cells=0)
+        with mock.patch.object(knowledge_base, 'best_by_entropy', wraps=knowledge_base.best_by_entropy) as in_process:
+            self.assertEqual(self.picks(snapshot), serial)
+        self.assertEqual(in_process.call_count, 0)
+
+    def test_stale_file_falls_back_to_in_process_scoring(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        path = os.path.join(directory.name, "kb.snapshot")
+        write_snapshot(path)
+        snapshot = KnowledgeBaseSnapshot.open(path)
+        serial = self.picks(snapshot)
+
+        write_snapshot(path)  # compile_kb swapped the file: the workers map a different one.
+        parallel.set_parallelism(2, min_cells=0)
+        with mock.patch.object(knowledge_base, 'best_by_entropy', wraps=knowledge_base.best_by_entropy) as in_process:
+            self.assertEqual(self.picks(snapshot), serial)
+        self.assertEqual(in_process.call_count, 3)
+
+
+class PosteriorTests(TestCase):
+    def setUp(self):
+        self.question, = make_questions("Is your character real?")
+        self.yes, self.no, self.unknown = make_characters([self.question], {"A": "y", "B": "n", "C": "."})
+        self.ids = [self.yes.id, self.no.id, self.unknown.id]
+
+    def test_answer_reweights_relative_to_unknown(self):
+        posterior, remaining = update_posterior({}, self.ids, self.question, "yes")
+
+        self.assertEqual(remaining, self.ids)
+        # Only the candidates with a recorded answer are stored.
+        self.assertEqual(set(posterior), {str(self.yes.id), str(self.no.id)})
+        self.assertAlmostEqual(posterior[str(self.yes.id)], math.log(0.70 / 0.20), places=3)
+        self.assertAlmostEqual(posterior[str(self.no.id)], math.log(0.05 / 0.20), places=3)
+
+        guesses = dict(top_guesses(posterior, remaining, k=3))
+        self.assertAlmostEqual(sum(guesses.values()), 1.0)
+        self.assertAlmostEqual(guesses[self.yes.id] / guesses[self.unknown.id], 0.70 / 0.20, places=3)
+        self.assertEqual(top_guesses(posterior, remaining)[0][0], self.yes.id)
+
+    def test_unlikely_candidates_are_pruned(self):
+        posterior, remaining = {}, self.ids
+        for _ in range(4):
+            posterior, remaining = update_posterior(posterior, remaining, self.question, "yes")
+        # (0.05 / 0.70)^4 is below 1 / PRUNE_RATIO.
+        self.assertNotIn(self.no.id, remaining)
+        self.assertNotIn(str(self.no.id), posterior)
+        self.assertEqual(remaining, [self.yes.id, self.unknown.id])
+
+    def test_confidence_needs_enough_questions_and_a_clear_leader(self):
+        posterior = {str(self.yes.id): 10.0}
+        self.assertTrue(is_confident(posterior, self.ids, 3))
+        self.assertFalse(is_confident(posterior, self.ids, 2))
+        self.assertFalse(is_confident({}, self.ids, 10))
+
+    def test_unknown_answers_leave_weights_alone(self):
+        posterior, _ = update_posterior({}, self.ids, self.question, "dont_know")
+        self.assertAlmostEqual(
+            posterior[str(self.yes.id)], math.log(ANSWER_LIKELIHOODS["yes"]["dont_know"] / 0.20), places=3
+        )
+        self.assertNotIn(str(self.unknown.id), posterior)
+
+
+class GuessEndpointTests(TestCase):
+    def setUp(self):
+        self.question, = make_questions("Is your character real?")
+        self.characters = make_characters([self.question], {"A": "y", "B": "n"})
+        self.session = GameSession.objects.create(possible_character_ids=[c.id for c in self.characters], answers={})
+
+    def guess(self, **params):
+        return self.client.get("/api/guess/", params)
+
+    def test_guesses_follow_the_posterior(self):
+        self.client.post("/api/answer/", {
+            "session_id": str(self.session.session_id), "question_id": self.question.id, "answer": "yes",
+        }, content_type="application/json")
+
+        body = self.guess(session_id=str(self.session.session_id), k=2).json()
+        self.assertEqual(body["remaining_candidates"], 2)
+        self.assertFalse(body["confident"])  # Only one question answered.
+        self.assertEqual([guess["character"]["name"] for guess in body["guesses"]], ["A", "B"])
+        self.assertAlmostEqual(body["guesses"][0]["probability"], 0.70 / 0.75, places=3)
+
+    def test_bad_requests(self):
+        self.assertEqual(self.guess(session_id="nope").status_code, 404)
+        self.assertEqual(self.guess().status_code, 404)
+        self.assertEqual(self.guess(session_id=str(self.session.session_id), k="x").status_code, 400)
+
+
+class LookaheadTests(SnapshotTestCase):
+    def setUp(self):
+        previous = (knowledge_base.LOOKAHEAD_DEPTH, knowledge_base.LOOKAHEAD_TOP_K)
+        self.addCleanup(knowledge_base.set_lookahead, *previous)
+
+    def setup_knowledge_base(self, table):
+        questions = make_questions(*(f"q{i}" for i in range(1, len(next(iter(table.values()))) + 1)))
+        characters = make_characters(questions, table)
+        self.install_snapshot()
+        return questions, [character.id for character in characters]
+
+    def test_depth_two_plans_the_follow_up(self):
+        # q4 splits 3/3 (the most entropy), but its "no" half cannot be split any
+        # further; after q2 the best follow-up separates more of the candidates.
+        questions, ids = self.setup_knowledge_base({
+            "c1": "yyny", "c2": "nyny", "c3": "nnnn", "c4": "nnyy", "c5": "nnnn", "c6": "nnnn",
+        })
+        knowledge_base.set_lookahead(1)
+        self.assertEqual(best_question(ids, [], {}).id, questions[3].id)
+        knowledge_base.set_lookahead(2, top_k=10)
+        self.assertEqual(best_question(ids, [], {}).id, questions[1].id)
+
+    def test_depth_two_weighs_candidates_by_the_posterior(self):
+        # q1 splits the four candidates in half; q2 and q3 both separate c1 from c2.
+        questions, ids = self.setup_knowledge_base({"c1": "yyyn", "c2": "ynnn", "c3": "nnny", "c4": "nnnn"})
+        knowledge_base.set_lookahead(2, top_k=10)
+        self.assertEqual(best_question(ids, [], {}).id, questions[0].id)
+        # Once c3 and c4 are unlikely, asking about them wastes a question.
+        posterior = {str(ids[2]): -8.0, str(ids[3]): -8.0}
+        self.assertIn(best_question(ids, [], {}, posterior).id, (questions[1].id, questions[2].id))
+
+    def test_information_gain(self):
+        yes, no = kb_snapshot.ANSWER_CODES["yes"], kb_snapshot.ANSWER_CODES["no"]
+        masses = [0.0] * lookahead.NUM_CODES
+        masses[yes] = 1.0
+        self.assertAlmostEqual(lookahead.information_gain(masses), 0.0)
+        masses[no] = 1.0
+        split = lookahead.information_gain(masses)
+        self.assertGreater(split, 0.5)
+        masses[kb_snapshot.UNKNOWN_CODE] = 2.0
+        self.assertLess(lookahead.information_gain(masses), split)
+
+
+class NameTests(TestCase):
+    def setUp(self):
+        patch = mock.patch.object(names, '_index', None)
+        patch.start()
+        self.addCleanup(patch.stop)
+
+    def test_normalize_name(self):
+        self.assertEqual(normalize_name("  Marie  CURIE "), "marie curie")
+        self.assertEqual(normalize_name("Amélie Poulain"), normalize_name("amelie poulain"))
+
+    def test_variants_resolve_to_one_character(self):
+        character = Character.objects.create(name="Marie Curie")
+        self.assertEqual(find_character("marie  curie"), character)
+        self.assertEqual(get_or_create_character("MARIE CURIE", added_by="test"), (character, False))
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Character.objects.create(name="marie curie")
+
+    def test_suggestions_include_characters_created_since_the_index_was_built(self):
+        Character.objects.create(name="Elon Musk")
+        get_name_index()
+        get_or_create_character("Marie Curie", added_by="test")
+        self.assertEqual([match["name"] for match in suggest_characters("Marie Curi")], ["Marie Curie"])
+        self.assertEqual([match["name"] for match in suggest_characters("Elon Muks")], ["Elon Musk"])
+
+    def test_similar_names_are_created_unless_rejected(self):
+        Character.objects.create(name="Elon Musk")
+        response = self.client.post("/api/add_character/", {"name": "Elon Muks", "reject_similar": True},
+                                    content_type="application/json")
+        self.assertEqual(response.status_code, 409)
+
+        scraped = {"name": "Elon Muks", "summary": "", "details": {}}
+        with mock.patch('akinator_app.views.get_character_info', return_value=scraped):
+            response = self.client.post("/api/add_character/", {"name": "Elon Muks"}, content_type="application/json")
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()["did_you_mean"][0]["name"], "Elon Musk")
+
+    def test_merge_keeps_votes_and_features(self):
+        question, other = make_questions("Is your character real?", "Is your character human?")
+        keep = Character.objects.create(name="Elon Musk", features={str(question.id): "yes"})
+        typo = Character.objects.create(name="Elon Muks", features={str(question.id): "no", str(other.id): "yes"})
+        CharacterQuestionStats.objects.create(character=keep, question=other, answer="yes", count=1)
+        CharacterQuestionStats.objects.create(character=typo, question=other, answer="yes", count=2)
+        FeedbackEvent.objects.create(character=typo, answers={}, was_correct=True)
+
+        self.assertEqual(merge_characters(keep, [typo]), 1)
+
+        keep.refresh_from_db()
+        self.assertFalse(Character.objects.filter(id=typo.id).exists())
+        self.assertEqual(keep.features, {str(question.id): "yes", str(other.id): "yes"})
+        self.assertEqual(CharacterQuestionStats.objects.get(character=keep, question=other, answer="yes").count, 3)
+        self.assertEqual(FeedbackEvent.objects.filter(character=keep).count(), 1)
+
+    def test_merge_command(self):
+        keep = Character.objects.create(name="Elon Musk")
+        typo = Character.objects.create(name="Elon Muks")
+        pair = f"{typo.id}:{keep.id}"
+
+        out = io.StringIO()
+        call_command('merge_duplicate_characters', merge=[pair], dry_run=True, fuzzy=0.5, stdout=out)
+        self.assertIn("1 duplicate characters would be merged", out.getvalue())
+        self.assertIn("'Elon Musk' (#%d)  ~  'Elon Muks'" % keep.id, out.getvalue())
+        self.assertTrue(Character.objects.filter(id=typo.id).exists())
+
+        version = KnowledgeBaseVersion.current()
+        call_command('merge_duplicate_characters', merge=[pair], stdout=io.StringIO())
+        self.assertFalse(Character.objects.filter(id=typo.id).exists())
+        self.assertEqual(KnowledgeBaseVersion.current(), version + 1)
+
+
+class NameIndexRebuildTests(TransactionTestCase):
+    # The rebuild thread has its own connection, so the data must be committed.
+
+    def test_stale_index_keeps_serving_while_it_is_rebuilt(self):
+        for patch in (mock.patch.object(names, '_index', None), mock.patch.object(names, 'NAME_INDEX_TTL', 0)):
+            patch.start()
+            self.addCleanup(patch.stop)
+        Character.objects.create(name="Elon Musk")
+        stale = get_name_index()
+        Character.objects.create(name="Marie Curie")  # By another process: not added to this index.
+
+        self.assertIs(get_name_index(), stale)
+        thread = names._rebuild_thread
+        if thread is not None:
+            thread.join(timeout=30)
+
+        with mock.patch.object(names, 'NAME_INDEX_TTL', 3600):
+            fresh = get_name_index()
+        self.assertIsNot(fresh, stale)
+        self.assertEqual(len(fresh.sizes), 2)
+
+
+class TransferTests(TestCase):
+    def test_export_import_round_trip(self):
+        real, human, fly = make_questions("Is your character real?", "Is your character human?", "Can your character fly?")
+        Question.objects.filter(id=real.id).update(popularity=0.5, information_value=0.9)
+        human.prerequisite_questions.add(real)
+        fly.contradictory_questions.add(real)
+        Character.objects.create(name="Marie Curie", description="Physicist",
+                                 features={str(real.id): "yes", str(human.id): "yes", "999": "no"})
+        Character.objects.create(name="Superman", features={real.text: "no", str(fly.id): "yes"})
+
+        def dump():
+            out = io.StringIO()
+            write_records(export_records(), out)
+            return [line for line in out.getvalue().splitlines() if '"type":"header"' not in line]
+
+        before = dump()
+        Character.objects.all().delete()
+        Question.objects.all().delete()
+        counts = import_records(io.StringIO("\n".join(before)))
+
+        self.assertEqual(counts["questions"], 3)
+        self.assertEqual(counts["characters_created"], 2)
+        self.assertEqual(dump(), before)
+        superman = Character.objects.get(name="Superman")
+        self.assertEqual(feature_answer(superman.features, Question.objects.get(text="Is your character real?")), "no")
+
+    def test_import_merges_features_unless_replacing(self):
+        real, human = make_questions("Is your character real?", "Is your character human?")
+        Character.objects.create(name="Marie Curie", features={str(real.id): "yes"})
+        line = '{"type":"character","name":"marie  curie","features":{"Is your character human?":"yes","Unknown?":"no"}}'
+
+        counts = import_records([line])
+        self.assertEqual(counts["characters_updated"], 1)
+        self.assertEqual(counts["skipped_features"], 1)
+        self.assertEqual(Character.objects.get().features, {str(real.id): "yes", str(human.id): "yes"})
+
+        import_records([line], replace_features=True)
+        self.assertEqual(Character.objects.get().features, {str(human.id): "yes"})
+
+    def test_commands_round_trip_a_gzip_dump(self):
+        real, = make_questions("Is your character real?")
+        Character.objects.create(name="Marie Curie", features={str(real.id): "yes"})
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "kb.ndjson.gz")
+            call_command('export_kb', path, stdout=io.StringIO())
+            with open(path, 'rb') as f:
+                self.assertEqual(f.read(2), b"\x1f\x8b")
+            Character.objects.all().delete()
+            Question.objects.all().delete()
+            call_command('import_kb', path, stdout=io.StringIO())
+
+        character = Character.objects.get()
+        self.assertEqual(character.name, "Marie Curie")
+        self.assertEqual(feature_answer(character.features, Question.objects.get()), "yes")
+
+
+class FeatureFileTests(TestCase):
+    def write_file(self, name, content):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        path = os.path.join(directory.name, name)
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(content)
+        return path
+
+    def test_csv_rows_by_id_and_text(self):
+        real, human = make_questions("Is your character real?", "Is your character human?")
+        curie = Character.objects.create(name="Marie Curie", features={str(real.id): "no"})
+        path = self.write_file("features.csv", (
+            "character,question,answer\n"
+            f"marie curie,{real.id},y\n"
+            "Marie Curie,Is your character human?,yes\n"
+            "Marie Curie,Can your character fly?,no\n"
+            "Marie Curie,Is your character human?,maybe\n"
+            "Elon Musk,Is your character human?,yes\n"
+        ))
+        version = KnowledgeBaseVersion.current()
+
+        out = io.StringIO()
+        call_command('train_character', file=path, stdout=out)
+
+        curie.refresh_from_db()
+        self.assertEqual(curie.features, {str(real.id): "yes", str(human.id): "yes"})
+        self.assertIn("Applied 2 of 5 rows", out.getvalue())
+        self.assertIn("line 4: unknown question 'Can your character fly?'", out.getvalue())
+        self.assertIn("line 5: invalid answer 'maybe'", out.getvalue())
+        self.assertIn("line 6: unknown character 'Elon Musk'", out.getvalue())
+        self.assertEqual(KnowledgeBaseVersion.current(), version + 1)
+
+    def test_jsonl_dry_run_and_create_missing(self):
+        real, = make_questions("Is your character real?")
+        path = self.write_file("features.jsonl", (
+            '{"character": "Elon Musk", "question": "Is your character real?", "answer": "yes"}\n'
+            'not json\n'
+            '{"character": "elon  musk", "question": "%d", "answer": "pn"}\n' % real.id
+        ))
+        version = KnowledgeBaseVersion.current()
+
+        call_command('train_character', file=path, create_missing=True, dry_run=True, stdout=io.StringIO())
+        self.assertFalse(Character.objects.exists())
+        self.assertEqual(KnowledgeBaseVersion.current(), version)
+
+        out = io.StringIO()
+        call_command('train_character', file=path, create_missing=True, chunk_size=1, stdout=out)
+        self.assertIn("1 characters created", out.getvalue())
+        self.assertIn("line 2: not a valid row", out.getvalue())
+        self.assertEqual(Character.objects.get().features, {str(real.id): "probably_not"})
+
+    def test_missing_file(self):
+        with self.assertRaises(CommandError):
+            call_command('train_character', file='/nonexistent/features.csv', stdout=io.StringIO())
+
+
+class AsyncViewTests(TransactionTestCase):
+    # The engine runs on its own thread pool with its own connections, so the data must be committed.
+
+    def setUp(self):
+        cache.clear()
+        self.questions = make_questions("q1", "q2")
+        self.characters = make_characters(self.questions, {"A": "yy", "B": "yn", "C": "ny"})
+
+    async def post(self, path, data):
+        return await self.async_client.post(path, data, content_type="application/json")
+
+    async def test_game_round_trip(self):
+        start = (await self.async_client.get("/api/async/start_game/")).json()
+        session_id = start["session_id"]
+        question_id = start["question"]["id"]
+
+        response = await self.post("/api/async/answer/", {"session_id": session_id, "question_id": question_id, "answer": "yes"})
+        self.assertEqual(response.status_code, 200)
+        next_question = response.json()["next_question"]
+        self.assertIsNotNone(next_question)
+        await self.post("/api/async/answer/", {"session_id": session_id, "question_id": next_question["id"], "answer": "yes"})
+
+        result = (await self.async_client.get("/api/async/get_result/", {"session_id": session_id})).json()
+        self.assertEqual(result["guessed_character"]["name"], "A")
+        session = await GameSession.objects.aget(session_id=session_id)
+        self.assertEqual(len(session.answers), 2)
+
+    async def test_bad_requests(self):
+        response = await self.async_client.post("/api/async/answer/", "{", content_type="application/json")
+        self.assertEqual(response.status_code, 400)
+        response = await self.post("/api/async/answer/", {"session_id": "nope", "question_id": self.questions[0].id})
+        self.assertEqual(response.status_code, 404)
+        response = await self.async_client.get("/api/async/get_result/", {"session_id": "nope"})
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual((await self.async_client.post("/api/async/start_game/")).status_code, 405)
+
+    async def test_add_character(self):
+        scraped = {"name": "Marie Curie", "summary": "Physicist", "details": {}}
+        with mock.patch('akinator_app.async_views.aget_character_info', mock.AsyncMock(return_value=scraped)), \
+                mock.patch.object(names, '_index', None):
+            self.assertEqual((await self.post("/api/async/add_character/", {})).status_code, 400)
+            response = await self.post("/api/async/add_character/", {"name": "Marie Curie"})
+            self.assertEqual(response.status_code, 201)
+            response = await self.post("/api/async/add_character/", {"name": "marie curie"})
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("already exists", response.json()["message"])
+        self.assertEqual(await Character.objects.filter(name="Marie Curie").acount(), 1)
+
+
+class CachedReadTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.questions = make_questions("q1", "q2")
+        self.characters = make_characters(self.questions, {"A": "yy", "B": "yn", "C": "nn"})
+        KnowledgeBaseVersion.bump()
+
+    def test_read_endpoints_revalidate_with_the_version_etag(self):
+        first = self.client.get("/api/questions/")
+        etag = first["ETag"]
+        self.assertEqual([question["text"] for question in first.json()], ["q1", "q2"])
+        self.assertIn("no-cache", first["Cache-Control"])
+
+        self.assertEqual(self.client.get("/api/questions/", HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        self.assertEqual(self.client.get("/api/characters/", HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        Question.objects.create(text="q3")
+        KnowledgeBaseVersion.bump()
+        fresh = self.client.get("/api/questions/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(fresh.status_code, 200)
+        self.assertNotEqual(fresh["ETag"], etag)
+        self.assertEqual(len(fresh.json()), 3)
+
+    def test_detail_and_paging(self):
+        character = self.characters[1]
+        self.assertEqual(self.client.get(f"/api/characters/{character.id}/").json()["name"], "B")
+        self.assertEqual(self.client.get("/api/characters/0/").status_code, 404)
+        self.assertEqual(self.client.get("/api/questions/0/").status_code, 404)
+        page = self.client.get("/api/characters/", {"offset": 1, "limit": 1}).json()
+        self.assertEqual((page["count"], [c["name"] for c in page["results"]]), (3, ["B"]))
+        self.assertEqual(self.client.get("/api/characters/", {"limit": "x"}).status_code, 400)
+
+    def test_opening_move_is_computed_once_per_version(self):
+        with mock.patch('akinator_app.views.best_question', wraps=best_question) as scored:
+            opening = self.client.get("/api/opening/").json()["question"]
+            for _ in range(2):
+                self.assertEqual(self.client.get("/api/start_game/").json()["question"], opening)
+            self.assertEqual(scored.call_count, 1)
+
+            KnowledgeBaseVersion.bump()
+            self.client.get("/api/start_game/")
+            self.assertEqual(scored.call_count, 2)
+
+    def test_admin_edits_bump_the_version_once(self):
+        self.client.force_login(User.objects.create_superuser("admin", "admin@example.com", "password"))
+        version = KnowledgeBaseVersion.current()
+        response = self.client.post(f"/admin/akinator_app/character/{self.characters[0].id}/delete/", {"post": "yes"})
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(KnowledgeBaseVersion.current(), version + 1)
+
+
+class CompactionTests(TestCase):
+    def test_features_are_rekeyed_by_question_id(self):
+        real, fictional, flies, sings = make_questions(
+            "Is your character real?", "Is your character fictional?", "Can your character fly?", "Does your character sing?",
+        )
+        character = Character.objects.create(name="Superman", features={
+            str(real.id): "no",
+            "Is your character real?": "yes",  # The ID key wins.
+            "is your character  FICTIONAL?": "yes",  # Normalized text of a question.
+            str(flies.id): True,  # Legacy boolean.
+            str(sings.id): "maybe",  # Not an answer.
+            "Was your character deleted?": "yes",  # No such question.
+        })
+        version = KnowledgeBaseVersion.current()
+
+        report = compact_knowledge_base(dry_run=True)
+        self.assertEqual(report["rewritten"], 1)
+        character.refresh_from_db()
+        self.assertIn("Was your character deleted?", character.features)
+
+        report = compact_knowledge_base()
+        character.refresh_from_db()
+        self.assertEqual(character.features, {str(real.id): "no", str(fictional.id): "yes", str(flies.id): "yes"})
+        self.assertEqual(report["orphan_keys"], 1)
+        self.assertEqual(report["invalid_values"], 1)
+        self.assertEqual(report["kb_version"], version + 1)
+        self.assertEqual(compact_knowledge_base()["rewritten"], 0)
+
+
+class GapRankingTests(TestCase):
+    def setUp(self):
+        self.questions = make_questions("Is your character real?", "Is your character human?", "Can your character fly?")
+        self.characters = make_characters(self.questions, {"A": "yy.", "B": "n.y", "C": "..n", "D": "yny"})
+
+    def play(self, count, character=None, age=GAP_SESSION_GRACE + 60):
+        for index in range(count):
+            session = GameSession.objects.create(
+                answers={str(q.id): "yes" for q in self.questions[:1 + index % 3]}, is_completed=True,
+            )
+            GameSession.objects.filter(id=session.id).update(created_at=timezone.now() - timedelta(seconds=age))
+            if character is not None:
+                FeedbackEvent.objects.create(session=session, character=character, answers=session.answers, was_correct=True)
+
+    def totals(self):
+        state = GapRankingState.objects.get(pk=1)
+        gaps = list(KnowledgeGap.objects.order_by('-expected_turns_saved', 'id').values_list(
+            'character_id', 'question_id', 'expected_turns_saved'))
+        return (state.games, state.completed_games, state.completed_questions,
+                state.question_asks, state.target_games), gaps
+
+    def test_runs_only_read_new_history(self):
+        self.play(4, character=self.characters[0])
+        first = refresh_knowledge_gaps()
+        self.assertEqual((first["sessions"], first["feedback_events"]), (4, 4))
+
+        self.play(3, character=self.characters[2])
+        self.play(1, age=0)  # Possibly still in progress: left for a later run.
+        second = refresh_knowledge_gaps()
+        self.assertEqual((second["sessions"], second["feedback_events"]), (3, 3))
+        self.assertEqual(second["games"], 7)
+
+        incremental = self.totals()
+        refresh_knowledge_gaps(full=True)
+        self.assertEqual(self.totals(), incremental)
+
+    def test_only_empty_cells_are_queued(self):
+        self.play(2, character=self.characters[2])
+        refresh_knowledge_gaps()
+        for gap in KnowledgeGap.objects.select_related('character', 'question'):
+            self.assertIn(feature_answer(gap.character.features, gap.question), (None, "dont_know"))
+        # The most played character's empty cells come first.
+        self.assertEqual(KnowledgeGap.objects.order_by('-expected_turns_saved').first().character_id, self.characters[2].id)
+
+    def test_filled_cells_do_not_count_against_the_limit(self):
+        self.play(3, character=self.characters[2])
+        refresh_knowledge_gaps()
+        queued = list(KnowledgeGap.objects.order_by('-expected_turns_saved').select_related('character', 'question'))
+        self.assertGreater(len(queued), 1)
+        top = queued[0]
+        top.character.features = (top.character.features or {}) | {str(top.question_id): "yes"}
+        top.character.save()
+
+        results = self.client.get("/api/gaps/", {"limit": 1}).json()["results"]
+        self.assertEqual([(r["character"]["id"], r["question"]["id"]) for r in results],
+                         [(queued[1].character_id, queued[1].question_id)])
+        self.assertEqual(self.client.get("/api/gaps/", {"limit": "x"}).status_code, 400)
+
+
+class ResumeGameTests(TestCase):
+    def setUp(self):
+        self.questions = make_questions("q1", "q2", "q3", "q4", "q5")
+        self.characters = make_characters(self.questions, {
+            "A": "yynny", "B": "ynyny", "C": "nyyn.", "D": "nnnyy", "E": "yy.nn", "F": "n.ynq",
+        })
+
+    def test_replay_matches_turn_by_turn_play(self):
+        target = self.characters[1]
+        ids = list(Character.objects.values_list('id', flat=True))
+        session = GameSession(possible_character_ids=ids, answers={})
+        question = best_question(ids, [], {})
+        path = []
+        for _ in range(3):
+            answer = feature_answer(target.features, question) or "dont_know"
+            path.append({"question_id": question.id, "answer": answer})
+            question = advance_game(session, question, answer)
+            if question is None:
+                break
+
+        response = self.client.post("/api/resume_game/", {"answers": path}, content_type="application/json")
+
+        self.assertEqual(response.status_code, 200)
+        next_question = response.json()["next_question"]
+        self.assertEqual(next_question and next_question["id"], question and question.id)
+        resumed = GameSession.objects.get(session_id=response.json()["session_id"])
+        self.assertEqual(resumed.answers, session.answers)
+        self.assertEqual(resumed.possible_character_ids, session.possible_character_ids)
+        self.assertEqual(resumed.posterior, session.posterior)
+        self.assertEqual(resumed.is_completed, session.is_completed)
+
+    def test_invalid_paths_are_rejected(self):
+        q1 = self.questions[0]
+        repeated = [{"question_id": q1.id, "answer": "yes"}] * 2
+        response = self.client.post("/api/resume_game/", {"answers": repeated}, content_type="application/json")
+        self.assertEqual(response.status_code, 400)
+
+        deleted = [{"question_id": 999999, "answer": "yes"}]
+        response = self.client.post("/api/resume_game/", {"answers": deleted}, content_type="application/json")
+        self.assertEqual(response.status_code, 409)
+
+        too_long = [{"question_id": question_id, "answer": "yes"} for question_id in range(1, MAX_RESUMED_ANSWERS + 2)]
+        response = self.client.post("/api/resume_game/", {"answers": too_long}, content_type="application/json")
+        self.assertEqual(response.status_code, 400)
+
+    def test_tree_paths_resume_where_the_tree_leaves_off(self):
+        bundle, stats = build_bundle(depth=2)
+        self.assertIsNone(get_snapshot())  # The snapshot used for the build is not left installed.
+        root = bundle["tree"]
+        self.assertEqual(root["q"], best_question(list(Character.objects.values_list('id', flat=True)), [], {}).id)
+        self.assertEqual(stats["nodes"], 1 + len(root["a"]))
+
+        for answer, child in root["a"].items():
+            response = self.client.post("/api/resume_game/", {"answers": [{"question_id": root["q"], "answer": answer}]},
+                                        content_type="application/json")
+            self.assertEqual(response.json()["next_question"]["id"], child["q"], answer)
@@ -0,0 +1,142 @@
+import csv
+import json
+from collections import defaultdict
+from django.db import transaction
+from .kb_transfer import open_dump
+from .models import ANSWER_CHOICES, Character, Question, KnowledgeBaseVersion, normalize_name
+
+# Curated feature imports for train_character --file.
+#
+# Rows are (character, question, answer) triples from a CSV file with a
+# header row, or from JSON Lines objects with the same keys. The file is
+# streamed; characters and questions are resolved through in-memory maps
+# built once up front, and the features are written with one bulk update per
+# chunk of characters.
+
+# Short answers accepted on top of ANSWER_CHOICES, shared with the interactive prompt.
+ANSWER_ALIASES = {
+    'y': 'yes',
+    'n': 'no',
+    'p': 'probably',
+    'pn': 'probably_not',
+    'd': 'dont_know',
+}
+
+
+def parse_answer(raw):
+    """The canonical answer for user input, or None if it is not a valid answer."""
+    answer = (raw or '').strip().lower()
+    answer = ANSWER_ALIASES.get(answer, answer)
+    return answer if answer in ANSWER_CHOICES else None
+
+
+def read_rows(path):
+    """
+    Yields (line number, row dict) from a CSV or JSON Lines file, optionally
+    gzip-compressed. The format is taken from the extension (.csv or .jsonl).
+    """
+    is_csv = path.removesuffix('.gz').lower().endswith('.csv')
+    with open_dump(path, 'r') as f:
+        if is_csv:
+            # Line 1 is the header.
+            for line_number, row in enumerate(csv.DictReader(f), start=2):
+                yield line_number, row
+            return
+        for line_number, line in enumerate(f, start=1):
+            if line.strip():
+                try:
+                    yield line_number, json.loads(line)
+                except json.JSONDecodeError:
+                    yield line_number, None
+
+
+def import_feature_file(path, chunk_size=1000, create_missing=False, dry_run=False, added_by='file_training'):
+    """
+    Applies a file of (character, question, answer) rows to Character.features.
+
+    Args:
+        path (str): CSV or JSONL file.
+        chunk_size (int): Characters written per bulk update.
+        create_missing (bool): Create characters that do not exist yet instead of skipping their rows.
+        dry_run (bool): Validate the file without writing anything.
+
+    Returns:
+        dict: Counts of rows applied and skipped, and the first errors as "line N: reason".
+    """
+    # --- Step 1: Build the lookup maps once ---
+    question_ids = {}
+    for question_id, text in Question.objects.values_list('id', 'text'):
+        question_ids[str(question_id)] = question_id
+        question_ids.setdefault(text, question_id)
+    character_ids = {}
+    for character_id, name_key in Character.objects.values_list('id', 'name_key').iterator(chunk_size=5000):
+        character_ids[name_key] = character_id
+
+    result = {"rows": 0, "applied": 0, "skipped": 0, "characters_created": 0, "characters_updated": 0, "errors": []}
+
+    def skip(line_number, reason):
+        result["skipped"] += 1
+        if len(result["errors"]) < 20:
+            result["errors"].append(f"line {line_number}: {reason}")
+
+    def flush(pending):
+        # pending is {character_id: {question_id_str: answer}}
+        if dry_run:
+            return
+        with transaction.atomic():
+            characters = list(Character.objects.select_for_update().filter(id__in=pending.keys()).only('id', 'features'))
+            changed = []
+            for character in characters:
+                features = (character.features or {}) | pending[character.id]
+                if features != character.features:
+                    character.features = features
+                    changed.append(character)
+            Character.objects.bulk_update(changed, ['features'])
+        result["characters_updated"] += len(changed)
+
+    # --- Step 2: Stream and validate the rows, flushing every chunk_size characters ---
+    pending = defaultdict(dict)
+    for line_number, row in read_rows(path):
+        result["rows"] += 1
+        if not isinstance(row, dict):
+            skip(line_number, "not a valid row")
+            continue
+
+        name = ' '.join(str(row.get('character') or '').split())
+        question_id = question_ids.get(str(row.get('question') or '').strip())
+        answer = parse_answer(str(row.get('answer') or ''))
+        if not name:
+            skip(line_number, "missing character")
+            continue
+        if question_id is None:
+            skip(line_number, f"unknown question {row.get('question')!r}")
+            continue
+        if answer is None:
+            skip(line_number, f"invalid answer {row.get('answer')!r}; expected one of {', '.join(ANSWER_CHOICES)}")
+            continue
+
+        name_key = normalize_name(name)
+        character_id = character_ids.get(name_key)
+        if character_id is None:
+            if not create_missing:
+                skip(line_number, f"unknown character {name!r} (use --create-missing to add it)")
+                continue
+            if dry_run:
+                character_id = -len(character_ids)  # Placeholder so the name is only counted once.
+            else:
+                character_id = Character.objects.create(name=name, added_by=added_by).id
+            character_ids[name_key] = character_id
+            result["characters_created"] += 1
+
+        if character_id not in pending and len(pending) >= chunk_size:
+            flush(pending)
+            pending = defaultdict(dict)
+        pending[character_id][str(question_id)] = answer
+        result["applied"] += 1
+
+    if pending:
+        flush(pending)
+
+    if not dry_run and (result["characters_updated"] or result["characters_created"]):
+        result["kb_version"] = KnowledgeBaseVersion.bump()
+    return result
@@ -1,11 +1,26 @@
 from django.urls import path
-from . import views
+from . import async_views, views
 from django.http import HttpResponse
 urlpatterns = [
     path('start_game/', views.start_game),
+    path('resume_game/', views.resume_game),
     path('answer/', views.answer_question),
     path('get_result/', views.get_result),
+    path('guess/', views.current_guesses),
+    path('opening/', views.opening_view),
+    path('questions/', views.questions_view),
+    path('questions/<int:question_id>/', views.question_detail_view),
+    path('characters/', views.characters_view),
+    path('characters/<int:character_id>/', views.character_detail_view),
+    path('gaps/', views.knowledge_gaps_view),
     path("add_character/", views.add_character),
     path("learn/", views.learn_from_feedback),
+    path("metrics/", views.metrics_view),
+    path("ready/", views.readiness_view),
+    # Async (ASGI) versions of the game API; see async_views.py.
+    path('async/start_game/', async_views.start_game),
+    path('async/answer/', async_views.answer_question),
+    path('async/get_result/', async_views.get_result),
+    path('async/add_character/', async_views.add_character),
     path('test/', lambda request: HttpResponse('Deploy is working!')),
 ]
@@ -1,12 +1,24 @@
 from rest_framework.decorators import api_view
 from rest_framework.response import Response
 from rest_framework import status
-from .models import Question, GameSession, Character
+from django.core.exceptions import ValidationError
+from .models import ANSWER_CHOICES, Question, GameSession, Character, KnowledgeBaseVersion, KnowledgeGap
 from .serializers import QuestionSerializer, CharacterSerializer
-from .knowledge_base import best_question
+from .knowledge_base import best_question, feature_answer
+from .game import advance_game, best_guess, replay_answers
+from .posterior import is_confident, top_guesses
+from .learning import enqueue_feedback
+from .names import find_character, get_or_create_character, suggest_characters
 from .ai_data_collector import get_character_info
 from django.db.models import Q # Import Q objects for complex queries
 from django.shortcuts import render
+from django.http import HttpResponse, JsonResponse
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import condition, require_GET
+from .caching import cached_json, cached_value, kb_etag, kb_last_modified, kb_state
+from .metrics import render_prometheus, timed_phase
+from .question_tree import MAX_RESUMED_ANSWERS, bundle_url
+from .warmup import WARMUP_STATE
 
 # NOTE: For full production readiness, this hardcoded map should be replaced
 # by the database-driven approach we discussed, where these mappings are
@@ -22,39 +34,61 @@ WIKIDATA_TO_QUESTION_MAP = {
 }
 
 
+def features_from_wikidata(details):
+    """
+    Maps the scraped Wikidata details to initial features through WIKIDATA_TO_QUESTION_MAP.
+    Features are keyed by question ID, like everywhere else.
+    """
+    initial_features = {}
+    if details:
+        for key, value_map in WIKIDATA_TO_QUESTION_MAP.items():
+            detail_value = details.get(key)
+            if detail_value and detail_value in value_map:
+                mapping = value_map[detail_value]
+                
+                # --- MODIFIED: Get question text from ID ---
+                q_id = mapping["question_id"]
+                if q_id != -1:
+                    try:
+                        # Only map to questions that still exist, so no orphaned keys are written.
+                        question = Question.objects.get(id=q_id)
+                        initial_features[str(question.id)] = mapping["answer"]
+                    except Question.DoesNotExist:
+                        print(f"Error in add_character: Question ID {q_id} not found in WIKIDATA_TO_QUESTION_MAP.")
+                # --- END MODIFIED ---
+    return initial_features
+
+
 @api_view(['POST'])
 def add_character(request):
     """
     Adds a new character to the database by scraping its info.
-    Features are stored using question text as the key.
+    Features are keyed by question ID, like everywhere else.
     """
     name = request.data.get("name")
     if not name:
         return Response({"error": "Name is required."}, status=status.HTTP_400_BAD_REQUEST)
     
-    if Character.objects.filter(name__iexact=name).exists():
+    if find_character(name):
         return Response({"message": f"Character '{name}' already exists."}, status=status.HTTP_200_OK)
 
+    # Likely typos of an existing name are returned with the new character, or
+    # refused when the client sends "reject_similar": true.
+    suggestions = suggest_characters(name)
+    if suggestions and request.data.get("reject_similar"):
+        return Response({
+            "message": f"Character '{name}' looks like an existing character.",
+            "did_you_mean": suggestions,
+        }, status=status.HTTP_409_CONFLICT)
+
     try:
         data = get_character_info(name)
-        initial_features = {}
-        details = data.get("details")
-        if details:
-            for key, value_map in WIKIDATA_TO_QUESTION_MAP.items():
-                detail_value = details.get(key)
-                if detail_value and detail_value in value_map:
-                    mapping = value_map[detail_value]
-                    
-                    # --- MODIFIED: Get question text from ID ---
-                    q_id = mapping["question_id"]
-                    if q_id != -1:
-                        try:
-                            # We fetch the question text to use it as the key
-                            question = Question.objects.get(id=q_id)
-                            initial_features[question.text] = mapping["answer"]
-                        except Question.DoesNotExist:
-                            print(f"Error in add_character: Question ID {q_id} not found in WIKIDATA_TO_QUESTION_MAP.")
-                    # --- END MODIFIED ---
+        initial_features = features_from_wikidata(data.get("details"))
+
+        # The scraped title can differ from the requested name.
+        existing = find_character(data["name"])
+        if existing:
+            return Response({"message": f"Character '{existing.name}' already exists."}, status=status.HTTP_200_OK)
 
         char = Character.objects.create(
             name=data["name"],
@@ -62,7 +96,11 @@ def add_character(request):
             features=initial_features, # This is now {'Is your character male?': 'yes'}
             added_by="AI Collector"
         )
-        return Response(CharacterSerializer(char).data, status=status.HTTP_201_CREATED)
+        KnowledgeBaseVersion.bump()
+        response = CharacterSerializer(char).data
+        if suggestions:
+            response["did_you_mean"] = suggestions
+        return Response(response, status=status.HTTP_201_CREATED)
     except Exception as e:
         return Response({"error": f"Failed to add character: {e}"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
@@ -71,7 +109,7 @@ def index_view(request):
     """
     Serves the main index.html file which contains the game's frontend.
     """
-    return render(request, 'akinator_app/index.html')
+    return render(request, 'akinator_app/index.html', {"question_tree_url": bundle_url()})
 
 @api_view(['GET'])
 def start_game(request):
@@ -82,111 +120,215 @@ def start_game(request):
     if not all_character_ids:
         return Response({"error": "No characters in the database to start a game."}, status=status.HTTP_404_NOT_FOUND)
 
-    first_question = best_question(all_character_ids, [], {})
+    # The opening move is the same for every game until the knowledge base changes.
+    with timed_phase("question_selection"):
+        first_question = opening_question_data(KnowledgeBaseVersion.current(), all_character_ids)
     
     if not first_question:
-        first_question = Question.objects.order_by('?').first()
-        if not first_question:
+        random_question = Question.objects.order_by('?').first()
+        if not random_question:
             return Response({"error": "No questions in the database."}, status=status.HTTP_404_NOT_FOUND)
+        first_question = QuestionSerializer(random_question).data
+
+    with timed_phase("save"):
+        session = GameSession.objects.create(
+            current_question_id=first_question["id"],
+            possible_character_ids=all_character_ids,
+            answers={}
+        )
+    return Response({
+        "session_id": str(session.session_id),
+        "question": first_question
+    })
+
 
-    session = GameSession.objects.create(
-        current_question=first_question,
-        possible_character_ids=all_character_ids,
-        answers={}
-    )
+@api_view(['POST'])
+def resume_game(request):
+    """
+    Starts a session from answers the client collected offline by walking the
+    question tree bundle (see question_tree.py), and returns the next question.
+
+    Expects {"answers": [{"question_id": 4, "answer": "yes"}, ...]} in the order they were asked.
+    "next_question" is null when the game is already over; fetch the result then.
+    """
+    answered = request.data.get("answers")
+    if not isinstance(answered, list) or not answered or len(answered) > MAX_RESUMED_ANSWERS:
+        return Response({"error": f"answers must be a list of 1 to {MAX_RESUMED_ANSWERS} answers."}, status=status.HTTP_400_BAD_REQUEST)
+    try:
+        pairs = [(int(item["question_id"]), item["answer"]) for item in answered]
+    except (TypeError, KeyError, ValueError):
+        return Response({"error": "Each answer needs a question_id and an answer."}, status=status.HTTP_400_BAD_REQUEST)
+    if any(answer not in ANSWER_CHOICES for _, answer in pairs):
+        return Response({"error": f"Answers must be one of {', '.join(ANSWER_CHOICES)}."}, status=status.HTTP_400_BAD_REQUEST)
+    if len({question_id for question_id, _ in pairs}) != len(pairs):
+        return Response({"error": "Each question can only be answered once."}, status=status.HTTP_400_BAD_REQUEST)
+
+    with timed_phase("session_load"):
+        questions = Question.objects.in_bulk([question_id for question_id, _ in pairs])
+    if len(questions) != len(pairs):
+        # The bundle refers to a question that has since been deleted: the client starts over.
+        return Response({"error": "Unknown question ID; start a new game."}, status=status.HTTP_409_CONFLICT)
+
+    all_character_ids = list(Character.objects.values_list('id', flat=True))
+    if not all_character_ids:
+        return Response({"error": "No characters in the database to start a game."}, status=status.HTTP_404_NOT_FOUND)
+
+    session = GameSession(possible_character_ids=all_character_ids, answers={})
+    next_q = replay_answers(session, [(questions[question_id], answer) for question_id, answer in pairs])
+    with timed_phase("save"):
+        session.save()
     return Response({
         "session_id": str(session.session_id),
-        "question": QuestionSerializer(first_question).data
+        "next_question": QuestionSerializer(next_q).data if next_q else None,
     })
 
 
+def opening_question_data(version, all_character_ids):
+    """The serialized first question of a game, computed once per knowledge-base version."""
+    def build():
+        question = best_question(all_character_ids, [], {})
+        return dict(QuestionSerializer(question).data) if question else None
+    return cached_value(version, "opening_question", build)
+
+
+# --- Cacheable read endpoints ---
+# These only change with the knowledge base: see caching.py. Clients revalidate
+# with If-None-Match / If-Modified-Since and get a 304 while the version holds.
+
+def _json(payload):
+    return HttpResponse(payload, content_type="application/json")
+
+
+@require_GET
+@cache_control(public=True, no_cache=True)
+@condition(etag_func=kb_etag, last_modified_func=kb_last_modified)
+def opening_view(request):
+    """The opening question every new game starts with."""
+    version = kb_state(request)[0]
+    def build():
+        all_character_ids = list(Character.objects.values_list('id', flat=True))
+        return {"question": opening_question_data(version, all_character_ids) if all_character_ids else None}
+    return _json(cached_json(version, "opening", build))
+
+
+@require_GET
+@cache_control(public=True, no_cache=True)
+@condition(etag_func=kb_etag, last_modified_func=kb_last_modified)
+def questions_view(request):
+    """Every question, in ID order."""
+    def build():
+        return QuestionSerializer(Question.objects.order_by('id'), many=True).data
+    return _json(cached_json(kb_state(request)[0], "questions", build))
+
+
+@require_GET
+@cache_control(public=True, no_cache=True)
+@condition(etag_func=kb_etag, last_modified_func=kb_last_modified)
+def question_detail_view(request, question_id):
+    def build():
+        question = Question.objects.filter(id=question_id).first()
+        return QuestionSerializer(question).data if question else None
+    payload = cached_json(kb_state(request)[0], f"question:{question_id}", build)
+    if payload == b"null":
+        return JsonResponse({"error": "Question not found."}, status=404)
+    return _json(payload)
+
+
+@require_GET
+@cache_control(public=True, no_cache=True)
+@condition(etag_func=kb_etag, last_modified_func=kb_last_modified)
+def characters_view(request):
+    """Character cards, a page at a time (?offset=0&limit=100, at most 500)."""
+    try:
+        offset = max(int(request.GET.get("offset", 0)), 0)
+        limit = min(max(int(request.GET.get("limit", 100)), 1), 500)
+    except ValueError:
+        return JsonResponse({"error": "offset and limit must be integers."}, status=400)
+
+    def build():
+        page = Character.objects.order_by('id')[offset:offset + limit]
+        return {
+            "count": Character.objects.count(),
+            "offset": offset,
+            "results": CharacterSerializer(page, many=True).data,
+        }
+    return _json(cached_json(kb_state(request)[0], f"characters:{offset}:{limit}", build))
+
+
+@require_GET
+@cache_control(public=True, no_cache=True)
+@condition(etag_func=kb_etag, last_modified_func=kb_last_modified)
+def character_detail_view(request, character_id):
+    def build():
+        character = Character.objects.filter(id=character_id).first()
+        return CharacterSerializer(character).data if character else None
+    payload = cached_json(kb_state(request)[0], f"character:{character_id}", build)
+    if payload == b"null":
+        return JsonResponse({"error": "Character not found."}, status=404)
+    return _json(payload)
+
+
+@require_GET
+def knowledge_gaps_view(request):
+    """
+    The curation queue built by rank_gaps: missing cells, most valuable first
+    (?limit=50, at most 500). Cells filled since the last run are left out.
+    """
+    try:
+        limit = min(max(int(request.GET.get("limit", 50)), 1), 500)
+    except ValueError:
+        return JsonResponse({"error": "limit must be an integer."}, status=400)
+
+    # Filled cells are skipped while walking the queue, so they never push open gaps past the limit.
+    gaps = KnowledgeGap.objects.select_related('character', 'question').order_by('-expected_turns_saved')
+    results = []
+    for gap in gaps.iterator(chunk_size=limit):
+        if len(results) >= limit:
+            break
+        if feature_answer(gap.character.features or {}, gap.question) not in (None, "dont_know"):
+            continue
+        results.append({
+            "character": {"id": gap.character_id, "name": gap.character.name},
+            "question": {"id": gap.question_id, "text": gap.question.text},
+            "current_answer": gap.current_answer,
+            "expected_turns_saved": gap.expected_turns_saved,
+            "target_share": gap.target_share,
+            "ask_rate": gap.ask_rate,
+            "evidence_bits": gap.evidence_bits,
+            "ranked_at": gap.ranked_at,
+        })
+    return JsonResponse({"results": results})
+
+
 @api_view(['POST'])
 def answer_question(request):
     """
-    Processes a user's answer to a question, filters candidates,
+    Processes a user's answer to a question, updates the candidates' posterior,
     and returns the next best question.
-    
-    This view contains the SQLITE WORKAROUND and uses
-    question TEXT for feature lookups.
+    The turn itself lives in game.advance_game.
     """
     session_id = request.data.get("session_id")
     answer = request.data.get("answer")
     question_id = request.data.get("question_id")
 
-    try:
-        session = GameSession.objects.get(session_id=session_id)
-    except GameSession.DoesNotExist:
-        return Response({"error": "Invalid session ID"}, status=status.HTTP_404_NOT_FOUND)
-
-    # --- NEW: We must get the question text to do the lookup ---
-    try:
-        question = Question.objects.get(id=question_id)
-    except Question.DoesNotExist:
-        return Response({"error": "Invalid question ID"}, status=status.HTTP_404_NOT_FOUND)
-    # --- END NEW ---
-
-    current_candidates_ids = session.possible_character_ids
-    question_id_str = str(question_id) # We still use this for the session.answers
-    
-    # --- SQLITE WORKAROUND START ---
-    # We must filter in Python because SQLite does not support __contains on JSON fields.
-    if current_candidates_ids:
-        # This map defines which character answers to exclude based on the user's answer.
-        exclusion_map = {
-            "yes": ["no", "probably_not"],
-            "no": ["yes", "probably"],
-            "probably": ["no"],
-            "probably_not": ["yes"]
-        }
-        
-        # We only filter if the answer provides clear information.
-        # "dont_know" does not filter anyone.
-        if answer in exclusion_map:
-            new_possible_ids = []
-            
-            # Get the list of values we need to exclude
-            values_to_exclude = exclusion_map[answer]
-            
-            # Fetch all candidate objects from the DB to check them in Python
-            candidate_chars = Character.objects.filter(id__in=current_candidates_ids)
+    with timed_phase("session_load"):
+        try:
+            session = GameSession.objects.get(session_id=session_id)
+        except GameSession.DoesNotExist:
+            return Response({"error": "Invalid session ID"}, status=status.HTTP_404_NOT_FOUND)
 
-            for char in candidate_chars:
-                # --- MODIFIED: Use question.text as the key ---
-                # Get this character's answer for the current question (if any)
-                char_answer = char.features.get(question.text) 
-                # --- END MODIFIED ---
-                
-                # Keep the character ONLY if their answer is NOT in the exclusion list
-                if char_answer not in values_to_exclude:
-                    new_possible_ids.append(char.id)
-            
-            # Update the session with the new, filtered list of IDs
-            session.possible_character_ids = new_possible_ids
-        
-        # If the answer was "dont_know", we do nothing and keep all candidates.
-        
-    # --- SQLITE WORKAROUND END ---
-    
-    # Save the current answer to the session.
-    # NOTE: session.answers will STILL use the ID as the key (e.g., {'5': 'yes'}).
-    # We will convert this to text in the "learn_from_feedback" step.
-    session.answers[question_id_str] = answer
-    
-    answers_so_far = session.answers
-    asked_question_ids = list(answers_so_far.keys())
-    
-    # Find the next best question based on the new, smaller pool of candidates.
-    next_q = best_question(session.possible_character_ids, asked_question_ids, answers_so_far)
+        # --- NEW: We must get the question text to do the lookup ---
+        try:
+            question = Question.objects.get(id=question_id)
+        except Question.DoesNotExist:
+            return Response({"error": "Invalid question ID"}, status=status.HTTP_404_NOT_FOUND)
+        # --- END NEW ---
 
-    # End the game if we have no more good questions or are confident in the result.
-    if not next_q or (len(session.possible_character_ids) < 2 and len(asked_question_ids) > 5):
-        session.is_completed = True
-        session.current_question = None
+    next_q = advance_game(session, question, answer)
+    with timed_phase("save"):
         session.save()
+    if next_q is None:
         return Response({"next_question": None})
-
-    session.current_question = next_q
-    session.save()
     return Response({"next_question": QuestionSerializer(next_q).data})
 
 
@@ -194,73 +336,98 @@ def answer_question(request):
 def get_result(request):
     """
     Calculates and returns the best-matching character at the end of a game.
-    This view has been MODIFIED to read features using question TEXT.
     """
     session_id = request.query_params.get("session_id")
-    try:
-        session = GameSession.objects.get(session_id=session_id)
-    except GameSession.DoesNotExist:
-        return Response({"error": "Invalid session ID"}, status=status.HTTP_404_NOT_FOUND)
+    with timed_phase("session_load"):
+        try:
+            session = GameSession.objects.get(session_id=session_id)
+        except GameSession.DoesNotExist:
+            return Response({"error": "Invalid session ID"}, status=status.HTTP_404_NOT_FOUND)
 
     candidate_ids = session.possible_character_ids or []
-    # answers is {'5': 'yes', '12': 'no'}
-    answers = session.answers or {}
-    
     if not candidate_ids:
         return Response({"guessed_character": None, "match_score": 0, "message": "No characters matched your answers."})
 
-    if len(candidate_ids) == 1:
-        best_match = Character.objects.get(id=candidate_ids[0])
-        return Response({
-            "guessed_character": CharacterSerializer(best_match).data,
-            "match_score": 100
-        })
-
-    # --- MODIFIED: Convert answer IDs to question text for lookup ---
-    # Get all questions from the session in one efficient query
-    question_ids = [int(q_id) for q_id in answers.keys()]
-    # questions becomes a dict like {5: <Question object>, 12: <Question object>}
-    questions = Question.objects.in_bulk(question_ids) 
-    # --- END MODIFIED ---
-
-    best_match = None
-    best_score = -1000 
-    for char in Character.objects.filter(id__in=candidate_ids):
-        score = 0
-        features = char.features or {}
-        
-        for q_id_str, user_answer in answers.items():
-            # Get the <Question> object corresponding to the ID
-            question = questions.get(int(q_id_str))
-            
-            if question:
-                # --- MODIFIED: Use question.text as the key ---
-                char_answer = features.get(question.text)
-                # --- END MODIFIED ---
-                
-                if char_answer:
-                    if user_answer == char_answer:
-                        score += 2
-                    elif user_answer in ["yes", "no"] and user_answer != char_answer:
-                        score -= 2
-                    elif user_answer == 'dont_know':
-                        score -= 1
-                        
-        if score > best_score:
-            best_score = score
-            best_match = char
-            
+    best_id, probability = best_guess(session)
+    best_match = Character.objects.filter(id=best_id).first()
     return Response({
         "guessed_character": CharacterSerializer(best_match).data if best_match else None,
-        "match_score": best_score
+        # The top candidate's posterior probability, in percent.
+        "match_score": round(probability * 100)
     })
 
 
+@api_view(['GET'])
+def current_guesses(request):
+    """
+    Returns the k most likely characters so far (?k=, default 5), with their
+    posterior probabilities. Can be called at any point in a game.
+    """
+    session_id = request.query_params.get("session_id")
+    try:
+        k = min(max(int(request.query_params.get("k", 5)), 1), 50)
+    except ValueError:
+        return Response({"error": "k must be an integer."}, status=status.HTTP_400_BAD_REQUEST)
+
+    with timed_phase("session_load"):
+        try:
+            session = GameSession.objects.get(session_id=session_id)
+        except (GameSession.DoesNotExist, ValidationError):
+            return Response({"error": "Invalid session ID"}, status=status.HTTP_404_NOT_FOUND)
+
+    candidate_ids = session.possible_character_ids or []
+    with timed_phase("scoring"):
+        guesses = top_guesses(session.posterior or {}, candidate_ids, k)
+        characters = Character.objects.in_bulk([char_id for char_id, _ in guesses])
+    return Response({
+        "remaining_candidates": len(candidate_ids),
+        "confident": is_confident(session.posterior or {}, candidate_ids, len(session.answers or {})),
+        "guesses": [
+            {"character": CharacterSerializer(characters[char_id]).data, "probability": round(probability, 4)}
+            for char_id, probability in guesses
+            if char_id in characters
+        ],
+    })
+
+
+def metrics_view(request):
+    """
+    Exposes the request and engine histograms in the Prometheus text format.
+    The numbers are per process.
+    """
+    return HttpResponse(render_prometheus(), content_type="text/plain; version=0.0.4")
+
+
+def readiness_view(request):
+    """
+    Readiness check for load balancers and deploys: 200 once the database is
+    reachable and, when AKINATOR_WARM_START is on, the warm-up has run.
+    Reports the warm-up timings either way; "warm" is false when the warm-up
+    failed (see "error"), in which case the workers serve requests cold.
+    """
+    state = dict(WARMUP_STATE)
+    try:
+        state["current_kb_version"] = KnowledgeBaseVersion.current()
+        database_ok = True
+    except Exception as e:
+        state["error"] = f"Database check failed: {e}"
+        database_ok = False
+
+    # A failed warm-up (e.g. a database blip at boot) is not retried, and it would
+    # otherwise keep the process out of rotation for good.
+    warm_up_done = state["ready"] or not state["enabled"] or WARMUP_STATE["error"] is not None
+    state["warm"] = state["ready"]
+    ready = database_ok and warm_up_done
+    state["ready"] = ready
+    return JsonResponse(state, status=200 if ready else 503)
+
+
 @api_view(['POST'])
 def learn_from_feedback(request):
     """
     Learns from user feedback after a game.
-    Converts session answers (by ID) to features (by text) before saving.
+    The session answers are queued as a FeedbackEvent and merged into the
+    character's features later by the process_feedback batch worker.
     """
     session_id = request.data.get("session_id")
     was_correct = request.data.get("was_correct")
@@ -268,56 +435,30 @@ def learn_from_feedback(request):
     
     try:
         session = GameSession.objects.get(session_id=session_id)
-        # session.answers is {'5': 'yes', '12': 'no'}
-        answers_from_session = session.answers or {}
     except GameSession.DoesNotExist:
         return Response({"error": "Invalid session ID"}, status=status.HTTP_404_NOT_FOUND)
 
-    # --- NEW: Convert session answers (by ID) to features (by text) ---
-    features_to_learn = {}
-    
-    # Efficiently get all questions in one query
-    question_ids = [int(q_id) for q_id in answers_from_session.keys()]
-    questions = Question.objects.in_bulk(question_ids) # {5: <Question>, 12: <Question>}
-
-    for q_id_str, answer in answers_from_session.items():
-        question = questions.get(int(q_id_str))
-        if question:
-            # Use the question's text as the key
-            features_to_learn[question.text] = answer
-        else:
-            print(f"Warning in learn_from_feedback: Question ID {q_id_str} not found. Skipping feature.")
-    
-    # features_to_learn is now {'Is your character male?': 'yes', ...}
-    # --- END NEW ---
-
     if was_correct:
         try:
-            character = Character.objects.get(id=guessed_character_id)
-            # --- MODIFIED: Merge the new text-based features ---
-            character.features = (character.features or {}) | features_to_learn
-            # --- END MODIFIED ---
-            character.save()
-            return Response({"message": f"Thanks for confirming! I've learned more about {character.name}."})
+            character = Character.objects.only('id', 'name').get(id=guessed_character_id)
         except Character.DoesNotExist:
             return Response({"error": "Character not found for learning."}, status=status.HTTP_404_NOT_FOUND)
+
+        enqueue_feedback(session, character, was_correct=True)
+        return Response({"message": f"Thanks for confirming! I've learned more about {character.name}."})
     else:
         correct_name = request.data.get("correct_character_name")
         if not correct_name:
             return Response({"error": "correct_character_name is required when guess is incorrect."}, status=status.HTTP_400_BAD_REQUEST)
         
-        character, created = Character.objects.get_or_create(
-            name__iexact=correct_name,
-            defaults={'name': correct_name, 'added_by': 'user_feedback'}
-        )
-        
-        # --- MODIFIED: Merge the new text-based features ---
-        character.features = (character.features or {}) | features_to_learn
-        # --- END MODIFIED ---
-        character.save()
+        character, created = get_or_create_character(correct_name, added_by='user_feedback')
+        enqueue_feedback(session, character, was_correct=False)
         
         message = f"Thanks for teaching me about {character.name}!"
+        response = {"message": message}
         if created:
-            message += " They are new to my knowledge base."
+            response["message"] += " They are new to my knowledge base."
+            # Lets the client offer "did you mean ...?" in case of a typo; merge_duplicate_characters cleans up.
+            response["did_you_mean"] = suggest_characters(correct_name, exclude_id=character.id)
             
-        return Response({"message": message})
+        return Response(response)
@@ -0,0 +1,80 @@
+import logging
+import time
+import warnings
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+# Filled in by warm_up() and reported by the /api/ready/ endpoint.
+WARMUP_STATE = {
+    "enabled": False,
+    "ready": False,
+    "kb_version": None,
+    "characters": None,
+    "timings_ms": {},
+    "error": None,
+}
+
+
+def warm_up():
+    """
+    Pays every cold-start cost once, before gunicorn forks its workers
+    (run gunicorn with --preload), so copy-on-write shares the result:
+    imports, the first queries, the engine's knowledge-base snapshot and
+    the name index.
+
+    Called from AkinatorAppConfig.ready() when AKINATOR_WARM_START is on.
+    Only enable it for the web server: management commands such as migrate
+    also run ready(), possibly before the tables exist.
+    """
+    WARMUP_STATE["enabled"] = True
+    timings = WARMUP_STATE["timings_ms"]
+    started = time.perf_counter()
+
+    def lap(name, phase_started):
+        timings[name] = round((time.perf_counter() - phase_started) * 1000, 2)
+        logger.info("Warm-up: %s took %.1f ms", name, timings[name])
+
+    try:
+        # Django discourages queries in AppConfig.ready(); here they are the point.
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", RuntimeWarning)
+
+            phase_started = time.perf_counter()
+            from rest_framework import renderers, parsers  # noqa: F401
+            from . import views, serializers  # noqa: F401
+            from .knowledge_base import best_question
+            from .kb_snapshot import KnowledgeBaseSnapshot, SNAPSHOT_PATH, get_snapshot, set_snapshot
+            from .names import get_name_index
+            lap("imports", phase_started)
+
+            # --- Load the snapshot: map the compiled file, or compile one in memory ---
+            phase_started = time.perf_counter()
+            snapshot = get_snapshot() if SNAPSHOT_PATH else None
+            if snapshot is None:
+                snapshot = KnowledgeBaseSnapshot.from_database()
+                set_snapshot(snapshot)
+            snapshot.index_of  # Build the ID map now so the workers inherit it.
+            lap("knowledge_base", phase_started)
+
+            # --- Build the trigram index behind the "did you mean" suggestions ---
+            phase_started = time.perf_counter()
+            get_name_index()
+            lap("name_index", phase_started)
+
+            # --- Run the opening move once to touch every code path of a game ---
+            phase_started = time.perf_counter()
+            best_question(list(snapshot.character_ids), [], {})
+            lap("opening_question", phase_started)
+
+        WARMUP_STATE["kb_version"] = snapshot.kb_version
+        WARMUP_STATE["characters"] = snapshot.num_characters
+        WARMUP_STATE["ready"] = True
+    except Exception as e:
+        WARMUP_STATE["error"] = str(e)
+        logger.exception("Warm-up failed; workers will start cold.")
+    finally:
+        # Forked workers must not share the master's database connections.
+        connections.close_all()
+
+    lap("total", started)
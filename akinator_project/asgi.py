@@ -13,4 +13,6 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'akinator_project.settings')
 
+# Static files are not served here (WhiteNoise only wraps the WSGI application);
+# have the front server serve STATIC_ROOT under STATIC_URL.
 application = get_asgi_application()
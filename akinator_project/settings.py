@@ -51,6 +51,7 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'akinator_app.middleware.MetricsMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -130,6 +131,33 @@ USE_TZ = True
 # https://docs.djangoproject.com/en/5.2/howto/static-files/
 
 STATIC_URL = 'static/'
+STATIC_ROOT = BASE_DIR / 'staticfiles'
+
+# collectstatic writes content-hashed, gzip/brotli-compressed copies (e.g. of the
+# question tree bundle, see build_question_tree). WhiteNoise serves them in front
+# of the WSGI application (see wsgi.py). It is not installed as a middleware:
+# WhiteNoise's middleware is sync-only and would break the async chain under
+# asgi.py, where the front server (e.g. nginx) should serve STATIC_ROOT instead.
+STORAGES = {
+    'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+    'staticfiles': {'BACKEND': 'whitenoise.storage.CompressedManifestStaticFilesStorage'},
+}
+
+# Akinator engine
+# Set AKINATOR_WARM_START=1 for the web server (with gunicorn --preload) to build
+# the knowledge base before the workers fork.
+AKINATOR_WARM_START = os.environ.get('AKINATOR_WARM_START') == '1'
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'akinator_app': {'handlers': ['console'], 'level': 'INFO'},
+    },
+}
 
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
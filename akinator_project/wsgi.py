@@ -9,8 +9,19 @@ https://docs.djangoproject.com/en/5.2/howto/deployment/wsgi/
 
 import os
 
+from django.conf import settings
 from django.core.wsgi import get_wsgi_application
+from whitenoise import WhiteNoise
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'akinator_project.settings')
 
 application = get_wsgi_application()
+
+# Serves the collected static files, compressed, and caches the names hashed by
+# collectstatic (name.0123456789ab.ext) forever.
+application = WhiteNoise(
+    application,
+    root=settings.STATIC_ROOT,
+    prefix=settings.STATIC_URL,
+    immutable_file_test=r'\.[0-9a-f]{12}\.\w+$',
+)